@@ -0,0 +1,287 @@
+"""
+Pruebas de rendimiento de las etapas del cambio de rutas sobre un árbol
+sintético (bench.synthetic), en Linux y sin Contpaqi.
+
+Etapas medidas:
+
+    catalogo     DBFManager.extract_info sobre MGW00001.DBF
+    prefiltro    DBFManager.needs_rewrite en todas las tablas de empresas
+    plan         DBFManager.plan_info (lectura y cálculo, sin escribir)
+    actualizar   DBFManager.update_info (escritura, sobre una copia del árbol)
+    rutas_frio   PathManager.change_paths con el memo vacío
+    rutas_memo   PathManager.change_paths con el memo ya lleno
+
+Para cada etapa se reporta el tiempo (mejor de --repeticiones),
+registros/s, tablas/s, MB/s y el pico de memoria (tracemalloc, en una
+pasada aparte para no alterar los tiempos). Los resultados se guardan en
+JSON para compararlos entre versiones:
+
+    python -m bench.benchmark --empresas 20 --registros 2000 --salida v2.json
+    python -m bench.benchmark --empresas 20 --registros 2000 --comparar v1.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from bench.synthetic import TreeGenerator, DEFAULT_MIX, LETTER, BASE_PATH, NEW_SERVER, parse_mix
+from clases.dbf import DBFManager
+from clases.path import PathManager
+from clases.reader import DBFReader
+
+VERSION = 1
+
+
+def new_path_manager() -> PathManager:
+    """PathManager de la corrida sintética: C:\\Compacw\\Empresas → \\\\NUEVO\\Compacw\\Empresas."""
+    path_manager = PathManager(letterBase=LETTER, basePath=BASE_PATH)
+    path_manager.set_target(hostname=NEW_SERVER)
+    return path_manager
+
+
+def company_tables(root: Path, path_manager):
+    """Lista (ruta_tabla, columnas) de todas las tablas de empresas del árbol."""
+    tables = []
+    for company_dir in sorted(p for p in Path(root).iterdir() if p.is_dir()):
+        for table_name, columns in path_manager.tablePath:
+            table_path = company_dir / table_name
+            if table_path.exists():
+                tables.append((table_path, columns))
+    return tables
+
+
+def table_stats(tables) -> dict:
+    records = 0
+    size = 0
+    for table_path, _ in tables:
+        with DBFReader(table_path) as reader:
+            records += len(reader)
+        size += os.path.getsize(table_path)
+    return {"tablas": len(tables), "registros": records, "bytes": size}
+
+
+def collect_paths(tables) -> list:
+    """Todos los valores de las columnas de rutas (con repeticiones, como en las tablas)."""
+    paths = []
+    for table_path, columns in tables:
+        with DBFReader(table_path) as reader:
+            cols = [c for c in columns if c in reader.field_names]
+            for _, values in reader.iter_values(cols):
+                paths.extend(values[c] for c in cols)
+    return paths
+
+
+@contextlib.contextmanager
+def quiet():
+    """Descarta los mensajes de DBFManager mientras se mide."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+class Stage:
+    """
+    Una etapa medible: setup() prepara el estado (fuera del tiempo medido),
+    run(estado) es lo que se mide. volume describe lo procesado.
+    """
+
+    def __init__(self, name: str, run, volume: dict, setup=None):
+        self.name = name
+        self.run = run
+        self.volume = volume
+        self.setup = setup or (lambda: None)
+
+    def measure(self, repeats: int) -> dict:
+        times = []
+        for _ in range(repeats):
+            state = self.setup()
+            with quiet():
+                start = time.perf_counter()
+                self.run(state)
+                times.append(time.perf_counter() - start)
+
+        # Pico de memoria en una pasada aparte (tracemalloc hace más lento el código)
+        state = self.setup()
+        tracemalloc.start()
+        try:
+            with quiet():
+                self.run(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        seconds = min(times)
+        result = {"segundos": round(seconds, 6), "memoria_pico": peak}
+        result.update(self.volume)
+        rate = 1 / seconds if seconds > 0 else 0.0
+        result["registros_s"] = round(self.volume.get("registros", 0) * rate, 1)
+        result["tablas_s"] = round(self.volume.get("tablas", 0) * rate, 1)
+        result["mb_s"] = round(self.volume.get("bytes", 0) / 1e6 * rate, 2)
+        return result
+
+
+def build_stages(pristine: Path, work: Path) -> list:
+    path_manager = new_path_manager()
+    mgw_path = pristine / "MGW00001.DBF"
+    tables = company_tables(pristine, path_manager)
+    volume = table_stats(tables)
+    catalog_volume = table_stats([(mgw_path, ["CRUTADATOS"])])
+    paths = collect_paths(tables)
+    paths_volume = {"registros": len(paths)}
+
+    def catalog(_):
+        DBFManager().extract_info(mgw_path, path_manager=new_path_manager(), collect_paths=True)
+
+    def prefilter(_):
+        manager = DBFManager()
+        pm = new_path_manager()
+        for table_path, _ in tables:
+            manager.needs_rewrite(table_path, pm)
+
+    def plan(_):
+        manager = DBFManager()
+        pm = new_path_manager()
+        for table_path, columns in tables:
+            manager.plan_info(table_path, columns, pm)
+
+    def copy_tree():
+        # La actualización modifica las tablas: cada pasada parte de una copia limpia
+        shutil.rmtree(work, ignore_errors=True)
+        shutil.copytree(pristine, work)
+        return [(work / t.relative_to(pristine), c) for t, c in tables]
+
+    def update(work_tables):
+        pm = new_path_manager()
+        for table_path, columns in work_tables:
+            DBFManager().update_info(table_path, columns, pm)
+
+    def cold_memo():
+        pm = new_path_manager()
+        pm.clear_cache()
+        return pm
+
+    def warm_memo():
+        pm = new_path_manager()
+        pm.change_paths(paths, new_base=pm.newBase)
+        return pm
+
+    def rewrite(pm):
+        pm.change_paths(paths, new_base=pm.newBase)
+
+    return [
+        Stage("catalogo", catalog, catalog_volume),
+        Stage("prefiltro", prefilter, volume),
+        Stage("plan", plan, volume),
+        Stage("actualizar", update, volume, setup=copy_tree),
+        Stage("rutas_frio", rewrite, paths_volume, setup=cold_memo),
+        Stage("rutas_memo", rewrite, paths_volume, setup=warm_memo),
+    ]
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(companies: int, records: int, mix: dict, deleted: float, seed: int,
+                  repeats: int, only=None) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench_compacw_") as tmp:
+        pristine = Path(tmp) / "original"
+        work = Path(tmp) / "trabajo"
+        tree = TreeGenerator(companies, records, mix, deleted, seed).generate(pristine)
+
+        results = {
+            "benchmark": VERSION,
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": {
+                "empresas": companies, "registros": records, "mezcla": mix,
+                "borrados": deleted, "semilla": seed, "repeticiones": repeats
+            },
+            "arbol": tree,
+            "etapas": {}
+        }
+
+        for stage in build_stages(pristine, work):
+            if only and stage.name not in only:
+                continue
+            print(f"  {stage.name}...", end="", flush=True)
+            results["etapas"][stage.name] = stage.measure(repeats)
+            print(f" {results['etapas'][stage.name]['segundos']:.3f} s")
+
+    return results
+
+
+def print_results(results: dict, baseline: dict = None):
+    print("\n" + "=" * 96)
+    print(f"{'Etapa':<12} {'Segundos':>10} {'Registros/s':>14} {'Tablas/s':>10} {'MB/s':>9} {'Memoria pico':>14}  Cambio")
+    print("-" * 96)
+    base_stages = (baseline or {}).get("etapas", {})
+    for name, stage in results["etapas"].items():
+        change = ""
+        base = base_stages.get(name)
+        if base and base.get("segundos") and stage["segundos"]:
+            change = f"{base['segundos'] / stage['segundos']:.2f}x"
+        print(f"{name:<12} {stage['segundos']:>10.3f} {stage['registros_s']:>14,.0f} {stage['tablas_s']:>10,.1f} "
+              f"{stage['mb_s']:>9.2f} {stage['memoria_pico'] / 1e6:>11.1f} MB  {change}")
+    print("=" * 96)
+    if baseline:
+        ignored = ("repeticiones",)
+        same = lambda params: {k: v for k, v in (params or {}).items() if k not in ignored}
+        if same(baseline.get("parametros")) != same(results["parametros"]):
+            print("Advertencia: la referencia se midió con otros parámetros; la comparación no es directa")
+        print(f"Cambio = velocidad respecto a {baseline.get('revision') or 'la referencia'} (>1 es más rápido)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pruebas de rendimiento del cambio de rutas")
+    parser.add_argument("--empresas", type=int, default=10, help="Número de empresas (por defecto 10)")
+    parser.add_argument("--registros", type=int, default=1000, help="Registros de mgw10006.dbf por empresa (por defecto 1000)")
+    parser.add_argument("--mezcla", type=parse_mix, default=DEFAULT_MIX,
+                        help="Pesos de tipos de ruta, p. ej. local=0.4,unc=0.3,migrada=0.2,vacia=0.1")
+    parser.add_argument("--borrados", type=float, default=0.02, help="Fracción de registros borrados")
+    parser.add_argument("--semilla", type=int, default=1, help="Semilla del generador aleatorio")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Se reporta la mejor de N pasadas (por defecto 3)")
+    parser.add_argument("--etapas", help="Lista de etapas a medir separadas por coma (por defecto todas)")
+    parser.add_argument("--salida", type=Path, help="Guarda los resultados en un archivo JSON")
+    parser.add_argument("--comparar", type=Path, help="Archivo JSON de una corrida anterior para comparar")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    only = set(args.etapas.split(",")) if args.etapas else None
+
+    baseline = None
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"Generando árbol sintético: {args.empresas} empresa(s) x {args.registros} registro(s)")
+    results = run_benchmark(args.empresas, args.registros, args.mezcla, args.borrados,
+                            args.semilla, max(1, args.repeticiones), only)
+    print_results(results, baseline)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en: {args.salida.absolute()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
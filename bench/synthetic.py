@@ -0,0 +1,223 @@
+"""
+Generador de un árbol Compacw sintético para pruebas de rendimiento.
+
+Construye, sin Contpaqi ni la librería dbf, un catálogo MGW00001.DBF con N
+empresas y en cada carpeta de empresa las tablas mgw10000.dbf y
+mgw10006.dbf con el número de registros indicado. Las rutas de cada campo
+se eligen al azar (con semilla) según una mezcla de tipos:
+
+    local    C:\\Compacw\\Empresas\\Empresa1\\...
+    unc      \\\\ANTERIOR\\Compacw\\Empresas\\Empresa1\\...
+    migrada  \\\\NUEVO\\Compacw\\Empresas\\Empresa1\\...  (ya con el destino)
+    vacia    campo en blanco
+
+Uso:
+    python -m bench.synthetic DESTINO --empresas 20 --registros 2000 \\
+        --mezcla local=0.4,unc=0.3,migrada=0.2,vacia=0.1
+"""
+import argparse
+import datetime
+import random
+import struct
+from pathlib import Path
+
+LETTER = "C"
+BASE_PATH = "Compacw\\Empresas"
+OLD_SERVER = "ANTERIOR"
+NEW_SERVER = "NUEVO"
+
+DEFAULT_MIX = {"local": 0.4, "unc": 0.3, "migrada": 0.2, "vacia": 0.1}
+
+# Estructura de las tablas (nombre, tipo, longitud, decimales)
+CATALOG_FIELDS = [
+    ("CIDEMPRESA", "N", 6, 0),
+    ("CNOMBREE01", "C", 60, 0),
+    ("CRUTADATOS", "C", 253, 0),
+    ("CRUTARES01", "C", 253, 0),
+]
+PARAM_FIELDS = [
+    ("CIDEMPRESA", "N", 6, 0),
+    ("CRUTAPLA01", "C", 253, 0),
+    ("CRUTAPLA02", "C", 253, 0),
+    ("CRUTAENT01", "C", 253, 0),
+]
+CONCEPT_FIELDS = [
+    ("CIDCONCE01", "N", 6, 0),
+    ("CCODIGOC01", "C", 30, 0),
+    ("CNOMBREC01", "C", 60, 0),
+    ("CFORMAPR01", "C", 253, 0),
+    ("CREPIMPCFD", "C", 253, 0),
+    ("CPLAMIGCFD", "C", 253, 0),
+    ("CRUTAENT01", "C", 253, 0),
+]
+
+LANGUAGE_DRIVER = 0x03  # cp1252
+CODEPAGE = "cp1252"
+
+
+def parse_mix(text: str) -> dict:
+    """Convierte "local=0.4,unc=0.3" en un dict de pesos."""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        kind, _, weight = part.partition("=")
+        kind = kind.strip().lower()
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"Tipo de ruta desconocido: {kind!r} (use {', '.join(DEFAULT_MIX)})")
+        mix[kind] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("La mezcla de rutas debe tener al menos un peso positivo")
+    return mix
+
+
+def write_table(table_path: Path, fields: list, rows, deleted=()):
+    """
+    Escribe una tabla DBF (dBase III) con los campos y registros indicados.
+
+    rows es un iterable de tuplas en el orden de fields; los índices en
+    deleted se escriben con la marca de borrado. Regresa los bytes escritos.
+    """
+    rows = list(rows)
+    deleted = set(deleted)
+    record_length = 1 + sum(length for _, _, length, _ in fields)
+    header_length = 32 + 32 * len(fields) + 1
+    today = datetime.date.today()
+
+    header = bytearray(32)
+    header[0] = 0x03
+    header[1:4] = bytes((today.year - 1900, today.month, today.day))
+    header[4:12] = struct.pack("<IHH", len(rows), header_length, record_length)
+    header[29] = LANGUAGE_DRIVER
+
+    descriptors = bytearray()
+    for name, kind, length, decimals in fields:
+        desc = bytearray(32)
+        desc[:len(name)] = name.encode("ascii")
+        desc[11] = ord(kind)
+        desc[16] = length
+        desc[17] = decimals
+        descriptors += desc
+
+    with open(table_path, "wb") as f:
+        f.write(header)
+        f.write(descriptors)
+        f.write(b"\x0D")
+        for recno, row in enumerate(rows):
+            record = bytearray(b"*" if recno in deleted else b" ")
+            for (_, kind, length, _), value in zip(fields, row):
+                if kind == "N":
+                    raw = str(value).rjust(length).encode("ascii")
+                else:
+                    raw = str(value).encode(CODEPAGE, errors="replace")[:length].ljust(length, b" ")
+                record += raw
+            f.write(record)
+        f.write(b"\x1A")
+
+    return header_length + record_length * len(rows) + 1
+
+
+class TreeGenerator:
+    """Genera el árbol sintético de forma reproducible (misma semilla, mismos bytes)."""
+
+    def __init__(self, companies: int = 10, records: int = 1000, mix: dict = None,
+                 deleted: float = 0.02, seed: int = 1):
+        self.companies = companies
+        self.records = records
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.deleted = deleted
+        self.seed = seed
+        self.__kinds = list(self.mix)
+        self.__weights = [self.mix[k] for k in self.__kinds]
+
+    def company_name(self, index: int) -> str:
+        return f"Empresa{index + 1:05d}"
+
+    def path_for(self, rnd: random.Random, company: str, tail: str) -> str:
+        kind = rnd.choices(self.__kinds, self.__weights)[0]
+        if kind == "local":
+            return f"{LETTER}:\\{BASE_PATH}\\{company}\\{tail}"
+        if kind == "unc":
+            return f"\\\\{OLD_SERVER}\\{BASE_PATH}\\{company}\\{tail}"
+        if kind == "migrada":
+            return f"\\\\{NEW_SERVER}\\{BASE_PATH}\\{company}\\{tail}"
+        return ""
+
+    def generate(self, root: Path) -> dict:
+        """
+        Escribe el árbol en root y regresa un resumen:
+        {"empresas", "tablas", "registros", "bytes"}.
+        """
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        rnd = random.Random(self.seed)
+        summary = {"empresas": self.companies, "tablas": 1, "registros": self.companies, "bytes": 0}
+
+        catalog_rows = []
+        for i in range(self.companies):
+            company = self.company_name(i)
+            catalog_rows.append((
+                i + 1,
+                f"Empresa sintética {i + 1}",
+                self.path_for(rnd, company, "").rstrip("\\") or f"{LETTER}:\\{BASE_PATH}\\{company}",
+                self.path_for(rnd, company, "Respaldos")
+            ))
+
+            company_dir = root / company
+            company_dir.mkdir(exist_ok=True)
+
+            params = [(1,
+                       self.path_for(rnd, company, "Plantillas\\cfd.html"),
+                       self.path_for(rnd, company, "Plantillas\\cfd2.html"),
+                       self.path_for(rnd, company, "XML"))]
+            summary["bytes"] += write_table(company_dir / "mgw10000.dbf", PARAM_FIELDS, params)
+
+            concepts = []
+            deleted = set()
+            for r in range(self.records):
+                concepts.append((
+                    r + 1,
+                    f"C{r + 1:05d}",
+                    f"Concepto {r + 1}",
+                    self.path_for(rnd, company, f"Formas\\forma{r % 7}.frm"),
+                    self.path_for(rnd, company, f"Reportes\\reporte{r % 5}.rdl"),
+                    self.path_for(rnd, company, "Plantillas\\amigable.html"),
+                    self.path_for(rnd, company, f"XML\\{r % 3}")
+                ))
+                if rnd.random() < self.deleted:
+                    deleted.add(r)
+            summary["bytes"] += write_table(company_dir / "mgw10006.dbf", CONCEPT_FIELDS, concepts, deleted)
+            summary["tablas"] += 2
+            summary["registros"] += 1 + self.records
+
+        summary["bytes"] += write_table(root / "MGW00001.DBF", CATALOG_FIELDS, catalog_rows)
+        return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un árbol Compacw sintético")
+    parser.add_argument("destino", type=Path, help="Carpeta donde se crea el árbol (equivale a Compacw\\Empresas)")
+    parser.add_argument("--empresas", type=int, default=10, help="Número de empresas (por defecto 10)")
+    parser.add_argument("--registros", type=int, default=1000, help="Registros de mgw10006.dbf por empresa (por defecto 1000)")
+    parser.add_argument("--mezcla", type=parse_mix, default=DEFAULT_MIX,
+                        help="Pesos de tipos de ruta, p. ej. local=0.4,unc=0.3,migrada=0.2,vacia=0.1")
+    parser.add_argument("--borrados", type=float, default=0.02, help="Fracción de registros borrados (por defecto 0.02)")
+    parser.add_argument("--semilla", type=int, default=1, help="Semilla del generador aleatorio")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.destino.exists() and any(args.destino.iterdir()):
+        print(f"Error: {args.destino} no está vacío")
+        return 1
+    generator = TreeGenerator(args.empresas, args.registros, args.mezcla, args.borrados, args.semilla)
+    summary = generator.generate(args.destino)
+    print(f"Árbol generado en {args.destino}: {summary['empresas']} empresa(s), "
+          f"{summary['tablas']} tabla(s), {summary['registros']} registro(s), "
+          f"{summary['bytes'] / 1e6:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
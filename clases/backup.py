@@ -0,0 +1,230 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from clases.directory import DirectoryIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl de Linux para clonar un archivo (reflink en btrfs, XFS, etc.)
+FICLONE = 0x40049409
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def companions(table_path: Path) -> list:
+    """Archivos de memo e índice de una tabla (mismo nombre, otra extensión)."""
+    table_path = Path(table_path)
+    try:
+        return DirectoryIndex.scan(table_path.parent).companions(table_path.name)
+    except OSError:
+        return []
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def reflink(src: Path, dst: Path) -> bool:
+    """
+    Clona src en dst compartiendo bloques (copy-on-write) si el sistema de
+    archivos lo permite. Solo funciona en Linux (ioctl FICLONE sobre btrfs,
+    XFS, etc.); en Windows y macOS siempre regresa False.
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+
+class BackupManager:
+    """
+    Respaldo previo de solo las tablas que se van a modificar.
+
+    Cada tabla (y sus archivos de memo e índice) se copia a backup_dir
+    conservando la ruta relativa a la carpeta de empresas. En Linux se
+    intenta primero un reflink (copia instantánea copy-on-write); en Windows,
+    en macOS o si el sistema de archivos no lo permite se guarda una copia
+    completa comprimida (.gz). No se
+    usan hardlinks: las tablas se parchan en el mismo archivo, así que el
+    respaldo cambiaría junto con el original.
+
+    El manifiesto (manifest.jsonl) tiene una línea por archivo:
+
+        {"origen": "C:\\...\\Empresa1\\mgw10006.dbf", "respaldo": "Empresa1/mgw10006.dbf.gz",
+         "metodo": "gzip", "sha256": "...", "size": 123456, "mtime": ...}
+
+    sha256 y size son del archivo original. Un archivo que ya está en el
+    manifiesto no se vuelve a respaldar (--resume conserva la copia previa
+    a la primera escritura).
+    """
+
+    MANIFEST = "manifest.jsonl"
+
+    def __init__(self, backup_dir: Path, base_path: str, workers: int = 4, compress: bool = True):
+        self.backup_dir = Path(backup_dir)
+        self.base_path = str(base_path)
+        self.workers = max(1, workers)
+        self.compress = compress
+        self.entries = {}
+        self.reflinks = 0
+        self.copies = 0
+        self.bytes = 0
+        self.__file = None
+        self.__lock = threading.Lock()
+
+    def open(self, resume: bool = False):
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.backup_dir / self.MANIFEST
+        self.entries = {}
+        append = resume and manifest.exists()
+        if append:
+            for entry in self.read():
+                self.entries[entry["origen"]] = entry
+        self.__file = open(manifest, "a" if append else "w", encoding="utf-8")
+        if not append:
+            self.__write({"respaldo": 1, "creado": datetime.datetime.now().isoformat(timespec="seconds"),
+                          "base": self.base_path})
+        return self
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self):
+        """Itera las entradas del manifiesto (sin el encabezado)."""
+        with open(self.backup_dir / self.MANIFEST, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if "origen" in obj:
+                    yield obj
+
+    def relative_name(self, path: Path) -> Path:
+        """Ruta del respaldo relativa a backup_dir (la parte después de la carpeta de empresas)."""
+        text = str(path)
+        if text.lower().startswith(self.base_path.lower()):
+            text = text[len(self.base_path):]
+        else:
+            text = os.path.splitdrive(text)[1]
+        parts = [p for p in text.replace("\\", "/").split("/") if p and p != ".."]
+        return Path(*parts)
+
+    def backup_file(self, src: Path) -> dict:
+        """Respalda un archivo y regresa su entrada de manifiesto (sin escribirla)."""
+        src = Path(src)
+        stat = os.stat(src)
+        dst = self.backup_dir / self.relative_name(src)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+
+        if reflink(src, dst):
+            method = "reflink"
+            digest = sha256_file(src)
+        elif self.compress:
+            method = "gzip"
+            dst = dst.with_name(dst.name + ".gz")
+            hasher = hashlib.sha256()
+            with open(src, "rb") as fsrc, gzip.open(dst, "wb", compresslevel=1) as fdst:
+                for chunk in iter(lambda: fsrc.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+                    fdst.write(chunk)
+            digest = hasher.hexdigest()
+        else:
+            method = "copia"
+            shutil.copy2(src, dst)
+            digest = sha256_file(src)
+
+        return {
+            "origen": str(src),
+            "respaldo": dst.relative_to(self.backup_dir).as_posix(),
+            "metodo": method,
+            "sha256": digest,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns
+        }
+
+    def backup_tables(self, table_paths, needs_backup=None, on_done=None, companions_of=companions) -> dict:
+        """
+        Respalda en paralelo las tablas indicadas y sus archivos acompañantes.
+
+        needs_backup(ruta) se evalúa dentro de cada worker (p. ej. el
+        prefiltro de DBFManager); las tablas para las que regresa False no se
+        copian. on_done(ruta) se llama al terminar cada tabla.
+        companions_of(ruta) regresa los archivos acompañantes (por defecto
+        lista la carpeta de la tabla; puede resolverse con DirectoryIndex).
+        Regresa {"respaldados": n, "omitidos": n, "errores": [(ruta, error)]}.
+        """
+        summary = {"respaldados": 0, "omitidos": 0, "errores": []}
+
+        def task(table_path):
+            if str(table_path) in self.entries:
+                return []
+            if needs_backup is not None and not needs_backup(table_path):
+                return None
+            return [self.backup_file(p) for p in [table_path] + companions_of(table_path)
+                    if str(p) not in self.entries]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(task, Path(p)): Path(p) for p in table_paths}
+            for future in as_completed(futures):
+                table_path = futures[future]
+                try:
+                    entries = future.result()
+                except OSError as e:
+                    summary["errores"].append((str(table_path), e))
+                    entries = []
+                if entries is None:
+                    summary["omitidos"] += 1
+                for entry in entries or []:
+                    self.__add(entry)
+                    summary["respaldados"] += 1
+                if on_done is not None:
+                    on_done(table_path)
+        return summary
+
+    def __add(self, entry: dict):
+        with self.__lock:
+            self.entries[entry["origen"]] = entry
+            if entry["metodo"] == "reflink":
+                self.reflinks += 1
+            else:
+                self.copies += 1
+            self.bytes += entry["size"]
+            self.__write(entry)
+
+    def __write(self, obj: dict):
+        self.__file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self.__file.flush()
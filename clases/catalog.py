@@ -0,0 +1,229 @@
+from pathlib import Path
+
+from clases.changes import ChangeStore
+from clases.dbf import DBFManager
+from clases.reader import DBFFormatError
+from clases.retry import is_lock_error
+from clases.writer import DBFWriter
+
+
+class CatalogPass:
+    """
+    Lectura y reescritura de MGW00001.DBF en una sola apertura y una sola
+    pasada.
+
+    Al recorrerlo entrega la ruta local de cada empresa (como
+    DBFManager.iter_info) y, en el mismo recorrido y con el mismo archivo
+    abierto, reescribe CRUTADATOS y CRUTARES01 de cada registro (como
+    update_info). Al terminar quedan en el objeto las empresas, los
+    registros de cada una, los cambios aplicados y el error, si hubo:
+
+        catalogo = CatalogPass(mgw_path, path_manager).run()
+        catalogo.companies  # ["C:\\Compacw\\Empresas\\Emp1", ...]
+        catalogo.changes    # ChangeStore con los cambios del catálogo
+
+    Con defer=True las escrituras se guardan y se aplican al llamar
+    commit() (p. ej. después de respaldar las tablas de las empresas y de
+    abrir la bitácora), sin volver a abrir ni leer el catálogo; close() sin
+    commit() no modifica nada. Con write=False solo se lee. Con records solo
+    se consideran esos números de registro.
+
+    Si otro programa tiene el catálogo abierto, se lee sin escribir y el
+    error queda en error (is_lock_error) para reintentarlo con update_info.
+    Si el escritor directo no reconoce el formato, se recurre a iter_info y
+    update_info.
+    """
+
+    COLUMNS = ["CRUTADATOS", "CRUTARES01"]
+
+    def __init__(self, table_path: Path, path_manager, write: bool = True, defer: bool = False,
+                 records=None, manager: DBFManager = None):
+        self.table_path = Path(table_path)
+        self.path_manager = path_manager
+        self.write = write
+        self.defer = defer
+        self.records = set(records) if records is not None else None
+        self.manager = manager or DBFManager()
+        # Rutas locales en el orden del catálogo y registros de cada una
+        self.companies = []
+        self.company_records = {}
+        self.changes = ChangeStore()
+        self.error = None
+        # True cuando se recorrió el catálogo completo
+        self.finished = False
+        self.__writer = None
+        self.__pending = []
+        self.__fallback = False
+
+    def run(self) -> "CatalogPass":
+        """Recorre el catálogo completo (con defer=True el catálogo queda abierto hasta commit())."""
+        for _ in self:
+            pass
+        return self
+
+    def __iter__(self):
+        metrics = self.manager.metrics
+        metrics.begin(self.table_path.name)
+        if self.write:
+            try:
+                self.__writer = DBFWriter(self.table_path).open()
+                self.__check_fields()
+            except DBFFormatError as e:
+                self.close()
+                self.manager.output(f"Advertencia: Escritura directa no disponible para {self.table_path.name} ({e}), usando dbf")
+                yield from self.__iter_fallback()
+                return
+            except OSError as e:
+                self.close()
+                if not is_lock_error(e):
+                    self.error = e
+                    self.manager.output(f"Error: No se pudo abrir {self.table_path}: {e}")
+                    return
+                # En uso por otro programa: se lee sin escribir y se reintenta después
+                self.error = e
+                self.manager.output(f"Advertencia: {self.table_path.name} está en uso por otro programa ({e})")
+
+        source = self.__writer
+        try:
+            if source is None:
+                source = self.manager.open_reader(self.table_path)
+            if "CRUTADATOS" not in source.field_names:
+                raise KeyError("CRUTADATOS")
+
+            escribir = self.__writer is not None
+            # Los registros borrados también se reescriben (como con la librería dbf)
+            for recno, values in source.iter_values(self.COLUMNS, include_deleted=True):
+                if self.records is not None and recno not in self.records:
+                    continue
+                metrics.add("registros")
+                if escribir:
+                    try:
+                        self.__rewrite(recno, values)
+                    except OSError as e:
+                        # Se deja de escribir, pero se terminan de leer las empresas
+                        self.error = e
+                        escribir = False
+                        self.manager.output(f"Error: No se pudo escribir en {self.table_path}: {e}")
+                ruta_local = self.manager.company_path(values["CRUTADATOS"], self.path_manager)
+                if ruta_local:
+                    self.companies.append(ruta_local)
+                    self.company_records.setdefault(ruta_local, []).append(recno)
+                    yield ruta_local
+            self.finished = True
+
+        except FileNotFoundError as e:
+            self.error = e
+            self.manager.output(f"Error: Archivo no encontrado: {self.table_path}")
+        except KeyError as e:
+            self.error = e
+            self.manager.output(f"Error: Columna no encontrada: {e}")
+        except Exception as e:
+            self.error = e
+            self.manager.output(f"Error: Error inesperado en {self.table_path}: {e}")
+        finally:
+            if source is not None and source is not self.__writer:
+                source.close()
+            if not self.defer or self.error is not None:
+                self.commit()
+
+    def commit(self, on_apply=None) -> ChangeStore:
+        """
+        Aplica las escrituras pendientes (defer=True), cierra el catálogo y
+        regresa los cambios. on_apply recibe la lista de cambios (formato de
+        update_info) antes de escribir el primero, p. ej. para registrarlos
+        en la bitácora; con update_info (formato no reconocido) los recibe
+        por lotes, también antes de escribirlos.
+        """
+        if self.__fallback and self.write and self.error is None:
+            self.__fallback = False
+            records = sorted(self.records) if self.records is not None else None
+
+            def registrar(cambios):
+                for change in cambios:
+                    self.changes.add(change["table"], change["record"], change["before"], change["after"])
+                if on_apply is not None:
+                    on_apply(cambios)
+
+            self.manager.update_info(self.table_path, self.COLUMNS, self.path_manager, records=records,
+                                     on_apply=registrar)
+            self.error = self.manager.last_error
+            return self.changes
+        try:
+            if self.__writer is not None and self.error is None and self.__pending:
+                if on_apply is not None:
+                    on_apply([
+                        {"table": self.table_path.name, "record": recno, "before": before, "after": after}
+                        for recno, before, after, _ in self.__pending
+                    ])
+                for change in self.__pending:
+                    self.__patch(change)
+        finally:
+            self.close()
+        return self.changes
+
+    def close(self):
+        """Cierra el catálogo; las escrituras diferidas que no se aplicaron se descartan."""
+        self.__pending = []
+        if self.__writer is not None:
+            writer, self.__writer = self.__writer, None
+            writer.close()
+            self.manager.metrics.add("bytes_escritos", writer.bytes_written)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __check_fields(self):
+        """Valida las columnas antes de la primera escritura (solo campos de carácter)."""
+        for col in self.COLUMNS:
+            if col in self.__writer.header.fields:
+                field = self.__writer.header.field_info(col)
+                if field.type != "C":
+                    raise DBFFormatError(f"El campo {col} no es de tipo carácter ({field.type})")
+
+    def __rewrite(self, recno: int, values: dict):
+        """Calcula el cambio de un registro y lo escribe (o lo guarda, con defer)."""
+        before = {}
+        after = {}
+        updates = {}
+        header = self.__writer.header
+        for col in self.COLUMNS:
+            original = values.get(col, "")
+            if not original:
+                continue
+            updated = self.path_manager.change_path(original, new_base=self.path_manager.newBase)
+            if updated != original:
+                max_len = header.field_info(col).length
+                if len(updated) > max_len:
+                    self.manager.output(f"Advertencia:  Truncando {col}: {len(updated)} → {max_len} chars")
+                    updated = updated[:max_len]
+                updates[col] = updated
+            before[col] = original
+            after[col] = updated
+        if not updates:
+            return
+        change = (recno, before, after, updates)
+        if self.defer:
+            self.__pending.append(change)
+        else:
+            self.__patch(change)
+
+    def __patch(self, change):
+        recno, before, after, updates = change
+        for col, value in updates.items():
+            self.__writer.patch(recno, col, value)
+        self.changes.add(self.table_path.name, recno, before, after)
+
+    def __iter_fallback(self):
+        """Lectura con iter_info; la escritura se hace en commit() con update_info."""
+        self.__fallback = True
+        for recno, ruta_local in self.manager.iter_info(self.table_path, self.path_manager,
+                                                        records=self.records, with_records=True):
+            self.companies.append(ruta_local)
+            self.company_records.setdefault(ruta_local, []).append(recno)
+            yield ruta_local
+        self.finished = True
+        if not self.defer:
+            self.commit()
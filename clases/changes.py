@@ -0,0 +1,114 @@
+import sys
+
+
+class Change:
+    """
+    Un registro modificado, sin dicts propios.
+
+    Las columnas se guardan como una tupla compartida por todos los cambios
+    con las mismas columnas, y los valores como tuplas en ese orden. Para
+    no romper el código que usaba los dicts anteriores, acepta
+    change["table"], change["record"], change["before"] y change["after"];
+    before y after se arman al momento de pedirlos.
+    """
+
+    __slots__ = ("table", "record", "columns", "old_values", "new_values")
+
+    KEYS = ("table", "record", "before", "after")
+
+    def __init__(self, table: str, record: int, columns: tuple, old_values: tuple, new_values: tuple):
+        self.table = table
+        self.record = record
+        self.columns = columns
+        self.old_values = old_values
+        self.new_values = new_values
+
+    @property
+    def before(self) -> dict:
+        return dict(zip(self.columns, self.old_values))
+
+    @property
+    def after(self) -> dict:
+        return dict(zip(self.columns, self.new_values))
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    def keys(self):
+        return self.KEYS
+
+    def __repr__(self):
+        return f"Change({self.table!r}, {self.record}, {self.before!r} -> {self.after!r})"
+
+
+class ChangeStore:
+    """
+    Lista compacta de cambios para corridas con cientos de miles de registros.
+
+    Cada cambio es un Change con __slots__ en lugar de tres dicts. Los
+    nombres de tabla y columna se internan, las tuplas de columnas se
+    comparten y las rutas se deduplican: miles de conceptos que apuntaban a
+    la misma carpeta guardan una sola copia de la ruta anterior y de la
+    nueva. Se recorre, se indexa y se mide con len() como una lista.
+    """
+
+    def __init__(self, changes=()):
+        self.__changes = []
+        self.__columns = {}
+        self.__values = {}
+        self.extend(changes)
+
+    def __value(self, value: str) -> str:
+        return self.__values.setdefault(value, value)
+
+    def add(self, table: str, record: int, before: dict, after: dict) -> Change:
+        columns = tuple(before)
+        return self.__append(
+            table, record, columns,
+            tuple(before[col] for col in columns),
+            tuple(after.get(col, before[col]) for col in columns)
+        )
+
+    def __append(self, table: str, record: int, columns: tuple, old_values: tuple, new_values: tuple) -> Change:
+        columns = self.__columns.get(columns) or self.__columns.setdefault(
+            columns, tuple(sys.intern(col) for col in columns)
+        )
+        change = Change(
+            sys.intern(table),
+            record,
+            columns,
+            tuple(self.__value(v) for v in old_values),
+            tuple(self.__value(v) for v in new_values)
+        )
+        self.__changes.append(change)
+        return change
+
+    def extend(self, changes):
+        """Agrega cambios de otro ChangeStore o dicts con table, record, before y after."""
+        for change in changes:
+            if isinstance(change, Change):
+                self.__append(change.table, change.record, change.columns, change.old_values, change.new_values)
+            else:
+                self.add(change["table"], change["record"], change["before"], change["after"])
+
+    def clear(self):
+        self.__changes = []
+        self.__columns = {}
+        self.__values = {}
+
+    def __len__(self):
+        return len(self.__changes)
+
+    def __bool__(self):
+        return bool(self.__changes)
+
+    def __iter__(self):
+        return iter(self.__changes)
+
+    def __getitem__(self, index):
+        return self.__changes[index]
@@ -0,0 +1,114 @@
+import datetime
+import json
+import os
+from pathlib import Path
+
+from clases.reader import DBFHeader, DBFFormatError
+
+
+def fingerprint(table_path: Path) -> dict:
+    """
+    Huella de una tabla: tamaño, fecha de modificación y número de registros
+    del encabezado DBF. Si la tabla cambia después de procesarse, la huella
+    deja de coincidir.
+    """
+    stat = os.stat(table_path)
+    try:
+        records = DBFHeader.read(table_path).record_count
+    except (DBFFormatError, OSError):
+        records = None
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "registros": records}
+
+
+class CheckpointManager:
+    """
+    Bitácora de avance (JSON Lines) con cada par (empresa, tabla) terminado.
+
+    La primera línea guarda la configuración de la corrida (basePath,
+    newBase y reglas adicionales); cada línea siguiente es una tabla completada con su huella:
+
+        {"empresa": "...", "tabla": "mgw10006.dbf", "size": ..., "mtime": ..., "registros": ...}
+
+    Al reanudar (--resume) se omiten las tablas cuya huella actual es igual a
+    la registrada. Si la configuración no coincide, la bitácora se ignora.
+    """
+
+    def __init__(self, checkpoint_path: Path):
+        self.checkpoint_path = Path(checkpoint_path)
+        self.completed = {}
+        self.__file = None
+
+    def open(self, path_manager, resume: bool = False):
+        config = {
+            "basePath": path_manager.basePath,
+            "newBase": path_manager.newBase,
+            "reglas": [[r["origen"], r["destino"]] for r in path_manager.rule_info()] or None
+        }
+
+        if resume and self.checkpoint_path.exists():
+            header = self.__load()
+            if header is None or {k: header.get(k) for k in config} != config:
+                print(f"Advertencia: {self.checkpoint_path} corresponde a otra configuración, se inicia desde cero")
+                self.completed = {}
+            else:
+                print(f"Reanudando: {len(self.completed)} tabla(s) completadas en la corrida anterior")
+                self.__drop_partial_line()
+                self.__file = open(self.checkpoint_path, "a", encoding="utf-8")
+                return self
+
+        self.completed = {}
+        self.__file = open(self.checkpoint_path, "w", encoding="utf-8")
+        self.__write(dict(config, checkpoint=1, creado=datetime.datetime.now().isoformat(timespec="seconds")))
+        return self
+
+    def __load(self):
+        header = None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # Última línea incompleta: el proceso se interrumpió al escribirla
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if header is None:
+                    header = obj
+                    continue
+                self.completed[(obj["empresa"], obj["tabla"])] = {
+                    k: obj.get(k) for k in ("size", "mtime", "registros")
+                }
+        return header
+
+    def __drop_partial_line(self):
+        """Quita la última línea si quedó a medias, para que la siguiente no se pegue a ella."""
+        with open(self.checkpoint_path, "r+b") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def is_done(self, empresa: str, tabla: str, table_path: Path) -> bool:
+        """True si la tabla se completó antes y no ha cambiado desde entonces."""
+        previous = self.completed.get((empresa, tabla))
+        if previous is None:
+            return False
+        try:
+            return fingerprint(table_path) == previous
+        except OSError:
+            return False
+
+    def mark_done(self, empresa: str, tabla: str, huella: dict):
+        self.completed[(empresa, tabla)] = huella
+        self.__write(dict(empresa=empresa, tabla=tabla, **huella))
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __write(self, obj: dict):
+        self.__file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self.__file.flush()
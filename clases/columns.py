@@ -0,0 +1,124 @@
+import json
+import re
+from pathlib import Path
+
+from clases.directory import DirectoryIndex
+from clases.reader import DBFHeader, DBFFormatError, DELETED_FLAG, decode_value
+
+# Ruta absoluta de Windows: unidad (C:\) o UNC (\\servidor\)
+PATH_SHAPE = re.compile(r"^(?:[A-Za-z]:[\\/]|\\\\[^\\/]+[\\/])")
+
+
+class ColumnDiscovery:
+    """
+    Descubre qué columnas de cada tabla guardan rutas.
+
+    Solo lee el encabezado (descriptores de campo) y una muestra pequeña de
+    registros de cada tabla, con lecturas puntuales en lugar de recorrer el
+    archivo: primeros registros y otros repartidos a lo largo de la tabla.
+    Una columna de tipo C se considera de rutas si algún valor de la
+    muestra es una ruta absoluta que contiene basePath o "empresas" (los
+    mismos textos que reconoce change_path).
+    """
+
+    def __init__(self, path_manager, sample_size: int = 32, min_length: int = 20):
+        self.sample_size = max(1, sample_size)
+        # Una ruta útil no cabe en campos más cortos
+        self.min_length = min_length
+        self.__pattern = re.compile(
+            "|".join(re.escape(p) for p in path_manager.search_patterns() if p),
+            re.IGNORECASE
+        )
+
+    def looks_like_path(self, value: str) -> bool:
+        return bool(value) and PATH_SHAPE.match(value) is not None and self.__pattern.search(value) is not None
+
+    def sample_recnos(self, record_count: int) -> list:
+        """Números de registro de la muestra: la mitad al inicio y el resto repartido."""
+        if record_count <= self.sample_size:
+            return list(range(1, record_count + 1))
+        head = self.sample_size // 2
+        rest = self.sample_size - head
+        step = (record_count - head) / rest
+        spread = {head + 1 + int(i * step) for i in range(rest)}
+        return sorted(set(range(1, head + 1)) | spread)
+
+    def scan_table(self, table_path: Path) -> list:
+        """Columnas de rutas de una tabla (en el orden del encabezado)."""
+        header = DBFHeader.read(table_path)
+        candidates = [
+            f for f in header.fields.values()
+            if f.type == "C" and f.length >= self.min_length
+        ]
+        if not candidates or not header.record_count:
+            return []
+
+        found = []
+        with open(table_path, "rb") as f:
+            for recno in self.sample_recnos(header.record_count):
+                f.seek(header.record_offset(recno))
+                record = f.read(header.record_length)
+                if len(record) < header.record_length:
+                    break
+                if record[0] == DELETED_FLAG:
+                    continue
+                for field in candidates:
+                    if field.name in found:
+                        continue
+                    raw = record[field.offset:field.offset + field.length]
+                    if self.looks_like_path(decode_value(raw, header.codepage)):
+                        found.append(field.name)
+                if len(found) == len(candidates):
+                    break
+
+        order = [f.name for f in candidates]
+        return sorted(found, key=order.index)
+
+    def scan_directory(self, index: DirectoryIndex, exclude=()) -> dict:
+        """
+        Columnas de rutas de todas las tablas .dbf de una carpeta.
+        Regresa {tabla_en_minusculas: [columnas]} solo con las tablas que tienen alguna.
+        """
+        exclude = {name.lower() for name in exclude}
+        result = {}
+        for table_path in index.tables():
+            name = table_path.name.lower()
+            if name in exclude:
+                continue
+            try:
+                columns = self.scan_table(table_path)
+            except (DBFFormatError, OSError):
+                continue
+            if columns:
+                result[name] = columns
+        return result
+
+
+def merge_maps(maps, base=None) -> dict:
+    """Une mapas {tabla: [columnas]} conservando el orden de aparición."""
+    merged = {}
+    for mapping in ([dict(base)] if base else []) + list(maps):
+        for table, columns in mapping.items():
+            current = merged.setdefault(table.lower(), [])
+            current.extend(c for c in columns if c not in current)
+    return merged
+
+
+def to_table_path(mapping: dict) -> list:
+    """Convierte un mapa {tabla: [columnas]} al formato de PathManager.tablePath."""
+    return [(table, list(columns)) for table, columns in sorted(mapping.items())]
+
+
+def save_map(path: Path, mapping: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(mapping, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def load_map(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    if not isinstance(mapping, dict) or not all(
+        isinstance(cols, list) and all(isinstance(c, str) for c in cols) for cols in mapping.values()
+    ):
+        raise ValueError(f"{path} no es un mapa {{tabla: [columnas]}}")
+    return {table.lower(): [c.upper() for c in cols] for table, cols in mapping.items()}
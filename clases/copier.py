@@ -0,0 +1,203 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from clases.backup import sha256_file
+
+CHUNK_SIZE = 4 * 1024 * 1024
+PART_SUFFIX = ".part"
+
+
+class FolderCopier:
+    """
+    Copia carpetas completas (p. ej. cada empresa a la base nueva) en
+    paralelo, por bloques y con verificación sha256.
+
+    Cada archivo se copia a un temporal .part calculando el sha256 del
+    origen mientras se lee; al terminar el destino se vuelve a leer y solo
+    si su sha256 coincide se renombra al nombre final y se registra en el
+    manifiesto (JSON Lines, una línea por archivo y otra por carpeta
+    completa). Para reanudar (resume=True):
+
+    - los archivos del manifiesto cuyo origen no cambió (tamaño y fecha) no
+      se vuelven a copiar, aunque el destino se haya modificado después
+      (p. ej. al reescribir sus rutas);
+    - un .part que quedó a medias se conserva hasta el último bloque que
+      coincide con el origen y la copia continúa desde ahí;
+    - las carpetas marcadas con mark_done() se omiten por completo.
+
+    Los archivos de todas las carpetas comparten un mismo pool de hilos,
+    así que copy_tree() puede llamarse desde varios hilos a la vez.
+    """
+
+    def __init__(self, manifest_path: Path, workers: int = 4, chunk_size: int = CHUNK_SIZE):
+        self.manifest_path = Path(manifest_path)
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.entries = {}
+        self.done = set()
+        self.copied = 0
+        self.skipped = 0
+        self.resumed_bytes = 0
+        self.bytes = 0
+        self.__file = None
+        self.__pool = None
+        self.__lock = threading.Lock()
+
+    def open(self, resume: bool = False) -> "FolderCopier":
+        self.entries = {}
+        self.done = set()
+        append = resume and self.manifest_path.exists()
+        if append:
+            for entry in self.read():
+                if "destino" in entry:
+                    self.entries[entry["destino"]] = entry
+                elif "carpeta" in entry:
+                    self.done.add(entry["carpeta"])
+        self.__file = open(self.manifest_path, "a" if append else "w", encoding="utf-8")
+        if not append:
+            self.__write({"copia": 1, "creado": datetime.datetime.now().isoformat(timespec="seconds")})
+        self.__pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self
+
+    def close(self):
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=True)
+            self.__pool = None
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self):
+        """Itera las líneas del manifiesto (sin el encabezado)."""
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if "destino" in obj or "carpeta" in obj:
+                    yield obj
+
+    def is_done(self, folder) -> bool:
+        return str(folder) in self.done
+
+    def mark_done(self, folder):
+        """Registra una carpeta como terminada (copiada y, en su caso, procesada)."""
+        with self.__lock:
+            self.done.add(str(folder))
+            self.__write({"carpeta": str(folder), "completa": True})
+
+    def copy_file(self, src: Path, dst: Path):
+        """
+        Copia y verifica un archivo. Regresa su entrada de manifiesto, o
+        None si ya estaba copiado y el origen no cambió. Lanza OSError si
+        la verificación falla o el origen cambia durante la copia.
+        """
+        src, dst = Path(src), Path(dst)
+        stat = os.stat(src)
+        previous = self.entries.get(str(dst))
+        if (previous is not None and previous["origen"] == str(src) and previous["size"] == stat.st_size
+                and previous["mtime"] == stat.st_mtime_ns and dst.exists()):
+            return None
+
+        part = dst.with_name(dst.name + PART_SUFFIX)
+        hasher = hashlib.sha256()
+        offset = 0
+        with open(src, "rb") as fsrc, open(part, "r+b" if part.exists() else "wb") as fdst:
+            # Continuar un .part previo: conservar los bloques completos que coinciden
+            part_size = os.fstat(fdst.fileno()).st_size
+            while offset + self.chunk_size <= part_size:
+                block = fsrc.read(self.chunk_size)
+                if block != fdst.read(self.chunk_size):
+                    break
+                hasher.update(block)
+                offset += len(block)
+            with self.__lock:
+                self.resumed_bytes += offset
+            fsrc.seek(offset)
+            fdst.seek(offset)
+            fdst.truncate()
+
+            for block in iter(lambda: fsrc.read(self.chunk_size), b""):
+                hasher.update(block)
+                fdst.write(block)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+
+        digest = hasher.hexdigest()
+        after = os.stat(src)
+        if (after.st_size, after.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            os.remove(part)
+            raise OSError(f"{src} cambió durante la copia")
+        if sha256_file(part) != digest:
+            os.remove(part)
+            raise OSError(f"La verificación sha256 de {dst} no coincide con el origen")
+
+        os.replace(part, dst)
+        shutil.copystat(src, dst)
+        entry = {
+            "origen": str(src),
+            "destino": str(dst),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha256": digest
+        }
+        with self.__lock:
+            self.entries[entry["destino"]] = entry
+            self.copied += 1
+            self.bytes += stat.st_size
+            self.__write(entry)
+        return entry
+
+    def copy_tree(self, src_dir: Path, dst_dir: Path) -> dict:
+        """
+        Copia una carpeta con sus subcarpetas. Regresa
+        {"copiados": n, "omitidos": n, "bytes": n, "errores": [(ruta, error)]}.
+        """
+        src_dir, dst_dir = Path(src_dir), Path(dst_dir)
+        summary = {"copiados": 0, "omitidos": 0, "bytes": 0, "errores": []}
+        futures = []
+        for root, dirs, files in os.walk(src_dir, onerror=lambda e: summary["errores"].append((e.filename, e))):
+            target = dst_dir / Path(root).relative_to(src_dir)
+            try:
+                target.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                summary["errores"].append((str(target), e))
+                dirs[:] = []
+                continue
+            for name in files:
+                futures.append((Path(root) / name, self.__pool.submit(self.copy_file, Path(root) / name, target / name)))
+
+        for src, future in futures:
+            try:
+                entry = future.result()
+            except OSError as e:
+                summary["errores"].append((str(src), e))
+                continue
+            if entry is None:
+                summary["omitidos"] += 1
+                with self.__lock:
+                    self.skipped += 1
+            else:
+                summary["copiados"] += 1
+                summary["bytes"] += entry["size"]
+        return summary
+
+    def __write(self, obj: dict):
+        self.__file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self.__file.flush()
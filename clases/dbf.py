@@ -1,13 +1,121 @@
+import itertools
+import re
 from pathlib import Path
 import dbf
 
+from clases.changes import ChangeStore
+from clases.metrics import Metrics
+from clases.reader import DBFReader, DBFFormatError, decode_value
+from clases.retry import is_lock_error
+from clases.writer import DBFWriter
+
+
+class DbfLibraryReader:
+    """
+    Adaptador con la misma interfaz de lectura que DBFReader, pero usando
+    la librería dbf. Se usa como respaldo cuando el lector rápido no
+    reconoce el formato del archivo.
+    """
+
+    def __init__(self, table_path: Path):
+        self.table_path = Path(table_path)
+        self.__table = None
+
+    def open(self):
+        self.__table = dbf.Table(str(self.table_path))
+        self.__table.open(mode=dbf.READ_ONLY)
+        return self
+
+    def close(self):
+        if self.__table is not None:
+            self.__table.close()
+            self.__table = None
+
+    def __enter__(self):
+        if self.__table is None:
+            self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def field_names(self) -> list:
+        return [name.upper() for name in self.__table.field_names]
+
+    def field_info(self, name: str):
+        return self.__table.field_info(name)
+
+    def __len__(self):
+        return len(self.__table)
+
+    def iter_values(self, columns: list, include_deleted: bool = False):
+        available = set(self.field_names)
+        cols = [c.upper() for c in columns if c.upper() in available]
+        for record_index, record in enumerate(self.__table, start=1):
+            if not include_deleted and dbf.is_deleted(record):
+                continue
+            values = {}
+            for col in cols:
+                try:
+                    values[col] = str(record[col] or "").strip()
+                except Exception:
+                    values[col] = ""
+            yield record_index, values
+
+
+def byte_pattern(text: str, codepage: str) -> bytes:
+    """
+    Patrón de bytes que encuentra text en una tabla como lo compara
+    change_path: cada separador acepta "/" o "\\" (las rutas se normalizan
+    antes de compararse) y las letras fuera de ASCII aceptan mayúsculas y
+    minúsculas, que re.IGNORECASE no iguala en bytes.
+    """
+    parts = []
+    for char in text:
+        if char in "\\/":
+            parts.append(rb"[\\/]")
+            continue
+        variants = {char, char.lower(), char.upper()}
+        encoded = sorted({v.encode(codepage, errors="replace") for v in variants})
+        if char.isascii() or len(encoded) == 1:
+            parts.append(re.escape(encoded[0]))
+        else:
+            parts.append(b"(?:" + b"|".join(re.escape(e) for e in encoded) + b")")
+    return b"".join(parts)
+
+
+def as_changes(table_path: Path, pending: list) -> list:
+    """Cambios de plan_info en el formato de update_info ({"table", "record", "before", "after"})."""
+    return [{
+        "table": Path(table_path).name,
+        "record": change["record"],
+        "before": change["before"],
+        "after": change["after"]
+    } for change in pending]
+
+
 class DBFManager:
     
-    def __init__(self):
+    # Registros que se leen y planean a la vez en update_info
+    BATCH_RECORDS = 4096
+    
+    def __init__(self, metrics: Metrics = None, output=print):
         self.__results = []
-        self.__changes = []
+        # Destino de los mensajes (advertencias, errores, cierre de tablas); en
+        # los workers se acumulan en el resultado para imprimirlos en orden
+        self.output = output
+        self.__changes = ChangeStore()
+        # Tiempos y contadores por tabla (desactivados salvo con --profile)
+        self.metrics = metrics if metrics is not None else Metrics()
+        # Tablas descartadas por el prefiltro sin abrirlas con dbf
+        self.skipped_tables = 0
+        # Último error de update_info (None si la tabla se procesó completa)
+        self.last_error = None
+        # Registros modificados por el último update_info
+        self.changed = 0
     
-    def extract_info(self, table_path: Path, path_manager, collect_paths: bool = False) -> list:
+    def extract_info(self, table_path: Path, path_manager, collect_paths: bool = False, records=None) -> list:
         """
         Extrae información de MGW00001.DBF (tabla maestra de empresas).
         
@@ -15,165 +123,385 @@ class DBFManager:
         independientemente de cómo estén configuradas en el DBF.
         
         Usa path_manager.get_absPath (ruta local completa) como base para construir las rutas.
+        Con records (números de registro) solo se leen esos registros.
         """
         self.__results = []
-        
+        if collect_paths:
+            self.__results = list(self.iter_info(table_path, path_manager, records))
+        return self.__results
+    
+    def iter_info(self, table_path: Path, path_manager, records=None, with_records: bool = False):
+        """
+        Forma generadora de extract_info: entrega la ruta local de cada
+        empresa en cuanto se lee su registro del catálogo, sin armar la
+        lista completa (la empresa puede empezar a procesarse mientras se
+        sigue leyendo el catálogo). Con with_records=True entrega
+        (número de registro, ruta local). Como con la librería dbf, los
+        registros marcados como borrados también se recorren.
+        """
+        if records is not None:
+            records = set(records)
         try:
-            with dbf.Table(str(table_path)) as table:
-                table.open(mode=dbf.READ_ONLY)
+            with self.open_reader(table_path) as reader:
+                if "CRUTADATOS" not in reader.field_names:
+                    raise KeyError("CRUTADATOS")
                 
-                for record in table:
-                    if collect_paths:
-                        # Obtener CRUTADATOS (ruta donde están los datos de la empresa)
-                        ruta_datos = (record["CRUTADATOS"] or "").strip()
-                        
-                        if not ruta_datos:
-                            continue
-                        
-                        # Normaliza la ruta
-                        ruta_norm = ruta_datos.replace("/", "\\")
-                        
-                        # ESTRATEGIA: Buscar la parte relativa después de "Empresas"
-                        # Ejemplo: "\\SERVIDOR\Compacw\Empresas\Empresa1" → "Empresa1"
-                        
-                        empresas_idx = ruta_norm.lower().rfind("empresas")
-                        
-                        if empresas_idx != -1:
-                            # Encentra "Empresas", y extraer lo que viene después
-                            after_empresas = ruta_norm[empresas_idx + len("empresas"):].lstrip("\\/")
-                            
-                            # Construir en ruta local usando absPath
-                            # absPath = "C:\Compacw\Empresas"
-                            # after_empresas = "Empresa1"
-                            # Resultado: "C:\Compacw\Empresas\Empresa1"
-                            ruta_local = path_manager.get_absPath() + "\\" + after_empresas
-                            self.__results.append(ruta_local)
-                        else:
-                            # No encontró "Empresas", intentar usar la ruta como está
-                            # si es absoluta
-                            if ":\\" in ruta_norm or ruta_norm.startswith("\\\\"):
-                                self.__results.append(ruta_norm)
-                        
+                for recno, values in reader.iter_values(["CRUTADATOS"], include_deleted=True):
+                    if records is not None and recno not in records:
+                        continue
+                    ruta_local = self.company_path(values["CRUTADATOS"], path_manager)
+                    if ruta_local:
+                        yield (recno, ruta_local) if with_records else ruta_local
+        
         except FileNotFoundError:
-            print(f"Error: Archivo no encontrado: {table_path}")
+            self.output(f"Error: Archivo no encontrado: {table_path}")
         except dbf.DbfError as e:
-            print(f"Error: Error DBF en {table_path}: {e}")
+            self.output(f"Error: Error DBF en {table_path}: {e}")
         except KeyError as e:
-            print(f"Error: Columna no encontrada: {e}")
+            self.output(f"Error: Columna no encontrada: {e}")
         except Exception as e:
-            print(f"Error: Error inesperado: {e}")
+            self.output(f"Error: Error inesperado: {e}")
+    
+    def company_path(self, ruta_datos: str, path_manager):
+        """Ruta local de una empresa a partir de su CRUTADATOS (None si no se puede construir)."""
+        # Obtener CRUTADATOS (ruta donde están los datos de la empresa)
+        if not ruta_datos:
+            return None
         
-        return self.__results
+        # Normaliza la ruta
+        ruta_norm = ruta_datos.replace("/", "\\")
+        
+        # ESTRATEGIA: Buscar la parte relativa después de "Empresas"
+        # Ejemplo: "\\SERVIDOR\Compacw\Empresas\Empresa1" → "Empresa1"
+        
+        empresas_idx = ruta_norm.lower().rfind("empresas")
+        
+        if empresas_idx != -1:
+            # Encentra "Empresas", y extraer lo que viene después
+            after_empresas = ruta_norm[empresas_idx + len("empresas"):].lstrip("\\/")
+            
+            # Construir en ruta local usando absPath
+            # absPath = "C:\Compacw\Empresas"
+            # after_empresas = "Empresa1"
+            # Resultado: "C:\Compacw\Empresas\Empresa1"
+            return path_manager.get_absPath() + "\\" + after_empresas
+        
+        # No encontró "Empresas", intentar usar la ruta como está
+        # si es absoluta
+        if ":\\" in ruta_norm or ruta_norm.startswith("\\\\"):
+            return ruta_norm
+        return None
     
-    def update_info(self, table_path: Path, columns: list, path_manager) -> list:
+    def open_reader(self, table_path: Path):
         """
-        Actualiza columnas de tipo ruta en una tabla DBF.
+        Abre una tabla para lectura con DBFReader (archivo mapeado en memoria).
+        
+        Si el encabezado no se puede interpretar, recurre a la librería dbf.
         """
-        self.__changes = []
-        table = None
+        try:
+            return DBFReader(table_path).open()
+        except DBFFormatError as e:
+            self.output(f"Advertencia: Lector rápido no disponible para {Path(table_path).name} ({e}), usando dbf")
+            return DbfLibraryReader(table_path).open()
+    
+    def needs_rewrite(self, table_path: Path, path_manager) -> bool:
+        """
+        Prefiltro a nivel de bytes: indica si algún registro de la tabla podría
+        cambiar con change_path.
         
+        Busca en los bytes crudos de los registros (en el codepage de la tabla)
+        los textos que change_path reconoce (basePath, "empresas" y los
+        prefijos de las reglas) sin distinguir mayúsculas y con "/" o "\\"
+        como separador, también en registros borrados (se reescriben igual
+        que los demás). Las apariciones en campos que ya empiezan con
+        el prefijo destino exacto (rutas ya migradas, sin "/" ni barras
+        dobles que change_path normalizaría) o con la base nueva de una
+        regla (migrated_by_rule) no cuentan.
+        Si no queda ninguna, ningún registro puede cambiar. Ante cualquier duda
+        regresa True.
+        """
         try:
-            # Estrategia: Abrir SIN el context manager para un control total
-            table = dbf.Table(str(table_path))
-            table.open(mode=dbf.READ_WRITE)
-            
+            with DBFReader(table_path) as reader:
+                codepage = reader.codepage
+                patterns = [byte_pattern(p, codepage) for p in path_manager.search_patterns() if p]
+                pattern = re.compile(b"|".join(patterns), re.IGNORECASE)
+                prefix = path_manager.target_prefix().encode(codepage, errors="replace")
+                fields = list(reader.header.fields.values())
+                
+                for match in reader.finditer(pattern):
+                    # Campo que contiene la coincidencia
+                    recno = reader.recno_at(match.start())
+                    record_start = reader.header.record_offset(recno)
+                    relative = match.start() - record_start
+                    field = next((f for f in fields if f.offset <= relative < f.offset + f.length), None)
+                    if field is None:
+                        return True
+                    field_start = record_start + field.offset
+                    field_end = field_start + field.length
+                    
+                    # ¿El campo ya empieza con el prefijo destino exacto?
+                    if reader.find(prefix, field_start, field_end) != field_start:
+                        # ¿O con la base nueva de una regla?
+                        value = decode_value(reader.read_bytes(field_start, field_end), codepage)
+                        if path_manager.migrated_by_rule(value):
+                            continue
+                        return True
+                    # change_path aún normaliza "/" y barras dobles en el resto de la ruta
+                    rest_start = field_start + len(prefix) - 1
+                    if (reader.find(b"/", rest_start, field_end) != -1
+                            or reader.find(b"\\\\", rest_start, field_end) != -1):
+                        return True
+                return False
+        except (DBFFormatError, UnicodeError, re.error):
+            return True
+    
+    def plan_info(self, table_path: Path, columns: list, path_manager, records=None) -> list:
+        """
+        Calcula, en solo lectura, los cambios que update_info aplicaría a una tabla.
+        
+        Regresa una lista con un elemento por registro a modificar:
+            {"record": n, "before": {...}, "after": {...},
+             "updates": {col: valor}, "truncated": {col: longitud_original}}
+        
+        "truncated" contiene los campos cuyo valor nuevo no cabe en el campo
+        y se recortó a su longitud. Los registros marcados como borrados se
+        incluyen (como al recorrer la tabla con la librería dbf), para que un
+        registro recuperado no conserve la ruta anterior. Las tablas que el
+        prefiltro (needs_rewrite) descarta ni siquiera se recorren. Con
+        records (números de registro) solo se consideran esos registros.
+        """
+        return [change for batch in self.iter_plan(table_path, columns, path_manager, records) for change in batch]
+    
+    def iter_plan(self, table_path: Path, columns: list, path_manager, records=None):
+        """
+        Como plan_info, pero entrega los cambios por lotes de BATCH_RECORDS
+        registros leídos: la memoria no crece con el tamaño de la tabla.
+        """
+        metrics = self.metrics
+        metrics.begin(Path(table_path).name)
+        
+        with metrics.timer("prefiltro"):
+            needed = self.needs_rewrite(table_path, path_manager)
+        if not needed:
+            self.skipped_tables += 1
+            return
+        
+        with metrics.timer("abrir"):
+            reader = self.open_reader(table_path)
+        with reader:
             # Obtener los campos disponibles
-            available_fields = set(table.field_names)
+            available_fields = set(reader.field_names)
+            field_lengths = {
+                col: reader.field_info(col).length
+                for col in columns if col in available_fields
+            }
+            if records is not None:
+                records = set(records)
             
-            # Iterar sobre cada registro
-            record_index = 0
-            for record in table:
-                record_index += 1
-                before = {}
-                after = {}
-                updates_to_apply = {}
+            values_iter = reader.iter_values(columns, include_deleted=True)
+            while True:
+                with metrics.timer("lectura"):
+                    rows = list(itertools.islice(values_iter, self.BATCH_RECORDS))
+                if not rows:
+                    break
+                if records is not None:
+                    rows = [row for row in rows if row[0] in records]
+                metrics.add("registros", len(rows))
                 
-                # FASE 1: Determina qué hay que cambiar
-                for col in columns:
-                    if col not in available_fields:
-                        continue
+                planned = self.__plan_rows(rows, columns, field_lengths, path_manager)
+                if metrics.enabled:
+                    metrics.add("campos_reescritos", sum(len(change["updates"]) for change in planned))
+                    metrics.add("truncados", sum(len(change["truncated"]) for change in planned))
+                if planned:
+                    yield planned
+    
+    def __plan_rows(self, rows: list, columns: list, field_lengths: dict, path_manager) -> list:
+        planned = []
+        
+        # Transforma cada columna en un solo lote (change_paths memoriza rutas repetidas)
+        with self.metrics.timer("change_path"):
+            updated_by_col = {
+                col: path_manager.change_paths(
+                    [values.get(col, "") for _, values in rows],
+                    new_base=path_manager.newBase
+                )
+                for col in columns if col in field_lengths
+            }
+        
+        for i, (record_index, values) in enumerate(rows):
+            before = {}
+            after = {}
+            updates_to_apply = {}
+            truncated = {}
+            
+            for col, updated_col in updated_by_col.items():
+                original = values.get(col, "")
+                
+                if not original:
+                    continue
+                
+                updated = updated_col[i]
+                
+                # Registrar
+                before[col] = original
+                after[col] = updated
+                
+                # Solo si hay cambio real
+                if updated != original:
+                    # Verificar longitud del campo
+                    max_len = field_lengths[col]
                     
-                    # Lee el valor actual
-                    try:
-                        original = str(record[col] or "").strip()
-                    except:
-                        original = ""
+                    if len(updated) > max_len:
+                        truncated[col] = len(updated)
+                        updated = updated[:max_len]
+                        after[col] = updated
                     
-                    if not original:
-                        continue
+                    updates_to_apply[col] = updated
+            
+            if updates_to_apply:
+                planned.append({
+                    "record": record_index,
+                    "before": before,
+                    "after": after,
+                    "updates": updates_to_apply,
+                    "truncated": truncated
+                })
+        
+        return planned
+    
+    def update_info(self, table_path: Path, columns: list, path_manager, records=None, on_apply=None) -> ChangeStore:
+        """
+        Actualiza columnas de tipo ruta en una tabla DBF.
+        
+        La tabla se recorre primero en solo lectura con el lector rápido
+        (iter_plan); solo si algún registro requiere cambios se abre para
+        escritura. Los cambios se aplican parchando únicamente los bytes de
+        cada campo (DBFWriter); la librería dbf queda como respaldo.
+        
+        Regresa los cambios aplicados en un ChangeStore (se recorre como la
+        lista de dicts {"table", "record", "before", "after"} de antes).
+        Con records solo se actualizan esos números de registro.
+        
+        Con on_apply los cambios se entregan por lotes, en ese mismo formato,
+        antes de escribir cada lote (para registrarlos en la bitácora); con
+        la escritura directa no se conservan en el ChangeStore, así que la
+        memoria no crece con la tabla. changed es siempre el número de
+        registros modificados.
+        """
+        self.__changes = ChangeStore()
+        self.changed = 0
+        self.last_error = None
+        plan = None
+        
+        try:
+            # FASE 1: Determina qué hay que cambiar (solo lectura), un lote a la vez
+            plan = self.iter_plan(table_path, columns, path_manager, records)
+            first = next(plan, None)
+            if first is None:
+                return self.__changes
+            batches = itertools.chain([first], plan)
+            
+            # FASE 2: Aplicar cambios (la tabla solo se abre para escritura si hay alguno)
+            try:
+                self.__apply_patches(table_path, columns, batches, on_apply)
+                return self.__changes
+            except DBFFormatError as e:
+                self.output(f"Advertencia: Escritura directa no disponible para {table_path.name} ({e}), usando dbf")
+            pending = [change for batch in batches for change in batch]
+            self.__warn_truncated(pending)
+            self.apply_with_dbf(table_path, pending, on_apply)
+            
+        except FileNotFoundError as e:
+            self.last_error = e
+            self.output(f"Error: Archivo no encontrado: {table_path}")
+        except dbf.DbfError as e:
+            self.last_error = e
+            if is_lock_error(e):
+                self.output(f"Advertencia: {table_path.name} está en uso por otro programa ({e})")
+            else:
+                self.output(f"Error: Error DBF en {table_path}: {e}")
+        except Exception as e:
+            self.last_error = e
+            if is_lock_error(e):
+                self.output(f"Advertencia: {table_path.name} está en uso por otro programa ({e})")
+            else:
+                self.output(f"Error: Error inesperado en {table_path}: {e}")
+                import traceback
+                self.output(traceback.format_exc().rstrip())
+        finally:
+            # Libera el lector si la escritura falló antes de recorrer toda la tabla
+            if plan is not None:
+                plan.close()
+        
+        return self.__changes
+    
+    def __warn_truncated(self, pending: list):
+        for change in pending:
+            for col, full_len in change["truncated"].items():
+                self.output(f"Advertencia:  Truncando {col}: {full_len} → {len(change['updates'][col])} chars")
+    
+    def apply_with_dbf(self, table_path: Path, pending: list, on_apply=None) -> ChangeStore:
+        """
+        Aplica cambios en el formato de plan_info con la librería dbf.
+        
+        Es el respaldo de la escritura directa para tablas que DBFWriter no
+        reconoce; cada registro se intenta con asignación directa y, si
+        falla, con dbf.write. on_apply recibe los cambios (formato de
+        as_changes) ya con la tabla abierta y antes de escribir el primero.
+        Regresa los cambios aplicados (la lista completa ya está en memoria).
+        """
+        self.__changes = ChangeStore()
+        self.changed = 0
+        table = None
+        try:
+            self.metrics.add("metodo_dbf")
+            
+            # Estrategia: Abrir SIN el context manager para un control total
+            with self.metrics.timer("abrir"):
+                table = dbf.Table(str(table_path))
+                table.open(mode=dbf.READ_WRITE)
+            
+            if on_apply is not None:
+                on_apply(as_changes(table_path, pending))
+            
+            for change in pending:
+                record_index = change["record"]
+                before = change["before"]
+                after = change["after"]
+                updates_to_apply = change["updates"]
+                record = table[record_index - 1]
+                try:
+                    # MÉTODO 1: Context manager con asignación directa
+                    with record as rec:
+                        for col, value in updates_to_apply.items():
+                            rec[col] = value
                     
-                    # Transforma esta ruta
-                    updated = path_manager.change_path(
-                        original, 
-                        new_base=path_manager.newBase
-                    )
+                    # Registrar cambio exitoso
+                    self.__record(table_path, change, keep=True)
                     
-                    # Registrar
-                    before[col] = original
-                    after[col] = updated
+                except Exception as e1:
+                    self.output(f"Advertencia:  Método 1 falló para registro {record_index}: {e1}")
                     
-                    # Solo si hay cambio real
-                    if updated != original:
-                        # Verificar longitud del campo
-                        field_info = table.field_info(col)
-                        max_len = field_info.length
-                        
-                        if len(updated) > max_len:
-                            print(f"Advertencia:  Truncando {col}: {len(updated)} → {max_len} chars")
-                            updated = updated[:max_len]
-                            after[col] = updated
-                        
-                        updates_to_apply[col] = updated
-                
-                # FASE 2: Aplicar cambios si hay alguno
-                if updates_to_apply:
+                    # MÉTODO 2: Scatter assignment (dbf alternativo)
+                    self.metrics.add("metodo_2")
                     try:
-                        # MÉTODO 1: Context manager con asignación directa
-                        with record as rec:
-                            for col, value in updates_to_apply.items():
-                                rec[col] = value
-                        
-                        # Registrar cambio exitoso
-                        self.__changes.append({
-                            "table": table_path.name,
-                            "record": record_index,
-                            "before": before,
-                            "after": after
-                        })
-                        
-                    except Exception as e1:
-                        print(f"Advertencia:  Método 1 falló para registro {record_index}: {e1}")
+                        dbf.write(record, **updates_to_apply)
                         
-                        # MÉTODO 2: Scatter assignment (dbf alternativo)
-                        try:
-                            dbf.write(record, **updates_to_apply)
-                            
-                            self.__changes.append({
-                                "table": table_path.name,
-                                "record": record_index,
-                                "before": before,
-                                "after": after
-                            })
-                        except Exception as e2:
-                            print(f"Error: Método 2 también falló: {e2}")
-                            print(f"   Registro: {record_index}")
-                            print(f"   Cambios intentados: {list(updates_to_apply.keys())}")
+                        self.__record(table_path, change, keep=True)
+                    except Exception as e2:
+                        self.last_error = e2
+                        self.output(f"Error: Método 2 también falló: {e2}")
+                        self.output(f"   Registro: {record_index}")
+                        self.output(f"   Cambios intentados: {list(updates_to_apply.keys())}")
             
             # Cierra la tabla explícitamente
-            print(f"Cerrando tabla: {table_path.name}")
-            table.close()
-            print(f"Tabla cerrada correctamente")
-            
-        except FileNotFoundError:
-            print(f"Error: Archivo no encontrado: {table_path}")
-        except dbf.DbfError as e:
-            print(f"Error: Error DBF en {table_path}: {e}")
-        except Exception as e:
-            print(f"Error: Error inesperado en {table_path}: {e}")
-            import traceback
-            traceback.print_exc()
+            self.output(f"Cerrando tabla: {table_path.name}")
+            with self.metrics.timer("cerrar"):
+                table.close()
+            self.output(f"Tabla cerrada correctamente")
+        
         finally:
-            # Esto asegura el cierre incluso si hay algunerror
+            # Esto asegura el cierre incluso si hay algún error
             if table is not None:
                 try:
                     if not table.status.closed:
@@ -183,6 +511,48 @@ class DBFManager:
         
         return self.__changes
     
+    def __record(self, table_path: Path, change: dict, keep: bool):
+        """Cuenta un registro modificado y, con keep, lo conserva en el ChangeStore."""
+        self.changed += 1
+        if keep:
+            self.__changes.add(table_path.name, change["record"], change["before"], change["after"])
+    
+    def __apply_patches(self, table_path: Path, columns: list, batches, on_apply=None):
+        """
+        Aplica los cambios pendientes escribiendo solo los bytes de cada campo.
+        
+        Las columnas se validan antes de escribir el primer campo, de modo que
+        un formato no soportado no deja la tabla a medio actualizar. Cada
+        lote se entrega a on_apply antes de escribirse.
+        """
+        metrics = self.metrics
+        writer = DBFWriter(table_path)
+        with metrics.timer("abrir"):
+            writer.open()
+        try:
+            for col in columns:
+                if col.upper() in writer.header.fields:
+                    writer.encode(col, "")
+            
+            for pending in batches:
+                self.__warn_truncated(pending)
+                if on_apply is not None:
+                    on_apply(as_changes(table_path, pending))
+                with metrics.timer("escritura"):
+                    for change in pending:
+                        for col, value in change["updates"].items():
+                            writer.patch(change["record"], col, value)
+                        
+                        self.__record(table_path, change, keep=on_apply is None)
+            
+            self.output(f"Cerrando tabla: {table_path.name}")
+        finally:
+            # close() escribe la fecha del encabezado y hace fsync
+            with metrics.timer("cerrar"):
+                writer.close()
+        metrics.add("bytes_escritos", writer.bytes_written)
+        self.output(f"Tabla cerrada correctamente")
+    
     def get_detailed_log(self) -> str:
         """Genera un log detallado de todos los cambios realizados."""
         if not self.__changes:
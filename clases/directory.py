@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+
+# Archivos que acompañan a una tabla DBF (memo e índices) con el mismo nombre
+COMPANION_SUFFIXES = (".fpt", ".dbt", ".cdx", ".mdx", ".idx", ".ntx")
+
+
+class DirectoryIndex:
+    """
+    Índice de los archivos de una carpeta sin distinguir mayúsculas.
+
+    La carpeta se lista una sola vez con os.scandir; después resolve() y
+    companions() responden desde memoria, sin un stat por archivo (costoso
+    en carpetas compartidas). Así mgw10006.dbf se encuentra aunque en disco
+    se llame MGW10006.DBF (montajes que distinguen mayúsculas).
+    """
+
+    def __init__(self, path: Path, names=()):
+        self.path = Path(path)
+        # nombre en minúsculas → nombre real en disco
+        self.files = {}
+        # nombre base en minúsculas → [nombres reales] (tablas y acompañantes)
+        self.__stems = {}
+        for name in names:
+            self.add(name)
+
+    @classmethod
+    def scan(cls, path: Path, include_dirs: bool = False) -> "DirectoryIndex":
+        """
+        Lista la carpeta (solo archivos, o también subcarpetas con
+        include_dirs). Lanza OSError si no es accesible.
+        """
+        index = cls(path)
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() or (include_dirs and entry.is_dir()):
+                        index.add(entry.name)
+                except OSError:
+                    continue
+        return index
+
+    def add(self, name: str):
+        lower = name.lower()
+        self.files[lower] = name
+        self.__stems.setdefault(os.path.splitext(lower)[0], []).append(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def resolve(self, name: str):
+        """Ruta real de un archivo de la carpeta, o None si no existe."""
+        actual = self.files.get(name.lower())
+        return self.path / actual if actual is not None else None
+
+    def tables(self) -> list:
+        """Rutas de todas las tablas .dbf de la carpeta, ordenadas por nombre."""
+        return [self.path / name for lower, name in sorted(self.files.items()) if lower.endswith(".dbf")]
+
+    def companions(self, name: str) -> list:
+        """Archivos de memo e índice de una tabla (mismo nombre, otra extensión)."""
+        stem = os.path.splitext(name.lower())[0]
+        return [
+            self.path / actual
+            for actual in sorted(self.__stems.get(stem, []))
+            if os.path.splitext(actual.lower())[1] in COMPANION_SUFFIXES
+        ]
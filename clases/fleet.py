@@ -0,0 +1,89 @@
+import configparser
+from pathlib import Path
+
+from clases.path import PathManager
+from clases.rules import RuleSet
+
+
+class FleetManager:
+    """
+    Configuración del modo flota: varias instalaciones de Compacw que se
+    procesan en una sola corrida, sin preguntas interactivas.
+
+    El archivo es un INI con una sección [flota] opcional y una sección por
+    instalación:
+
+        [flota]
+        max_workers = 16          ; límite global de empresas en paralelo
+        workers_por_raiz = 4      ; límite por instalación (por defecto)
+
+        [ClienteA]
+        letterBase = E
+        basePath = ClienteA\\Compacw\\Empresas
+        server = SERVIDOR1        ; vacío o ausente = modo LOCAL
+        share = Compacw\\Empresas ; ruta en red (opcional)
+        workers = 2               ; límite propio (opcional)
+        rules = reglas_a.txt      ; reglas adicionales (opcional, ver RuleSet), relativa al INI
+
+    Cada instalación usa su propia bitácora de avance y de cambios
+    (<seccion>.checkpoint.jsonl y <seccion>.jsonl) salvo que se indiquen
+    con checkpoint = ... y journal = ...
+    """
+
+    GLOBAL_SECTION = "flota"
+
+    def __init__(self, config_path: Path, rules_path: Path = None):
+        self.config_path = Path(config_path)
+        # Reglas para las instalaciones que no definen las suyas
+        self.rules_path = rules_path
+        self.max_workers = 8
+        self.workers_per_root = 2
+        self.roots = []
+
+    def load(self):
+        parser = configparser.ConfigParser(inline_comment_prefixes=(";", "#"))
+        # Conservar mayúsculas en las claves (letterBase, basePath)
+        parser.optionxform = str
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            parser.read_file(f)
+
+        if parser.has_section(self.GLOBAL_SECTION):
+            section = parser[self.GLOBAL_SECTION]
+            self.max_workers = max(1, section.getint("max_workers", self.max_workers))
+            self.workers_per_root = max(1, section.getint("workers_por_raiz", self.workers_per_root))
+
+        self.roots = []
+        for name in parser.sections():
+            if name == self.GLOBAL_SECTION:
+                continue
+            section = parser[name]
+
+            letter = section.get("letterBase", "C").strip() or "C"
+            base = section.get("basePath", "Compacw\\Empresas").strip() or "Compacw\\Empresas"
+            if len(letter) != 1:
+                raise ValueError(f"[{name}] letterBase debe ser una sola letra: {letter!r}")
+
+            path_manager = PathManager(letterBase=letter, basePath=base)
+            server = section.get("server", "").strip()
+            share = section.get("share", "").strip()
+            path_manager.set_target(hostname=server or None, netPath=share if len(share) > 1 else None)
+            rules_path = section.get("rules", "").strip()
+            if rules_path:
+                # Relativa a la carpeta del archivo de configuración, no a la carpeta actual
+                rules_path = self.config_path.parent / rules_path
+            else:
+                rules_path = self.rules_path
+            if rules_path:
+                path_manager.set_rules(RuleSet.load(rules_path))
+
+            self.roots.append({
+                "nombre": name,
+                "path_manager": path_manager,
+                "workers": max(1, section.getint("workers", self.workers_per_root)),
+                "checkpoint": section.get("checkpoint", f"{name}.checkpoint.jsonl"),
+                "journal": section.get("journal", f"{name}.jsonl")
+            })
+
+        if not self.roots:
+            raise ValueError(f"{self.config_path} no define ninguna instalación")
+        return self.roots
@@ -0,0 +1,197 @@
+import datetime
+import ntpath
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from clases.checkpoint import fingerprint
+from clases.reader import DBFReader, DBFFormatError
+from clases.rules import normalize_prefix
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tablas (
+    id INTEGER PRIMARY KEY,
+    empresa TEXT NOT NULL,
+    tabla TEXT NOT NULL,
+    ruta_tabla TEXT NOT NULL UNIQUE,
+    columnas TEXT NOT NULL,
+    size INTEGER,
+    mtime INTEGER,
+    registros INTEGER,
+    actualizado TEXT
+);
+CREATE TABLE IF NOT EXISTS rutas (
+    tabla_id INTEGER NOT NULL REFERENCES tablas(id) ON DELETE CASCADE,
+    empresa TEXT NOT NULL,
+    tabla TEXT NOT NULL,
+    registro INTEGER NOT NULL,
+    columna TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    prefijo TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rutas_empresa ON rutas(empresa);
+CREATE INDEX IF NOT EXISTS rutas_tabla_columna ON rutas(tabla, columna);
+CREATE INDEX IF NOT EXISTS rutas_prefijo ON rutas(prefijo);
+CREATE INDEX IF NOT EXISTS rutas_tabla_id ON rutas(tabla_id);
+"""
+
+
+def base_prefix(path: str, base_path: str = "Compacw\\Empresas") -> str:
+    """
+    Prefijo base normalizado de una ruta (minúsculas, barras invertidas):
+    hasta basePath o la carpeta "empresas" si aparece; si no, la unidad o el
+    recurso compartido con su primera carpeta.
+
+        \\\\ANTERIOR\\Compacw\\Empresas\\Emp1\\f.frm → \\\\anterior\\compacw\\empresas
+        D:\\Formatos\\factura.rdl                   → d:\\formatos
+    """
+    path = normalize_prefix(path).lower()
+    for marker in (normalize_prefix(base_path).lower(), "empresas"):
+        index = path.find(marker) if marker else -1
+        if index != -1:
+            return path[:index + len(marker)]
+    if path.startswith("\\\\"):
+        return "\\\\" + "\\".join(path[2:].split("\\")[:2])
+    drive, rest = ntpath.splitdrive(path)
+    first = rest.lstrip("\\").split("\\")[0]
+    return f"{drive}\\{first}" if drive and first else drive
+
+
+class PathInventory:
+    """
+    Inventario local (SQLite) de todas las rutas configuradas en el catálogo
+    y en las tablas de cada empresa, en solo lectura.
+
+    Cada tabla se registra con su huella (tamaño, fecha de modificación y
+    registros del encabezado) y las columnas leídas; al actualizar, solo se
+    vuelven a leer las tablas cuya huella o columnas cambiaron. Las tablas y
+    empresas que ya no existen se eliminan. Una vez construido, cualquier
+    pregunta es una consulta SQL, por ejemplo:
+
+        SELECT DISTINCT empresa FROM rutas WHERE prefijo LIKE '\\\\anterior%';
+        SELECT COUNT(DISTINCT ruta) FROM rutas WHERE columna = 'CREPIMPCFD';
+    """
+
+    def __init__(self, db_path: Path, base_path: str = "Compacw\\Empresas", workers: int = 4):
+        self.db_path = Path(db_path)
+        self.base_path = base_path
+        self.workers = max(1, workers)
+        self.refreshed = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.errors = []
+        self.__db = None
+
+    def open(self) -> "PathInventory":
+        self.__db = sqlite3.connect(str(self.db_path))
+        self.__db.execute("PRAGMA foreign_keys = ON")
+        self.__db.executescript(SCHEMA)
+        return self
+
+    def close(self):
+        if self.__db is not None:
+            self.__db.close()
+            self.__db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_table(self, table_path: Path, columns: list) -> list:
+        """Rutas no vacías de una tabla: [(registro, columna, ruta)]."""
+        with DBFReader(table_path) as reader:
+            columns = [c for c in columns if c in reader.field_names]
+            return [
+                (recno, col, value)
+                for recno, values in reader.iter_values(columns)
+                for col, value in values.items() if value
+            ]
+
+    def refresh(self, tables) -> "PathInventory":
+        """
+        Actualiza el inventario con tables = [(empresa, ruta_tabla, [columnas])].
+        Las tablas del inventario que no aparecen en la lista se eliminan; las
+        que no se pudieron leer quedan en errors y conservan sus rutas
+        anteriores.
+        """
+        db = self.__db
+        known = {
+            row[0]: row[1:]
+            for row in db.execute("SELECT ruta_tabla, id, columnas, size, mtime, registros FROM tablas")
+        }
+        pending = []
+        for empresa, table_path, columns in tables:
+            try:
+                huella = fingerprint(table_path)
+            except OSError as e:
+                # Ilegible por ahora (p. ej. carpeta compartida desconectada): no se elimina
+                known.pop(str(table_path), None)
+                self.errors.append((str(table_path), e))
+                continue
+            columnas = ",".join(columns)
+            previous = known.pop(str(table_path), None)
+            if previous is not None and tuple(previous[1:]) == (
+                columnas, huella["size"], huella["mtime"], huella["registros"]
+            ):
+                self.unchanged += 1
+                continue
+            pending.append((empresa, Path(table_path), columns, huella))
+
+        # Lectura en paralelo; SQLite se escribe solo desde este hilo
+        def read(item):
+            try:
+                return item, self.read_table(item[1], item[2]), None
+            except (OSError, DBFFormatError) as e:
+                return item, None, e
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for (empresa, table_path, columns, huella), rows, error in pool.map(read, pending):
+                if error is not None:
+                    self.errors.append((str(table_path), error))
+                    continue
+                self.__store(empresa, table_path, columns, huella, rows)
+                self.refreshed += 1
+
+        with db:
+            for table_id, *_ in known.values():
+                db.execute("DELETE FROM tablas WHERE id = ?", (table_id,))
+                self.removed += 1
+        return self
+
+    def __store(self, empresa: str, table_path: Path, columns: list, huella: dict, rows: list):
+        tabla = table_path.name.lower()
+        with self.__db as db:
+            db.execute("DELETE FROM tablas WHERE ruta_tabla = ?", (str(table_path),))
+            cursor = db.execute(
+                "INSERT INTO tablas (empresa, tabla, ruta_tabla, columnas, size, mtime, registros, actualizado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (empresa, tabla, str(table_path), ",".join(columns), huella["size"], huella["mtime"],
+                 huella["registros"], datetime.datetime.now().isoformat(timespec="seconds"))
+            )
+            table_id = cursor.lastrowid
+            db.executemany(
+                "INSERT INTO rutas (tabla_id, empresa, tabla, registro, columna, ruta, prefijo) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((table_id, empresa, tabla, recno, col, value, base_prefix(value, self.base_path))
+                 for recno, col, value in rows)
+            )
+
+    def histogram(self, limit: int = None) -> list:
+        """
+        Prefijos base de mayor a menor uso: [(prefijo, rutas, rutas distintas, empresas)].
+        Las empresas no cuentan el catálogo (empresa "").
+        """
+        query = (
+            "SELECT prefijo, COUNT(*), COUNT(DISTINCT ruta), COUNT(DISTINCT NULLIF(empresa, '')) "
+            "FROM rutas GROUP BY prefijo ORDER BY COUNT(*) DESC, prefijo"
+        )
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return self.__db.execute(query).fetchall()
+
+    def totals(self) -> dict:
+        tablas, empresas = self.__db.execute("SELECT COUNT(*), COUNT(DISTINCT NULLIF(empresa, '')) FROM tablas").fetchone()
+        rutas, distintas = self.__db.execute("SELECT COUNT(*), COUNT(DISTINCT ruta) FROM rutas").fetchone()
+        return {"tablas": tablas, "empresas": empresas, "rutas": rutas, "distintas": distintas}
@@ -0,0 +1,278 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+
+
+class JournalManager:
+    """
+    Bitácora de cambios de solo anexado (JSON Lines, opcionalmente gzip).
+
+    Cada cambio se escribe en cuanto se conoce, con una línea por registro
+    modificado:
+
+        {"empresa": "Empresa1", "path": "C:\\...\\Empresa1", "tabla": "mgw10006.dbf",
+         "ruta_tabla": "C:\\...\\Empresa1\\mgw10006.dbf", "registro": 12,
+         "antes": {...}, "despues": {...}}
+
+    Los cambios del catálogo MGW00001 usan empresa "". En memoria solo se
+    conserva un búfer pequeño; los resúmenes y el log de texto se generan
+    leyendo la bitácora de vuelta con read().
+
+    Los workers (hilos o procesos) escriben los cambios de cada tabla antes
+    de modificarla en una parte propia de la empresa (part_path, JSON Lines
+    sin comprimir en la carpeta <bitácora>.partes); main las integra con
+    merge() al terminar cada empresa. Las partes que quedan de una corrida
+    interrumpida se integran al abrir la bitácora (recover).
+    """
+
+    BUFFER_SIZE = 256
+
+    def __init__(self, journal_path: Path, compress: bool = False):
+        journal_path = Path(journal_path)
+        if compress and journal_path.suffix != ".gz":
+            journal_path = journal_path.with_name(journal_path.name + ".gz")
+        self.journal_path = journal_path
+        self.compress = journal_path.suffix == ".gz"
+        self.count = 0
+        self.__buffer = []
+        self.__file = None
+
+    def __open_file(self, mode: str):
+        if self.compress:
+            return gzip.open(self.journal_path, mode + "t", encoding="utf-8")
+        return open(self.journal_path, mode, encoding="utf-8")
+
+    def open(self, append: bool = False):
+        """
+        Abre la bitácora para escribir. Sin append nunca se sobrescribe una
+        bitácora con cambios (es lo único que usa --rollback): si ya existe y
+        no está vacía, la corrida se registra en una nueva con la fecha y hora
+        en el nombre (cambios_rutas.20250301-101500.jsonl); journal_path
+        queda con la ruta que se usó. Las partes pendientes de una corrida
+        interrumpida se integran antes a la bitácora a la que pertenecen.
+        """
+        self.recover()
+        self.count = 0
+        if not append and self.journal_path.exists() and self.journal_path.stat().st_size > 0:
+            self.journal_path = self.__dated_path()
+        if append:
+            self.__repair()
+        self.__file = self.__open_file("a" if append else "w")
+        return self
+
+    def __repair(self):
+        """
+        Deja la bitácora lista para anexar: si la corrida anterior se
+        interrumpió a mitad de una línea, esa línea se descarta para que el
+        siguiente cambio no quede pegado a ella (read() lo perdería).
+        """
+        if not self.journal_path.exists() or self.journal_path.stat().st_size == 0:
+            return
+        if not self.compress:
+            with open(self.journal_path, "r+b") as f:
+                end = f.seek(0, 2)
+                pos = end
+                while pos > 0:
+                    start = max(0, pos - 65536)
+                    f.seek(start)
+                    block = f.read(pos - start)
+                    if pos == end and block.endswith(b"\n"):
+                        return
+                    newline = block.rfind(b"\n")
+                    if newline != -1:
+                        f.truncate(start + newline + 1)
+                        return
+                    pos = start
+                f.truncate(0)
+            return
+
+        # gzip: un miembro sin cerrar detendría read() antes de lo anexado
+        complete = True
+        try:
+            with gzip.open(self.journal_path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    complete = line.endswith("\n")
+        except (EOFError, zlib.error):
+            complete = False
+        if complete:
+            return
+        temp = self.journal_path.with_name(self.journal_path.name + ".tmp")
+        with gzip.open(temp, "wt", encoding="utf-8") as f:
+            for obj in self.read():
+                f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        os.replace(temp, self.journal_path)
+
+    def __dated_path(self) -> Path:
+        suffix = "".join(self.journal_path.suffixes[-2:]) if self.compress else self.journal_path.suffix
+        stem = self.journal_path.name[:len(self.journal_path.name) - len(suffix)]
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = self.journal_path.with_name(f"{stem}.{stamp}{suffix}")
+        counter = 1
+        while path.exists():
+            counter += 1
+            path = self.journal_path.with_name(f"{stem}.{stamp}-{counter}{suffix}")
+        return path
+
+    def write(self, empresa: str, empresa_path: str, changes, table_dir=None):
+        """
+        Agrega cambios en el formato de DBFManager.update_info. Las tablas se
+        ubican en table_dir (por defecto, la carpeta de la empresa).
+        """
+        table_dir = Path(table_dir if table_dir is not None else empresa_path)
+        for change in changes:
+            self.__buffer.append(json.dumps({
+                "empresa": empresa,
+                "path": empresa_path,
+                "tabla": change["table"],
+                "ruta_tabla": str(table_dir / change["table"]),
+                "registro": change["record"],
+                "antes": change["before"],
+                "despues": change["after"]
+            }, ensure_ascii=False))
+            self.count += 1
+            if len(self.__buffer) >= self.BUFFER_SIZE:
+                self.flush()
+
+    def flush(self):
+        if self.__buffer:
+            self.__file.write("\n".join(self.__buffer) + "\n")
+            self.__buffer = []
+        self.__file.flush()
+
+    def sync(self):
+        """flush() y fsync: los cambios quedan en disco antes de escribir la tabla."""
+        self.flush()
+        os.fsync(self.__file.fileno())
+
+    # === PARTES POR EMPRESA ===
+
+    @property
+    def parts_dir(self) -> Path:
+        return self.journal_path.with_name(self.journal_path.name + ".partes")
+
+    def part_path(self, empresa_path: str) -> Path:
+        """Parte de la bitácora donde un worker registra los cambios de una empresa."""
+        self.parts_dir.mkdir(exist_ok=True)
+        name = hashlib.sha1(str(empresa_path).lower().encode("utf-8")).hexdigest()[:16]
+        return self.parts_dir / f"{name}.jsonl"
+
+    def merge(self, part_path) -> int:
+        """
+        Agrega a la bitácora los cambios completos de una parte y la elimina.
+        Regresa el número de cambios integrados.
+        """
+        if part_path is None or not Path(part_path).exists():
+            return 0
+        merged = 0
+        for obj in JournalManager(part_path).read():
+            self.__buffer.append(json.dumps(obj, ensure_ascii=False))
+            self.count += 1
+            merged += 1
+            if len(self.__buffer) >= self.BUFFER_SIZE:
+                self.flush()
+        self.sync()
+        Path(part_path).unlink()
+        return merged
+
+    def recover(self) -> int:
+        """
+        Integra las partes que dejó una corrida interrumpida (cambios ya
+        registrados de tablas que pudieron escribirse). La usan open(),
+        --rollback y --verify. Regresa el número de cambios integrados.
+        """
+        parts_dir = self.parts_dir
+        if not parts_dir.is_dir():
+            return 0
+        parts = sorted(parts_dir.glob("*.jsonl"))
+        merged = 0
+        if parts:
+            opened = self.__file is None
+            if opened:
+                self.__repair()
+                self.__file = self.__open_file("a")
+            try:
+                for part in parts:
+                    merged += self.merge(part)
+            finally:
+                if opened:
+                    self.close()
+        try:
+            parts_dir.rmdir()
+        except OSError:
+            pass
+        return merged
+
+    def close(self):
+        if self.__file is not None:
+            self.flush()
+            self.__file.close()
+            self.__file = None
+        # La carpeta de partes solo queda si alguna no se integró
+        try:
+            self.parts_dir.rmdir()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self):
+        """
+        Itera los cambios registrados en el orden en que se escribieron.
+
+        Si la corrida se interrumpió, la bitácora puede terminar a medias
+        (una última línea sin salto de línea o, con gzip, sin el marcador de
+        fin): se entregan todas las líneas completas hasta ese punto.
+        """
+        with self.__open_file("r") as f:
+            try:
+                for line in f:
+                    if not line.endswith("\n"):
+                        # Última línea incompleta: el proceso terminó mientras escribía
+                        break
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+            except (EOFError, zlib.error):
+                # gzip sin cerrar: lo descomprimido hasta el corte ya se entregó
+                return
+
+
+def rollback_entries(journal: JournalManager) -> dict:
+    """
+    Convierte la bitácora en entradas de plan que deshacen los cambios.
+
+    Cada campo modificado se vuelve una entrada con "antes" = valor
+    escrito y "despues" = valor original, en el formato de
+    PlanManager.read() para usarse con apply_entries. Las entradas quedan
+    en orden inverso al de la bitácora, de modo que un campo modificado
+    varias veces se regresa paso a paso hasta el valor original.
+    Regresa {ruta_tabla: [entradas]}.
+    """
+    lines = list(journal.read())
+    tables = {}
+    for change in reversed(lines):
+        before = change.get("antes") or {}
+        after = change.get("despues") or {}
+        for col in after:
+            if col not in before or after[col] == before[col]:
+                continue
+            tables.setdefault(change["ruta_tabla"], []).append({
+                "tabla": change["ruta_tabla"],
+                "registro": change["registro"],
+                "campo": col,
+                "antes": after[col],
+                "despues": before[col]
+            })
+    return tables
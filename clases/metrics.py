@@ -0,0 +1,158 @@
+import cProfile
+import datetime
+import json
+import time
+from pathlib import Path
+
+
+class _NullTimer:
+    """Temporizador que no hace nada (métricas desactivadas)."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "counter", "start")
+
+    def __init__(self, metrics, counter):
+        self.metrics = metrics
+        self.counter = counter
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add(self.counter, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Contadores y tiempos por tabla de la ruta de reescritura.
+
+    Cada DBFManager tiene su propio Metrics (uno por worker), así que no se
+    comparte entre hilos. begin(tabla) selecciona la tabla a la que se
+    suman los contadores siguientes; timer(etapa) mide un bloque y suma los
+    segundos en "<etapa>_s".
+
+    Desactivado (por defecto), timer() regresa un temporizador vacío
+    compartido y add() regresa de inmediato, así que el costo es una
+    llamada por bloque medido, nunca por registro.
+
+    Contadores usados por DBFManager:
+        prefiltro_s, abrir_s, lectura_s, change_path_s, escritura_s, cerrar_s,
+        registros, campos_reescritos, bytes_escritos, truncados,
+        metodo_dbf (escritura con la librería dbf), metodo_2 (scatter)
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.tables = {}
+        self.__current = None
+
+    def begin(self, table_name: str):
+        if self.enabled:
+            self.__current = self.tables.setdefault(str(table_name), {})
+
+    def timer(self, stage: str):
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, stage + "_s")
+
+    def add(self, counter: str, value=1):
+        if not self.enabled or self.__current is None:
+            return
+        self.__current[counter] = self.__current.get(counter, 0) + value
+
+
+def sum_metrics(items) -> dict:
+    """Suma contadores de varios dicts (tablas o empresas)."""
+    total = {}
+    for item in items:
+        for counter, value in item.items():
+            total[counter] = total.get(counter, 0) + value
+    return {k: round(v, 6) if isinstance(v, float) else v for k, v in total.items()}
+
+
+class Profiler:
+    """
+    Soporte de --profile: cProfile del hilo principal y resumen de métricas.
+
+    Al terminar escribe <prefijo>.prof (se abre con pstats o snakeviz) y
+    <prefijo>.metrics.json con las métricas por empresa y tabla, los
+    totales y las funciones más costosas.
+    """
+
+    def __init__(self, prefix):
+        self.enabled = prefix is not None
+        self.prefix = Path(prefix) if prefix is not None else None
+        self.companies = {}
+        self.__profile = cProfile.Profile() if self.enabled else None
+        self.__start = None
+
+    def __enter__(self):
+        if self.enabled:
+            self.__start = time.perf_counter()
+            self.__profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            self.__profile.disable()
+            self.elapsed = time.perf_counter() - self.__start
+        return False
+
+    def add_company(self, name: str, tables: dict, seconds: float = None):
+        """Registra las métricas de una empresa (o del catálogo) por tabla."""
+        if not self.enabled or not tables:
+            return
+        entry = self.companies.setdefault(name, {"segundos": 0.0, "tablas": {}})
+        for table, counters in tables.items():
+            entry["tablas"][table] = sum_metrics([entry["tablas"].get(table, {}), counters])
+        if seconds is not None:
+            entry["segundos"] = round(entry["segundos"] + seconds, 6)
+
+    def dump(self, top: int = 25):
+        """Escribe los archivos de perfil; regresa sus rutas (o None si está desactivado)."""
+        if not self.enabled:
+            return None
+        import pstats
+
+        prof_path = self.prefix.with_name(self.prefix.name + ".prof")
+        metrics_path = self.prefix.with_name(self.prefix.name + ".metrics.json")
+        self.__profile.dump_stats(str(prof_path))
+
+        stats = pstats.Stats(self.__profile)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+
+        companies = {}
+        for name, entry in self.companies.items():
+            companies[name] = dict(entry, total=sum_metrics(entry["tablas"].values()))
+
+        summary = {
+            "creado": datetime.datetime.now().isoformat(timespec="seconds"),
+            "segundos": round(getattr(self, "elapsed", 0.0), 6),
+            "total": sum_metrics(c["total"] for c in companies.values()),
+            "empresas": companies,
+            "funciones": [
+                {
+                    "funcion": f"{Path(filename).name}:{line}({func})",
+                    "llamadas": calls,
+                    "propio_s": round(own, 6),
+                    "acumulado_s": round(cumulative, 6)
+                }
+                for (filename, line, func), (_, calls, own, cumulative, _) in functions
+            ]
+        }
+        with open(metrics_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return prof_path, metrics_path
@@ -1,6 +1,12 @@
+import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
 class PathManager:
+    # Máximo de rutas memorizadas por change_path (LRU)
+    CACHE_SIZE = 8192
+    
     def __init__(self, letterBase='C', tablePath=None, basePath="Compacw\\Empresas"):
         if tablePath is None:
             self.tablePath = [
@@ -9,6 +15,9 @@ class PathManager:
             ]
         else:
             self.tablePath = tablePath
+        # Tablas que deben existir en cada empresa; las agregadas después
+        # (p. ej. con --discover) se omiten si una empresa no las tiene
+        self.requiredTables = {name.lower() for name, _ in self.tablePath}
         
         # Normalizar basePath (sin barras al inicio/final)
         self.basePath = basePath.strip("\\/").replace("/", "\\")
@@ -17,6 +26,33 @@ class PathManager:
         self.newBase = self.letterBase 
         self.__netPath = "\\\\localhost\\"
         self.__absPath = self.letterBase + self.basePath
+        
+        # Patrones de búsqueda precompilados (basePath completo y "empresas")
+        self.__base_pattern = re.compile(re.escape(self.basePath), re.IGNORECASE)
+        self.__empresas_pattern = re.compile("empresas", re.IGNORECASE)
+        
+        # Prefijo destino compilado: (target_base original, prefijo resultante)
+        self.__compiled_target = (None, None)
+        
+        # Reglas adicionales (prefijo anterior → base nueva), ver set_rules
+        self.rules = None
+        self.rule_hits = []
+        
+        # Memo LRU de change_path: (ruta, target_base) -> (ruta nueva, índice de regla o None)
+        self.__cache = OrderedDict()
+        self.__cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def __getstate__(self):
+        # El lock no se puede serializar (workers en procesos)
+        state = self.__dict__.copy()
+        del state["_PathManager__cache_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__cache_lock = threading.Lock()
     
     def indexCompanyName(self):
         # Retorna el índice donde empieza el nombre de empresa en una ruta
@@ -53,6 +89,35 @@ class PathManager:
                 # Ya termina en 'Empresas'
                 self.__netPath = self.__netPath + clean_path
     
+    def set_target(self, hostname: str = None, netPath: str = None) -> str:
+        """
+        Define newBase (la base destino de change_path).
+        
+        - Sin hostname: modo LOCAL, newBase es solo la letra de disco (C:)
+        - Con hostname: modo RED, newBase es la ruta de red completa hasta
+          'Empresas' (ver build_netPath)
+        """
+        if not hostname:
+            self.newBase = self.letterBase.rstrip("\\")
+        else:
+            self.build_netPath(hostname=hostname, netPath=netPath)
+            self.newBase = self.get_netPath()
+        self.clear_cache()
+        return self.newBase
+    
+    def set_rules(self, rules):
+        """
+        Define un RuleSet que change_path aplica antes de la regla de basePath.
+        
+        Las rutas que empiezan con el prefijo anterior de alguna regla se
+        reescriben a la base nueva de esa regla; el resto sigue la lógica
+        de basePath/newBase. Los aciertos de cada regla se cuentan en
+        rule_hits (ver rule_info).
+        """
+        self.rules = rules if rules is not None and len(rules) else None
+        self.rule_hits = [0] * (len(self.rules) if self.rules else 0)
+        self.clear_cache()
+    
     def get_netPath(self) -> str:
         return self.__netPath
     
@@ -94,57 +159,151 @@ class PathManager:
             → Extrae todo después: "\\Empresa1\\Facturas"
             → newBase ya termina correctamente → usar directamente
             → Resultado: "\\\\NUEVO\\Compacw\\Empresas\\Empresa1\\Facturas"
-        """
-        # Normalizar entrada
-        old = self._normalize(old_path)
-        if not old:
-            return old_path
         
+        Con reglas (set_rules), la primera regla cuyo prefijo coincide con
+        el inicio de la ruta tiene prioridad sobre la lógica anterior. Una
+        ruta que ya empieza con la base nueva de una regla se regresa sin
+        cambios (ver migrated_by_rule): volver a correr no la mueve a newBase.
+        
+        El resultado se memoriza por (ruta, base destino) en un LRU de
+        CACHE_SIZE entradas; cache_info() muestra aciertos y fallos.
+        """
         # Determinar base de destino
         target_base = new_base if new_base is not None else self.newBase
-        target_base = target_base.rstrip("\\/")
-        
-        # Buscar basePath en la ruta original
-        base_lower = self.basePath.lower()  # "compacw\\empresas"
-        old_lower = old.lower()
+        key = (old_path, target_base)
         
-        # Intentar encontrar el basePath completo
-        idx = old_lower.find(base_lower)
+        with self.__cache_lock:
+            cached = self.__cache.get(key)
+            if cached is not None:
+                self.__cache.move_to_end(key)
+                self.cache_hits += 1
+                new_path, rule = cached
+                if rule is not None:
+                    self.rule_hits[rule] += 1
+                return new_path
+            self.cache_misses += 1
         
-        if idx == -1:
-            # No se encontró basePath completo, intentar solo "empresas"
-            empresas_lower = "empresas"
-            idx = old_lower.find(empresas_lower)
-            
-            if idx != -1:
-                # Encontró "empresas" - extraer desde ahí
-                # Encontrar el final de "empresas"
-                end_empresas = idx + len(empresas_lower)
-                relative_part = old[end_empresas:].lstrip("\\/")
-            else:
-                # No se encontró nada, retornar sin cambios
-                return old_path
+        ruled = self.rules.rewrite(self._normalize(old_path)) if self.rules is not None else None
+        if ruled is not None:
+            new_path, rule = ruled
+        elif self.migrated_by_rule(old_path):
+            new_path, rule = old_path, None
         else:
-            # Se encontró basePath completo
-            # Extraer desde el final de basePath
-            end_base = idx + len(base_lower)
-            relative_part = old[end_base:].lstrip("\\/")
+            new_path, rule = self.__rewrite(old_path, target_base), None
+        
+        with self.__cache_lock:
+            self.__cache[key] = (new_path, rule)
+            if len(self.__cache) > self.CACHE_SIZE:
+                self.__cache.popitem(last=False)
+            if rule is not None:
+                self.rule_hits[rule] += 1
+        
+        return new_path
+    
+    def migrated_by_rule(self, path: str) -> bool:
+        """True si la ruta ya empieza con la base nueva de alguna regla (set_rules)."""
+        return self.rules is not None and self.rules.migrated(self._normalize(path))
+    
+    def change_paths(self, paths, new_base: str = None) -> list:
+        """
+        Versión por lotes de change_path: transforma todas las rutas de un
+        iterable (por ejemplo, una columna completa) y regresa una lista en
+        el mismo orden. Los valores vacíos se regresan tal cual.
+        """
+        return [self.change_path(p, new_base=new_base) if p else p for p in paths]
+    
+    def cache_info(self) -> dict:
+        """Aciertos y fallos del memo de change_path."""
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self.__cache),
+            "maxsize": self.CACHE_SIZE
+        }
+    
+    def rule_info(self) -> list:
+        """Reglas definidas con set_rules y cuántas rutas reescribió cada una."""
+        if self.rules is None:
+            return []
+        return [
+            {"origen": old_prefix, "destino": new_base, "aciertos": hits}
+            for (old_prefix, new_base), hits in zip(self.rules.rules, self.rule_hits)
+        ]
+    
+    def search_patterns(self) -> list:
+        """Textos que change_path busca (sin distinguir mayúsculas) para reescribir una ruta."""
+        patterns = [self.basePath, "empresas"]
+        if self.rules is not None:
+            patterns.extend(self.rules.search_patterns())
+        return patterns
+    
+    def target_prefix(self, new_base: str = None) -> str:
+        """
+        Prefijo con el que empiezan las rutas ya reescritas hacia new_base
+        (por defecto newBase), con las barras ya normalizadas.
+        """
+        target_base = new_base if new_base is not None else self.newBase
+        prefix = self.__target_prefix(target_base)
+        if prefix.startswith("\\\\"):
+            return "\\\\" + prefix[2:].replace("\\\\", "\\")
+        return prefix.replace("\\\\", "\\")
+    
+    def clear_cache(self):
+        with self.__cache_lock:
+            self.__cache.clear()
+            self.__compiled_target = (None, None)
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self.rule_hits = [0] * len(self.rule_hits)
+    
+    def __target_prefix(self, target_base: str) -> str:
+        """
+        Calcula (una sola vez por base destino) el prefijo que se antepone a la
+        parte relativa de cada ruta.
+        """
+        compiled_for, prefix = self.__compiled_target
+        if compiled_for == target_base:
+            return prefix
+        
+        target = target_base.rstrip("\\/")
         
         # Verificar si target_base ya termina con "Empresas"
-        target_lower = target_base.lower()
+        target_lower = target.lower()
         
         if target_lower.endswith("empresas"):
             # Ya termina con "Empresas", concatenar directamente
-            new_path = target_base + "\\" + relative_part
+            prefix = target + "\\"
         elif target_lower.endswith("compacw"):
             # Termina con "Compacw", agregar "\\Empresas"
-            new_path = target_base + "\\Empresas\\" + relative_part
-        elif target_base.endswith(":"):
-            # Unidad de disco (C:), agregar basePath completo
-            new_path = target_base + "\\" + self.basePath + "\\" + relative_part
+            prefix = target + "\\Empresas\\"
         else:
-            # Otro caso, agregar basePath completo
-            new_path = target_base + "\\" + self.basePath + "\\" + relative_part
+            # Unidad de disco (C:) u otro caso, agregar basePath completo
+            prefix = target + "\\" + self.basePath + "\\"
+        
+        self.__compiled_target = (target_base, prefix)
+        return prefix
+    
+    def __rewrite(self, old_path: str, target_base: str) -> str:
+        # Normalizar entrada
+        old = self._normalize(old_path)
+        if not old:
+            return old_path
+        
+        # Buscar basePath completo ("compacw\\empresas") en la ruta original
+        match = self.__base_pattern.search(old)
+        
+        if match is None:
+            # No se encontró basePath completo, intentar solo "empresas"
+            match = self.__empresas_pattern.search(old)
+            
+            if match is None:
+                # No se encontró nada, retornar sin cambios
+                return old_path
+        
+        # Extraer desde el final de basePath (o de "empresas")
+        relative_part = old[match.end():].lstrip("\\/")
+        
+        new_path = self.__target_prefix(target_base) + relative_part
         
         # Normalizar múltiples barras
         if new_path.startswith("\\\\"):
@@ -154,4 +313,4 @@ class PathManager:
             # Ruta normal: eliminar dobles barras
             new_path = new_path.replace("\\\\", "\\")
         
-        return new_path
\ No newline at end of file
+        return new_path
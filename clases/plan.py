@@ -0,0 +1,199 @@
+import datetime
+import json
+from pathlib import Path
+
+from clases.dbf import DBFManager, DbfLibraryReader, as_changes
+from clases.reader import DBFFormatError, decode_value
+from clases.writer import DBFWriter
+
+
+class PlanManager:
+    """
+    Archivo de plan de cambios (JSON Lines).
+
+    La primera línea describe la configuración con la que se generó el
+    plan; cada línea siguiente es un cambio de un campo:
+
+        {"tabla": "...\\mgw10006.dbf", "registro": 12, "campo": "CRUTAENT01",
+         "antes": "...", "despues": "...", "truncado": true}
+
+    "truncado" solo aparece cuando el valor nuevo no cabe en el campo y se
+    recortó a su longitud.
+    """
+
+    VERSION = 1
+
+    def __init__(self, plan_path: Path):
+        self.plan_path = Path(plan_path)
+        self.__file = None
+        self.entries = 0
+        self.truncated = 0
+        self.tables = set()
+
+    # === ESCRITURA ===
+
+    def create(self, path_manager):
+        self.__file = open(self.plan_path, "w", encoding="utf-8")
+        self.__write({
+            "plan": self.VERSION,
+            "creado": datetime.datetime.now().isoformat(timespec="seconds"),
+            "basePath": path_manager.basePath,
+            "absPath": path_manager.get_absPath(),
+            "newBase": path_manager.newBase
+        })
+        return self
+
+    def add(self, table_path, record_changes: list):
+        """Agrega al plan los cambios de una tabla (formato de DBFManager.plan_info)."""
+        tabla = str(table_path)
+        for change in record_changes:
+            for col, new in change["updates"].items():
+                entry = {
+                    "tabla": tabla,
+                    "registro": change["record"],
+                    "campo": col,
+                    "antes": change["before"][col],
+                    "despues": new
+                }
+                if col in change["truncated"]:
+                    entry["truncado"] = True
+                    self.truncated += 1
+                self.__write(entry)
+                self.entries += 1
+                self.tables.add(tabla)
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __write(self, obj: dict):
+        self.__file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+    # === LECTURA ===
+
+    def read(self):
+        """Regresa (encabezado, {tabla: [entradas]}) conservando el orden del plan."""
+        header = None
+        tables = {}
+        with open(self.plan_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                obj = json.loads(line)
+                if header is None:
+                    if "plan" not in obj:
+                        raise ValueError(f"{self.plan_path} no es un archivo de plan")
+                    header = obj
+                    continue
+                tables.setdefault(obj["tabla"], []).append(obj)
+        if header is None:
+            raise ValueError(f"{self.plan_path} está vacío")
+        return header, tables
+
+
+def apply_entries(table_path: Path, entries: list, on_apply=None, output=print) -> dict:
+    """
+    Ejecuta exactamente las entradas del plan de una tabla.
+
+    Antes de escribir cada campo se verifica que su valor actual siga
+    siendo "antes"; si no coincide, la entrada se reporta como conflicto
+    y no se toca; si ya tiene el valor "despues" se cuenta como ya aplicada.
+
+    Las entradas se clasifican antes de escribir la primera; on_apply recibe
+    los cambios a aplicar por registro (formato de DBFManager.update_info)
+    antes de modificar la tabla, para registrarlos en la bitácora. Si
+    DBFWriter no reconoce la tabla se escribe con la librería dbf.
+    Regresa {"aplicados": [...], "ya_aplicados": [...], "conflictos": [...]}.
+    """
+    table_path = Path(table_path)
+    try:
+        with DBFWriter(table_path) as writer:
+            codepage = writer.header.codepage
+            result, pending = classify_entries(
+                entries, lambda recno, col: decode_value(writer.read_field(recno, col), codepage))
+            for change in pending:
+                for col, value in change["updates"].items():
+                    writer.encode(col, value)
+
+            if on_apply is not None and pending:
+                on_apply(as_changes(table_path, pending))
+            for change in pending:
+                for col, value in change["updates"].items():
+                    writer.patch(change["record"], col, value)
+        return result
+    except DBFFormatError as e:
+        output(f"Advertencia: Escritura directa no disponible para {table_path.name} ({e}), usando dbf")
+
+    # Respaldo: lectura y escritura con la librería dbf (las entradas se vuelven a clasificar)
+    columns = sorted({entry["campo"].upper() for entry in entries})
+    with DbfLibraryReader(table_path) as reader:
+        values = dict(reader.iter_values(columns, include_deleted=True))
+
+    def read_value(recno, col):
+        if recno not in values or col.upper() not in values[recno]:
+            raise KeyError(f"{col} en el registro {recno}")
+        return values[recno][col.upper()]
+
+    result, pending = classify_entries(entries, read_value)
+    if not pending:
+        return result
+
+    manager = DBFManager(output=output)
+    written = {change["record"] for change in manager.apply_with_dbf(table_path, pending, on_apply)}
+    if manager.last_error is not None:
+        # Los registros que no se pudieron escribir quedan como conflicto
+        applied = []
+        for entry in result["aplicados"]:
+            if entry["registro"] in written:
+                applied.append(entry)
+            else:
+                result["conflictos"].append(dict(entry, actual=entry["antes"], motivo=f"no se pudo escribir: {manager.last_error}"))
+        result["aplicados"] = applied
+    return result
+
+
+def classify_entries(entries: list, read_value):
+    """
+    Clasifica las entradas como apply_entries y agrupa por registro las que
+    hay que escribir: {"record", "before", "after", "updates"} como en
+    DBFManager.plan_info. read_value(recno, campo) regresa el valor actual.
+
+    Un campo que aparece varias veces (una reversión paso a paso) se compara
+    con el valor que dejó la entrada anterior y se escribe una sola vez.
+    """
+    result = {"aplicados": [], "ya_aplicados": [], "conflictos": []}
+    pending = {}
+    written = {}
+
+    for entry in entries:
+        recno = entry["registro"]
+        col = entry["campo"]
+        key = (recno, col)
+        if key in written:
+            current = written[key]
+        else:
+            try:
+                current = read_value(recno, col)
+            except (KeyError, IndexError) as e:
+                result["conflictos"].append(dict(entry, actual=None, motivo=f"campo o registro inexistente: {e}"))
+                continue
+
+        if current == entry["despues"] and current != entry["antes"]:
+            result["ya_aplicados"].append(entry)
+            continue
+
+        if current != entry["antes"]:
+            result["conflictos"].append(dict(entry, actual=current, motivo="el valor actual no coincide con el registrado"))
+            continue
+
+        change = pending.setdefault(recno, {"record": recno, "before": {}, "after": {}, "updates": {}})
+        change["before"].setdefault(col, current)
+        change["after"][col] = entry["despues"]
+        change["updates"][col] = entry["despues"]
+        written[key] = entry["despues"]
+        result["aplicados"].append(entry)
+
+    return result, list(pending.values())
+
@@ -0,0 +1,245 @@
+import mmap
+import struct
+from pathlib import Path
+
+# Language driver ID (byte 29 del encabezado) → codec de Python
+CODEPAGES = {
+    0x01: "cp437",
+    0x02: "cp850",
+    0x03: "cp1252",
+    0x57: "cp1252",
+    0x58: "cp1252",
+    0x59: "cp1252",
+    0x64: "cp852",
+    0x65: "cp866",
+    0x7D: "cp1255",
+    0x7E: "cp1256",
+    0xC8: "cp1250",
+    0xC9: "cp1251",
+    0xCB: "cp1253",
+}
+DEFAULT_CODEPAGE = "cp1252"
+
+DELETED_FLAG = 0x2A  # '*'
+HEADER_END = 0x0D
+
+
+class DBFFormatError(Exception):
+    """El archivo no tiene un encabezado DBF que el lector pueda interpretar."""
+
+
+class FieldInfo:
+    """Descriptor de un campo: nombre, tipo, desplazamiento dentro del registro y longitud."""
+    __slots__ = ("name", "type", "offset", "length", "decimals")
+
+    def __init__(self, name, type, offset, length, decimals):
+        self.name = name
+        self.type = type
+        self.offset = offset
+        self.length = length
+        self.decimals = decimals
+
+    def __repr__(self):
+        return f"FieldInfo({self.name!r}, {self.type!r}, offset={self.offset}, length={self.length})"
+
+
+class DBFHeader:
+    """
+    Encabezado de una tabla DBF (dBase III / FoxPro).
+
+    Solo interpreta lo necesario para ubicar campos de ancho fijo:
+    número de registros, longitud de encabezado y de registro, codepage
+    y los descriptores de campo.
+    """
+
+    def __init__(self, data: bytes, file_size: int = None):
+        if len(data) < 32:
+            raise DBFFormatError("Encabezado incompleto")
+
+        self.version = data[0]
+        self.last_update = (1900 + data[1], data[2], data[3])
+        self.record_count, self.header_length, self.record_length = struct.unpack("<IHH", data[4:12])
+        self.language_driver = data[29]
+        self.codepage = CODEPAGES.get(self.language_driver, DEFAULT_CODEPAGE)
+
+        if self.header_length < 33 or self.record_length < 1:
+            raise DBFFormatError("Longitudes de encabezado inválidas")
+
+        self.fields = {}
+        offset = 1  # byte 0 de cada registro es la marca de borrado
+        pos = 32
+        while pos + 32 <= len(data) and data[pos] != HEADER_END:
+            desc = data[pos:pos + 32]
+            name = desc[:11].split(b"\x00", 1)[0].decode("ascii", errors="replace").strip().upper()
+            field = FieldInfo(name, chr(desc[11]), offset, desc[16], desc[17])
+            self.fields[name] = field
+            offset += field.length
+            pos += 32
+
+        if not self.fields:
+            raise DBFFormatError("La tabla no tiene descriptores de campo")
+        if offset != self.record_length:
+            raise DBFFormatError(
+                f"La suma de campos ({offset}) no coincide con la longitud de registro ({self.record_length})"
+            )
+
+        # Si el archivo está truncado, no leer más allá de su tamaño real
+        if file_size is not None:
+            available = max(0, (file_size - self.header_length) // self.record_length)
+            self.record_count = min(self.record_count, available)
+
+    @classmethod
+    def read(cls, table_path: Path) -> "DBFHeader":
+        """Lee únicamente el encabezado (sin mapear el archivo)."""
+        with open(table_path, "rb") as f:
+            data = f.read(32)
+            if len(data) < 32:
+                raise DBFFormatError("Encabezado incompleto")
+            header_length = struct.unpack("<H", data[8:10])[0]
+            data += f.read(max(0, header_length - 32))
+            f.seek(0, 2)
+            return cls(data, f.tell())
+
+    @property
+    def field_names(self) -> list:
+        return list(self.fields)
+
+    def field_info(self, name: str) -> FieldInfo:
+        return self.fields[name.upper()]
+
+    def record_offset(self, recno: int) -> int:
+        """Posición en el archivo del registro recno (base 1)."""
+        return self.header_length + (recno - 1) * self.record_length
+
+
+class DBFReader:
+    """
+    Lector ligero de tablas DBF sobre un archivo mapeado en memoria.
+
+    Interpreta el encabezado una sola vez y entrega solo las columnas
+    pedidas como memoryview en su posición fija dentro de cada registro,
+    sin construir objetos por registro. Las memoryview son válidas solo
+    mientras el lector esté abierto.
+
+    Uso:
+        with DBFReader(path) as reader:
+            for recno, values in reader.iter_values(["CRUTADATOS"]):
+                ...
+    """
+
+    def __init__(self, table_path: Path):
+        self.table_path = Path(table_path)
+        self.header = None
+        self.__file = None
+        self.__mmap = None
+        self.__view = None
+
+    def open(self):
+        self.__file = open(self.table_path, "rb")
+        try:
+            self.__file.seek(0, 2)
+            size = self.__file.tell()
+            if size < 32:
+                raise DBFFormatError("Archivo demasiado pequeño para ser DBF")
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            header_length = struct.unpack("<H", self.__mmap[8:10])[0]
+            self.header = DBFHeader(self.__mmap[:header_length], size)
+            self.__view = memoryview(self.__mmap)
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def close(self):
+        if self.__view is not None:
+            self.__view.release()
+            self.__view = None
+        if self.__mmap is not None:
+            try:
+                self.__mmap.close()
+            except BufferError:
+                # Aún hay memoryview exportadas; el mapa se libera con ellas
+                pass
+            self.__mmap = None
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.header = None
+
+    def __enter__(self):
+        if self.header is None:
+            self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def codepage(self) -> str:
+        return self.header.codepage
+
+    @property
+    def field_names(self) -> list:
+        return self.header.field_names
+
+    def field_info(self, name: str) -> FieldInfo:
+        return self.header.field_info(name)
+
+    def __len__(self):
+        return self.header.record_count
+
+    def is_deleted(self, recno: int) -> bool:
+        return self.__view[self.header.record_offset(recno)] == DELETED_FLAG
+
+    def finditer(self, pattern):
+        """Busca un patrón (re compilado sobre bytes) solo en el área de registros."""
+        header = self.header
+        end = header.header_length + header.record_count * header.record_length
+        return pattern.finditer(self.__mmap, header.header_length, end)
+
+    def recno_at(self, offset: int) -> int:
+        """Número de registro (base 1) que contiene la posición offset del archivo."""
+        return (offset - self.header.header_length) // self.header.record_length + 1
+
+    def find(self, sub: bytes, start: int, end: int) -> int:
+        return self.__mmap.find(sub, start, end)
+
+    def read_bytes(self, start: int, end: int) -> bytes:
+        return self.__mmap[start:end]
+
+    def iter_columns(self, columns: list, include_deleted: bool = False):
+        """
+        Itera (recno, {columna: memoryview}) con los bytes crudos de cada columna.
+
+        Las columnas que no existen en la tabla se ignoran. Los registros
+        marcados como borrados se omiten salvo que include_deleted sea True.
+        """
+        header = self.header
+        fields = [header.fields[c.upper()] for c in columns if c.upper() in header.fields]
+        if not fields:
+            return
+
+        view = self.__view
+        start = header.header_length
+        rec_len = header.record_length
+
+        for i in range(header.record_count):
+            pos = start + i * rec_len
+            if not include_deleted and view[pos] == DELETED_FLAG:
+                continue
+            yield i + 1, {f.name: view[pos + f.offset:pos + f.offset + f.length] for f in fields}
+
+    def iter_values(self, columns: list, include_deleted: bool = False):
+        """Como iter_columns, pero decodifica y recorta cada valor a str."""
+        codepage = self.header.codepage
+        for recno, raw in self.iter_columns(columns, include_deleted):
+            values = {}
+            for name, mv in raw.items():
+                values[name] = decode_value(mv, codepage)
+                mv.release()
+            yield recno, values
+
+
+def decode_value(raw, codepage: str) -> str:
+    """Decodifica un campo de ancho fijo quitando el relleno (espacios y nulos)."""
+    return bytes(raw).decode(codepage, errors="replace").strip(" \x00\r\n\t")
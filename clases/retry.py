@@ -0,0 +1,81 @@
+import errno
+import time
+
+# Windows: ERROR_SHARING_VIOLATION y ERROR_LOCK_VIOLATION
+LOCK_WINERRORS = (32, 33)
+# Otros sistemas (p. ej. flock/fcntl en un recurso compartido montado). EACCES
+# no se incluye: también es un permiso denegado, que no se resuelve esperando.
+LOCK_ERRNOS = tuple({errno.EAGAIN, errno.EWOULDBLOCK, errno.EBUSY})
+
+
+def is_lock_error(exc) -> bool:
+    """
+    Indica si una excepción se debe a que otro programa tiene el archivo
+    abierto o bloqueado (p. ej. una terminal con la empresa abierta en
+    Contpaqi). En Windows solo cuenta el código winerror (el errno de una
+    violación de uso compartido es EACCES, igual que un acceso denegado).
+    Revisa también la excepción original si la librería dbf la envolvió en
+    otra.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, OSError):
+            winerror = getattr(exc, "winerror", None)
+            if winerror is not None:
+                if winerror in LOCK_WINERRORS:
+                    return True
+            elif exc.errno in LOCK_ERRNOS:
+                return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class RetryQueue:
+    """
+    Cola diferida de tablas bloqueadas con espera exponencial.
+
+    Cada elemento se reintenta después de base_delay segundos, luego del
+    doble y así sucesivamente hasta max_delay. due() entrega los elementos
+    cuyo turno ya llegó (y los saca de la cola); si el reintento vuelve a
+    fallar por bloqueo se regresan con defer(), que conserva el número de
+    intentos.
+    """
+
+    def __init__(self, base_delay: float = 5.0, max_delay: float = 60.0, clock=time.monotonic):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        # clave → {"item", "attempts", "error", "due"}
+        self.__entries = {}
+        self.__attempts = {}
+
+    def defer(self, key, item, error=None):
+        attempts = self.__attempts.get(key, 0) + 1
+        self.__attempts[key] = attempts
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        self.__entries[key] = {
+            "item": item,
+            "attempts": attempts,
+            "error": str(error) if error is not None else "",
+            "due": self.clock() + delay
+        }
+
+    def due(self) -> list:
+        """Elementos listos para reintentarse, en el orden en que se difirieron."""
+        now = self.clock()
+        ready = [key for key, entry in self.__entries.items() if entry["due"] <= now]
+        return [self.__entries.pop(key)["item"] for key in ready]
+
+    def wait_time(self):
+        """Segundos hasta el siguiente reintento (0 si ya hay alguno listo), o None si la cola está vacía."""
+        if not self.__entries:
+            return None
+        return max(0.0, min(entry["due"] for entry in self.__entries.values()) - self.clock())
+
+    def pending(self) -> list:
+        """Elementos que siguen en la cola: [(item, intentos, último_error)]."""
+        return [(entry["item"], entry["attempts"], entry["error"]) for entry in self.__entries.values()]
+
+    def __len__(self):
+        return len(self.__entries)
@@ -0,0 +1,111 @@
+import re
+from pathlib import Path
+
+
+def normalize_prefix(prefix: str) -> str:
+    """Barras invertidas, sin espacios ni barra final (conserva el \\\\ inicial de UNC)."""
+    prefix = str(prefix).strip().replace("/", "\\")
+    if prefix.startswith("\\\\"):
+        return "\\\\" + prefix[2:].rstrip("\\")
+    return prefix.rstrip("\\")
+
+
+class RuleSet:
+    """
+    Conjunto de reglas (prefijo anterior → base nueva) para consolidar
+    varias bases anteriores en una sola corrida.
+
+    Todas las reglas se compilan en un solo patrón, sin distinguir
+    mayúsculas y anclado al inicio de la ruta, con una alternativa (grupo)
+    por regla; los prefijos más largos van primero, así que la regla más
+    específica gana. Un prefijo solo coincide completo hasta un separador:
+    "\\\\VIEJO\\Empresas" no coincide con "\\\\VIEJO\\Empresas2".
+
+    Las bases nuevas también forman parte del patrón: una ruta que ya
+    empieza con la base nueva de una regla está migrada y no se reescribe
+    (migrated), así que una segunda corrida no la cambia. Solo una regla con
+    un prefijo anterior más largo (más específico) que esa base la reescribe.
+
+    Formato del archivo (una regla por línea, # para comentarios):
+
+        \\\\SERVIDOR1\\Compacw\\Empresas -> \\\\NUEVO\\Compacw\\Empresas
+        D:\\Compacw\\Empresas          -> \\\\NUEVO\\Compacw\\Empresas
+    """
+
+    SEPARATOR = "->"
+
+    def __init__(self, rules):
+        self.rules = []
+        seen = set()
+        for old_prefix, new_base in rules:
+            old_prefix = normalize_prefix(old_prefix)
+            new_base = normalize_prefix(new_base)
+            if not old_prefix or not new_base:
+                raise ValueError(f"Regla incompleta: {old_prefix!r} -> {new_base!r}")
+            if old_prefix.lower() in seen:
+                raise ValueError(f"Regla duplicada para {old_prefix}")
+            seen.add(old_prefix.lower())
+            self.rules.append((old_prefix, new_base))
+
+        # Bases nuevas que no son también un prefijo anterior (en ese caso gana la regla)
+        destinations = []
+        for _, new_base in self.rules:
+            if new_base.lower() not in seen:
+                seen.add(new_base.lower())
+                destinations.append(new_base)
+
+        # Más largo primero; cada grupo recuerda el índice original de su
+        # regla, o None si es una base nueva (ruta ya migrada)
+        alternatives = [(old_prefix, i) for i, (old_prefix, _) in enumerate(self.rules)]
+        alternatives += [(new_base, None) for new_base in destinations]
+        alternatives.sort(key=lambda alternative: len(alternative[0]), reverse=True)
+        self.__group_rule = [None] + [index for _, index in alternatives]
+        pattern = "|".join(f"({re.escape(prefix)})" for prefix, _ in alternatives)
+        self.__pattern = re.compile(f"^(?:{pattern})(?=\\\\|$)", re.IGNORECASE) if self.rules else None
+
+    @classmethod
+    def load(cls, rules_path: Path) -> "RuleSet":
+        rules = []
+        with open(rules_path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if cls.SEPARATOR not in line:
+                    raise ValueError(f"{rules_path}:{number}: falta '{cls.SEPARATOR}' en la regla")
+                old_prefix, new_base = line.split(cls.SEPARATOR, 1)
+                rules.append((old_prefix, new_base))
+        if not rules:
+            raise ValueError(f"{rules_path} no contiene reglas")
+        return cls(rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def search_patterns(self) -> list:
+        return [old_prefix for old_prefix, _ in self.rules]
+
+    def migrated(self, path: str) -> bool:
+        """True si una ruta ya normalizada empieza con la base nueva de una regla."""
+        if self.__pattern is None:
+            return False
+        match = self.__pattern.match(path)
+        return match is not None and self.__group_rule[match.lastindex] is None
+
+    def rewrite(self, path: str):
+        """
+        Aplica la primera regla que coincide con una ruta ya normalizada.
+        Regresa (ruta_nueva, índice_de_regla) o None si ninguna coincide o
+        si la ruta ya está migrada (ver migrated).
+        """
+        if self.__pattern is None:
+            return None
+        match = self.__pattern.match(path)
+        if match is None:
+            return None
+        index = self.__group_rule[match.lastindex]
+        if index is None:
+            return None
+        relative_part = path[match.end():].lstrip("\\")
+        new_path = self.rules[index][1] + ("\\" + relative_part if relative_part else "")
+        return new_path, index
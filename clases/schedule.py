@@ -0,0 +1,90 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from clases.directory import DirectoryIndex
+from clases.reader import DBFHeader, DBFFormatError
+
+
+class WorkScheduler:
+    """
+    Tamaño del trabajo de cada empresa, medido antes de procesarla.
+
+    Por cada empresa se lista la carpeta una vez y de cada tabla a procesar
+    se lee solo el encabezado (número de registros) y el tamaño del
+    archivo. Con eso:
+
+    - order() regresa las empresas de mayor a menor tamaño (LPT, "longest
+      processing time first"): las empresas enormes empiezan primero y no
+      quedan al final como una cola larga con un solo worker ocupado.
+    - size() y los totales permiten mostrar el avance y el tiempo restante
+      en bytes y registros en lugar de empresas.
+    """
+
+    def __init__(self, table_names, workers: int = 8):
+        self.table_names = list(table_names)
+        self.workers = max(1, workers)
+        # ruta de empresa → {"registros": n, "bytes": n}
+        self.sizes = {}
+        self.records = 0
+        self.bytes = 0
+        # Avance: empresas, registros y bytes terminados
+        self.done_companies = 0
+        self.done_records = 0
+        self.done_bytes = 0
+
+    def measure_company(self, empresa_path: str, skip=()) -> dict:
+        """Registros y bytes de las tablas de una empresa (omite las de skip)."""
+        size = {"registros": 0, "bytes": 0}
+        try:
+            index = DirectoryIndex.scan(empresa_path)
+        except OSError:
+            return size
+        for name in self.table_names:
+            if name in skip:
+                continue
+            table_path = index.resolve(name)
+            if table_path is None:
+                continue
+            try:
+                size["bytes"] += os.stat(table_path).st_size
+                size["registros"] += DBFHeader.read(table_path).record_count
+            except (OSError, DBFFormatError):
+                continue
+        return size
+
+    def measure(self, empresas: list, completed=None) -> "WorkScheduler":
+        """
+        Mide todas las empresas en paralelo (lecturas pequeñas, útil en
+        carpetas compartidas). completed ({(empresa, tabla): ...}, p. ej.
+        CheckpointManager.completed) excluye las tablas ya terminadas.
+        """
+        skips = {}
+        for empresa_path, tabla in (completed or {}):
+            skips.setdefault(empresa_path, set()).add(tabla)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            sizes = list(pool.map(lambda e: self.measure_company(e, skips.get(e, ())), empresas))
+
+        self.sizes = dict(zip(empresas, sizes))
+        self.records = sum(s["registros"] for s in sizes)
+        self.bytes = sum(s["bytes"] for s in sizes)
+        return self
+
+    def size(self, empresa_path: str) -> dict:
+        return self.sizes.get(empresa_path, {"registros": 0, "bytes": 0})
+
+    def complete(self, empresa_path: str) -> dict:
+        """Marca una empresa como terminada y regresa su tamaño."""
+        size = self.size(empresa_path)
+        self.done_companies += 1
+        self.done_records += size["registros"]
+        self.done_bytes += size["bytes"]
+        return size
+
+    def order(self, empresas: list) -> list:
+        """Índices de empresas de mayor a menor tamaño (en empates, el orden del catálogo)."""
+        return sorted(range(len(empresas)), key=lambda i: -self.size(empresas[i])["bytes"])
+
+    def largest(self, count: int = 3) -> list:
+        """Las empresas más grandes: [(ruta, {"registros", "bytes"})]."""
+        return sorted(self.sizes.items(), key=lambda item: -item[1]["bytes"])[:count]
@@ -0,0 +1,75 @@
+import ntpath
+import os
+import threading
+
+from clases.directory import DirectoryIndex
+from clases.rules import RuleSet
+
+
+class PathVerifier:
+    """
+    Verifica que las rutas reescritas existan.
+
+    Las rutas (estilo Windows) se traducen primero a rutas locales con un
+    RuleSet de montajes (p. ej. \\\\NUEVO\\Compacw -> /mnt/compacw); las
+    rutas UNC sin montaje solo se pueden verificar en Windows.
+
+    En lugar de un stat por ruta, cada carpeta padre se lista una sola vez
+    (DirectoryIndex, sin distinguir mayúsculas como en Windows) y el
+    listado se memoriza: miles de rutas con la misma carpeta cuestan una
+    sola lectura. Es seguro usarlo desde varios hilos.
+    """
+
+    OK = "ok"
+    MISSING = "no_existe"
+    UNMAPPED = "sin_montaje"
+
+    def __init__(self, mounts: RuleSet = None):
+        self.mounts = mounts
+        self.listings = 0
+        self.__listings = {}
+        self.__lock = threading.Lock()
+
+    def to_local(self, path: str):
+        """Ruta local equivalente, o None si es UNC sin montaje en un sistema no Windows."""
+        path = path.strip().replace("/", "\\")
+        if self.mounts is not None:
+            mapped = self.mounts.rewrite(path)
+            if mapped is not None:
+                path = mapped[0]
+        if os.sep == "/":
+            if path.startswith("\\\\") or ntpath.splitdrive(path)[0]:
+                return None
+            return path.replace("\\", "/")
+        return path
+
+    def listing(self, directory: str):
+        """DirectoryIndex memorizado de una carpeta (None si no existe o no es accesible)."""
+        key = directory.lower()
+        with self.__lock:
+            if key in self.__listings:
+                return self.__listings[key]
+        try:
+            index = DirectoryIndex.scan(directory, include_dirs=True)
+        except OSError:
+            index = None
+        with self.__lock:
+            if key not in self.__listings:
+                self.__listings[key] = index
+                self.listings += 1
+            return self.__listings[key]
+
+    def exists(self, local_path: str) -> bool:
+        local_path = local_path.rstrip("\\/") or local_path
+        parent, name = os.path.split(local_path)
+        if not name:
+            # Raíz de una unidad o de un recurso compartido
+            return self.listing(local_path) is not None
+        index = self.listing(parent)
+        return index is not None and name in index
+
+    def check(self, path: str) -> str:
+        local_path = self.to_local(path)
+        if local_path is None:
+            return self.UNMAPPED
+        return self.OK if self.exists(local_path) else self.MISSING
@@ -0,0 +1,114 @@
+import json
+import os
+from pathlib import Path
+
+from clases.dbf import DbfLibraryReader
+from clases.reader import DBFReader, DBFFormatError
+
+
+class CatalogWatcher:
+    """
+    Detecta registros nuevos o modificados en MGW00001.DBF.
+
+    Cada revisión (poll) cuesta un solo stat mientras el archivo no cambie;
+    solo si cambia la fecha de modificación o el tamaño se leen las columnas
+    de rutas de todos los registros. Cada registro tiene una firma con sus
+    valores de CRUTADATOS y CRUTARES01; los registros cuya firma no
+    coincide con la guardada son los pendientes.
+
+    mark() guarda la firma que quedó después de procesar un registro (ya con
+    la ruta nueva), así que las escrituras propias no vuelven a disparar el
+    registro. Los registros entregados y no marcados (p. ej. su empresa
+    falló) se vuelven a entregar en la siguiente revisión. El estado se
+    guarda en JSON para continuar después de reiniciar:
+
+        {"catalogo": "C:\\...\\MGW00001.DBF", "registros": {"1": "firma", ...}}
+    """
+
+    COLUMNS = ["CRUTADATOS", "CRUTARES01"]
+
+    def __init__(self, catalog_path: Path, state_path: Path = None):
+        self.catalog_path = Path(catalog_path)
+        self.state_path = Path(state_path) if state_path else None
+        # número de registro → firma ya procesada
+        self.signatures = {}
+        self.polls = 0
+        self.reads = 0
+        self.__stat = None
+        self.__unmarked = set()
+
+    def load(self) -> "CatalogWatcher":
+        """Carga el estado guardado (si existe y es del mismo catálogo)."""
+        if self.state_path is None or not self.state_path.exists():
+            return self
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if str(state.get("catalogo", "")).lower() == str(self.catalog_path).lower():
+            self.signatures = {int(recno): firma for recno, firma in state.get("registros", {}).items()}
+        return self
+
+    def save(self):
+        if self.state_path is None:
+            return
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "catalogo": str(self.catalog_path),
+                "registros": {str(recno): firma for recno, firma in sorted(self.signatures.items())}
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def read_signatures(self) -> dict:
+        """Firma de cada registro activo del catálogo (los borrados no aparecen)."""
+        try:
+            reader = DBFReader(self.catalog_path).open()
+        except DBFFormatError:
+            reader = DbfLibraryReader(self.catalog_path).open()
+        with reader:
+            self.reads += 1
+            return {
+                recno: "\t".join(values.get(col, "") for col in self.COLUMNS)
+                for recno, values in reader.iter_values(self.COLUMNS)
+            }
+
+    def changed(self) -> bool:
+        """Indica si el catálogo cambió desde la revisión anterior (fecha de modificación y tamaño)."""
+        stat = os.stat(self.catalog_path)
+        stat = (stat.st_mtime_ns, stat.st_size)
+        if stat == self.__stat:
+            return False
+        self.__stat = stat
+        return True
+
+    def poll(self) -> list:
+        """
+        Números de registro nuevos o modificados que falta procesar.
+        Lanza OSError si el catálogo no es accesible.
+        """
+        self.polls += 1
+        if not self.changed() and not self.__unmarked:
+            return []
+        current = self.read_signatures()
+        # Registros borrados o eliminados del catálogo: se olvidan
+        for recno in [r for r in self.signatures if r not in current]:
+            del self.signatures[recno]
+        pending = {recno for recno, firma in current.items() if self.signatures.get(recno) != firma}
+        self.__unmarked = pending
+        return sorted(pending)
+
+    def mark(self, records):
+        """Registra como procesados los registros indicados con su firma actual."""
+        records = set(records)
+        if not records:
+            return
+        current = self.read_signatures()
+        for recno in records:
+            if recno in current:
+                self.signatures[recno] = current[recno]
+        self.__unmarked -= records
+        # Nuestra propia escritura cambió la marca del archivo
+        self.__stat = None
+        self.save()
@@ -0,0 +1,120 @@
+import datetime
+import os
+from pathlib import Path
+
+from clases.reader import DBFHeader, DBFFormatError, DELETED_FLAG, decode_value
+
+
+class DBFWriter:
+    """
+    Escritor que modifica en sitio solo los bytes de los campos cambiados.
+
+    Cada cambio se escribe en su desplazamiento fijo dentro del registro,
+    rellenado con espacios y recortado a la longitud del campo, sin volver
+    a serializar el registro completo. La fecha de última modificación del
+    encabezado se actualiza y el archivo se sincroniza (fsync) una sola vez
+    al cerrar la tabla, y solo si hubo cambios.
+
+    Uso:
+        with DBFWriter(path) as writer:
+            writer.patch(recno, "CRUTAENT01", nuevo_valor)
+    """
+
+    def __init__(self, table_path: Path):
+        self.table_path = Path(table_path)
+        self.header = None
+        self.patches = 0
+        self.bytes_written = 0
+        self.__file = None
+
+    def open(self):
+        self.header = DBFHeader.read(self.table_path)
+        self.__file = open(self.table_path, "r+b")
+        self.patches = 0
+        self.bytes_written = 0
+        return self
+
+    def encode(self, col: str, value: str) -> bytes:
+        """Codifica un valor al ancho fijo del campo (relleno con espacios o recortado)."""
+        field = self.header.field_info(col)
+        if field.type != "C":
+            raise DBFFormatError(f"El campo {col} no es de tipo carácter ({field.type})")
+        raw = value.encode(self.header.codepage, errors="replace")[:field.length]
+        return raw.ljust(field.length, b" ")
+
+    def patch(self, recno: int, col: str, value: str) -> int:
+        """Escribe value en el campo col del registro recno (base 1). Regresa los bytes escritos."""
+        if recno < 1 or recno > self.header.record_count:
+            raise IndexError(f"Registro {recno} fuera de rango (1-{self.header.record_count})")
+
+        raw = self.encode(col, value)
+        field = self.header.field_info(col)
+        self.__file.seek(self.header.record_offset(recno) + field.offset)
+        self.__file.write(raw)
+
+        self.patches += 1
+        self.bytes_written += len(raw)
+        return len(raw)
+
+    def iter_values(self, columns: list, include_deleted: bool = False, block_records: int = 1024):
+        """
+        Itera (recno, {columna: valor}) como DBFReader.iter_values, leyendo
+        los registros por bloques con el mismo archivo abierto para escritura.
+
+        Se pueden llamar patch() entre registros: cada bloque se lee con su
+        propio seek, así que la escritura no mueve la lectura.
+        """
+        header = self.header
+        fields = [header.fields[c.upper()] for c in columns if c.upper() in header.fields]
+        if not fields:
+            return
+
+        codepage = header.codepage
+        rec_len = header.record_length
+        for first in range(0, header.record_count, block_records):
+            count = min(block_records, header.record_count - first)
+            self.__file.seek(header.record_offset(first + 1))
+            data = self.__file.read(count * rec_len)
+            for i in range(len(data) // rec_len):
+                pos = i * rec_len
+                if not include_deleted and data[pos] == DELETED_FLAG:
+                    continue
+                yield first + i + 1, {
+                    f.name: decode_value(data[pos + f.offset:pos + f.offset + f.length], codepage)
+                    for f in fields
+                }
+
+    def read_field(self, recno: int, col: str) -> bytes:
+        """Lee los bytes actuales de un campo directamente del archivo."""
+        if recno < 1 or recno > self.header.record_count:
+            raise IndexError(f"Registro {recno} fuera de rango (1-{self.header.record_count})")
+        field = self.header.field_info(col)
+        self.__file.seek(self.header.record_offset(recno) + field.offset)
+        return self.__file.read(field.length)
+
+    def close(self):
+        if self.__file is None:
+            return
+        try:
+            if self.patches:
+                # Fecha de última actualización (AA desde 1900, MM, DD): una vez por tabla
+                today = datetime.date.today()
+                self.__file.seek(1)
+                self.__file.write(bytes((today.year - 1900, today.month, today.day)))
+                self.__file.flush()
+                os.fsync(self.__file.fileno())
+        finally:
+            self.__file.close()
+            self.__file = None
+
+    @property
+    def field_names(self) -> list:
+        return self.header.field_names
+
+    def __enter__(self):
+        if self.__file is None:
+            self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,8 +1,35 @@
+import argparse
+import configparser
+import itertools
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from functools import partial
 from pathlib import Path
 from tqdm import tqdm
 
+from clases.backup import BackupManager
+from clases.columns import ColumnDiscovery, load_map, merge_maps, save_map, to_table_path
+from clases.catalog import CatalogPass
+from clases.checkpoint import CheckpointManager, fingerprint
+from clases.copier import FolderCopier
 from clases.dbf import DBFManager
+from clases.directory import DirectoryIndex
+from clases.fleet import FleetManager
+from clases.inventory import PathInventory
+from clases.journal import JournalManager, rollback_entries
+from clases.metrics import Metrics, Profiler
 from clases.path import PathManager
+from clases.plan import PlanManager, apply_entries
+from clases.reader import DBFFormatError
+from clases.retry import RetryQueue, is_lock_error
+from clases.rules import RuleSet
+from clases.schedule import WorkScheduler
+from clases.verify import PathVerifier
+from clases.watch import CatalogWatcher
 
 
 """
@@ -26,8 +53,854 @@ junto con este programa. En caso contrario, consulta <https://www.gnu.org/licens
 """
 
 
-def main():
-    tablas = DBFManager()
+def nuevo_resultado(empresa_path: str, path_manager, nombre: str = None) -> dict:
+    """Resultado vacío del procesamiento de una empresa."""
+    return {
+        "empresa": nombre if nombre is not None else empresa_path[path_manager.indexCompanyName():],
+        "path": empresa_path,
+        "ok": True,
+        "cambios": 0,
+        "bitacora": None,
+        "plan": [],
+        "completadas": [],
+        "bloqueadas": [],
+        "reanudadas": 0,
+        "omitidas": 0,
+        "cache": {"hits": 0, "misses": 0},
+        "reglas": [],
+        "metricas": {},
+        "segundos": 0.0,
+        "mensajes": []
+    }
+
+
+def procesar_empresa(empresa_path: str, path_manager, solo_plan: bool = False, completadas: dict = None,
+                     medir: bool = False, solo_tablas=None, nombre: str = None, bitacora: str = None) -> dict:
+    """
+    Procesa las tablas de una empresa con su propio DBFManager.
+
+    Se ejecuta dentro de un worker (hilo o proceso), por lo que no imprime
+    nada: los mensajes (incluidos los de DBFManager) se regresan en
+    "mensajes" para que main los muestre en el orden del catálogo.
+
+    Con solo_plan=True las tablas se leen sin modificarse y en "plan" se
+    regresan los cambios que se aplicarían, como (ruta_tabla, cambios).
+
+    completadas ({tabla: huella}) son las tablas terminadas en una corrida
+    anterior; se omiten si su huella no ha cambiado. Las tablas terminadas
+    en esta corrida se regresan en "completadas" como (tabla, huella).
+
+    Con medir=True (--profile) se regresan en "metricas" los tiempos y
+    contadores de cada tabla y en "segundos" el tiempo de la empresa.
+
+    Las tablas que no se pudieron escribir porque otro programa las tiene
+    abiertas se regresan en "bloqueadas" como (tabla, error), sin marcar la
+    empresa con error, para reintentarlas después. solo_tablas limita el
+    procesamiento a esos nombres de tabla (reintentos). nombre reemplaza el
+    nombre de la empresa cuando la carpeta no está bajo la ruta de
+    instalación (p. ej. su copia en la base nueva con --relocate).
+
+    bitacora es la parte de la bitácora de la empresa (JournalManager.part_path):
+    los cambios de cada lote de cada tabla se escriben ahí y se sincronizan
+    a disco antes de modificar la tabla. En "cambios" se regresa solo el
+    número de registros modificados y en "bitacora" la parte, si se usó,
+    para integrarla con JournalManager.merge.
+    """
+    inicio = time.perf_counter()
+    cache_inicial = path_manager.cache_info()
+    reglas_inicial = list(path_manager.rule_hits)
+    resultado = nuevo_resultado(empresa_path, path_manager, nombre)
+    nombre_empresa = resultado["empresa"]
+    # Los mensajes de DBFManager (cierre de tablas, truncados...) van al resultado
+    tablas = DBFManager(metrics=Metrics(enabled=medir), output=resultado["mensajes"].append)
+    parte = None
+
+    def registrar(cambios):
+        """Escribe en la parte de la bitácora los cambios de un lote antes de aplicarlos."""
+        nonlocal parte
+        if parte is None:
+            parte = JournalManager(bitacora).open(append=True)
+            resultado["bitacora"] = bitacora
+        parte.write(nombre_empresa, empresa_path, cambios)
+        parte.sync()
+
+    on_apply = registrar if bitacora is not None else None
+
+    # Una sola lectura de la carpeta; las tablas se resuelven sin distinguir mayúsculas
+    try:
+        indice = DirectoryIndex.scan(empresa_path)
+    except OSError as e:
+        resultado["mensajes"].append(f"{nombre_empresa}: carpeta no accesible ({e})")
+        resultado["ok"] = False
+        return resultado
+
+    for tabla_nombre, columnas in path_manager.tablePath:
+        if solo_tablas is not None and tabla_nombre not in solo_tablas:
+            continue
+        tabla_path = indice.resolve(tabla_nombre)
+
+        if tabla_path is None:
+            if tabla_nombre.lower() not in path_manager.requiredTables:
+                continue
+            resultado["mensajes"].append(f"{nombre_empresa}: {tabla_nombre} no encontrado")
+            resultado["ok"] = False
+            continue
+
+        huella_previa = (completadas or {}).get(tabla_nombre)
+        if huella_previa is not None and fingerprint(tabla_path) == huella_previa:
+            resultado["reanudadas"] += 1
+            continue
+
+        try:
+            if solo_plan:
+                cambios = tablas.plan_info(tabla_path, columnas, path_manager)
+                resultado["plan"].append((str(tabla_path), cambios))
+            else:
+                # Procesar tabla (cada lote queda en la bitácora antes de escribirse)
+                tablas.update_info(tabla_path, columnas, path_manager, on_apply=on_apply)
+                cambios = tablas.changed
+                if tablas.last_error is None:
+                    resultado["completadas"].append((tabla_nombre, fingerprint(tabla_path)))
+                elif is_lock_error(tablas.last_error):
+                    resultado["bloqueadas"].append((tabla_nombre, str(tablas.last_error)))
+                    resultado["mensajes"].append(f"Advertencia: {nombre_empresa}/{tabla_nombre} en uso, se reintentará")
+                else:
+                    resultado["mensajes"].append(f"Error en {nombre_empresa}/{tabla_nombre}: {tablas.last_error}")
+                    resultado["ok"] = False
+
+            if cambios:
+                # Resumen de cambios en esta tabla
+                if solo_plan:
+                    resultado["mensajes"].append(f"{nombre_empresa}/{tabla_nombre}: {len(cambios)} cambio(s) planeado(s)")
+                else:
+                    resultado["cambios"] += cambios
+                    resultado["mensajes"].append(f"{nombre_empresa}/{tabla_nombre}: {cambios} cambio(s)")
+
+        except Exception as e:
+            resultado["mensajes"].append(f"Error en {nombre_empresa}/{tabla_nombre}: {e}")
+            resultado["ok"] = False
+
+    if parte is not None:
+        parte.close()
+
+    # Tablas que el prefiltro descartó sin abrirlas
+    resultado["omitidas"] = tablas.skipped_tables
+
+    # Aciertos/fallos del memo de rutas en esta empresa, solo en un worker en proceso
+    # (su copia del PathManager es exclusiva de la empresa); con hilos el memo es
+    # compartido, la diferencia mezclaría los de otros workers y main lo lee directamente
+    if multiprocessing.parent_process() is not None:
+        cache_final = path_manager.cache_info()
+        resultado["cache"] = {
+            "hits": cache_final["hits"] - cache_inicial["hits"],
+            "misses": cache_final["misses"] - cache_inicial["misses"]
+        }
+        resultado["reglas"] = [final - inicial for final, inicial in zip(path_manager.rule_hits, reglas_inicial)]
+
+    if medir:
+        resultado["metricas"] = tablas.metrics.tables
+        resultado["segundos"] = time.perf_counter() - inicio
+
+    return resultado
+
+
+def procesar_empresa_limitado(limite, *args, **kwargs) -> dict:
+    """procesar_empresa dentro de un semáforo global (modo flota)."""
+    with limite:
+        return procesar_empresa(*args, **kwargs)
+
+
+def iterar_empresas(empresas: list, path_manager, workers: int = 1, executor: str = "thread",
+                    al_terminar=None, solo_plan: bool = False, checkpoint=None, limite=None,
+                    medir: bool = False, orden: list = None, journal: JournalManager = None):
+    """
+    Procesa las empresas y regresa los resultados en el orden del catálogo.
+
+    empresas puede ser una lista o un iterable que se va leyendo (p. ej.
+    DBFManager.iter_info a través de leer_en_cola). Con workers > 1 las
+    empresas se reparten en un pool acotado de hilos o procesos, con a lo
+    más 2 * workers empresas enviadas a la vez; los resultados que terminan
+    antes se retienen hasta que todas las empresas previas han terminado,
+    para que la salida sea determinista.
+    al_terminar(resultado) se llama en el hilo principal en cuanto termina
+    cada empresa, en el orden en que terminan (útil para avanzar la barra de
+    progreso, integrar su parte de la bitácora y marcar sus tablas en el
+    avance); también se llama para las que terminan durante una
+    interrupción, aunque ya no se entreguen. Con checkpoint
+    (CheckpointManager) se omiten las tablas ya completadas. limite es un
+    semáforo compartido entre instalaciones (modo flota, solo hilos).
+    medir activa las métricas por tabla (--profile). orden son los índices
+    de las empresas en el orden en que se inician en el pool (p. ej. las
+    más grandes primero, WorkScheduler.order); con un solo worker el orden
+    no cambia el tiempo total y se usa el del catálogo. Con journal cada
+    empresa registra sus cambios en su parte de la bitácora (part_path)
+    antes de escribir, y la parte queda en resultado["bitacora"].
+    """
+    # Tablas completadas en la corrida anterior, agrupadas por empresa
+    completadas = {}
+    if checkpoint is not None:
+        for (empresa_path, tabla), huella in checkpoint.completed.items():
+            completadas.setdefault(empresa_path, {})[tabla] = huella
+    
+    def parte(empresa_path):
+        return str(journal.part_path(empresa_path)) if journal is not None and not solo_plan else None
+    
+    if workers <= 1 and limite is None:
+        for i, empresa_path in enumerate(empresas):
+            resultado = procesar_empresa(empresa_path, path_manager, solo_plan, completadas.get(empresa_path), medir,
+                                         bitacora=parte(empresa_path))
+            if al_terminar is not None:
+                al_terminar(resultado)
+            yield i, resultado
+        return
+
+    pool_class = ProcessPoolExecutor if executor == "process" and limite is None else ThreadPoolExecutor
+    tarea = procesar_empresa if limite is None else partial(procesar_empresa_limitado, limite)
+    trabajos = ((i, empresas[i]) for i in orden) if orden is not None else enumerate(empresas)
+    en_vuelo = 2 * workers
+    futuros = {}
+    pendientes = {}
+    siguiente = 0
+
+    pool = pool_class(max_workers=workers)
+
+    def enviar():
+        # Solo se toman del catálogo las empresas que caben en vuelo
+        for i, empresa_path in itertools.islice(trabajos, max(0, en_vuelo - len(futuros))):
+            futuro = pool.submit(tarea, empresa_path, path_manager, solo_plan, completadas.get(empresa_path), medir,
+                                 bitacora=parte(empresa_path))
+            futuros[futuro] = (i, empresa_path)
+
+    def recoger(futuro) -> dict:
+        empresa_path = futuros.pop(futuro)[1]
+        try:
+            return futuro.result()
+        except Exception as e:
+            # Falla del worker (p. ej. proceso terminado): contar como error
+            resultado = nuevo_resultado(empresa_path, path_manager)
+            resultado["ok"] = False
+            resultado["mensajes"].append(f"Error en worker para {empresa_path}: {e}")
+            # Lo que el worker alcanzó a registrar antes de fallar
+            resultado["bitacora"] = parte(empresa_path)
+            return resultado
+
+    try:
+        enviar()
+        while futuros:
+            terminados, _ = wait(futuros, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                i = futuros[futuro][0]
+                resultado = recoger(futuro)
+                if al_terminar is not None:
+                    al_terminar(resultado)
+                pendientes[i] = resultado
+            enviar()
+
+            # Liberar en orden todos los resultados contiguos disponibles
+            while siguiente in pendientes:
+                yield siguiente, pendientes.pop(siguiente)
+                siguiente += 1
+    except BaseException:
+        # Ctrl-C o cierre del generador: no iniciar las empresas pendientes
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Las que sí terminaron pasan por al_terminar (bitácora y avance) aunque no se entreguen
+        if al_terminar is not None:
+            for futuro in [f for f in futuros if not f.cancelled()]:
+                al_terminar(recoger(futuro))
+        raise
+    pool.shutdown(wait=True)
+
+
+def leer_en_cola(empresas, tamano: int = 64):
+    """
+    Lee un iterable de empresas (p. ej. un CatalogPass) en un hilo
+    aparte hacia una cola acotada y las entrega conforme llegan: la lectura
+    del catálogo se traslapa con el procesamiento y en memoria nunca hay
+    más de tamano empresas pendientes. Al cerrar el generador se espera a
+    que el hilo lector termine, así que después se puede cerrar empresas.
+    """
+    cola = queue.Queue(maxsize=tamano)
+    fin = object()
+    detener = threading.Event()
+    
+    def poner(elemento) -> bool:
+        # Espera lugar en la cola salvo que el consumidor ya se haya detenido
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def productor():
+        try:
+            for empresa_path in empresas:
+                if not poner(empresa_path):
+                    return
+        finally:
+            poner(fin)
+    
+    hilo = threading.Thread(target=productor, name="catalogo", daemon=True)
+    hilo.start()
+    try:
+        while True:
+            empresa_path = cola.get()
+            if empresa_path is fin:
+                return
+            yield empresa_path
+    finally:
+        # No regresar mientras el productor siga recorriendo empresas (p. ej. antes de cerrar el catálogo)
+        detener.set()
+        hilo.join()
+
+
+def registrar_en_bitacora(journal: JournalManager, empresa: str, empresa_path: str, table_dir, cambios):
+    """on_apply de DBFManager.update_info: escribe los cambios en la bitácora y los sincroniza antes de aplicarlos."""
+    journal.write(empresa, empresa_path, cambios, table_dir=table_dir)
+    journal.sync()
+
+
+def medir_trabajo(args, path_manager, empresas: list, salida=print, checkpoint=None) -> WorkScheduler:
+    """
+    Etapa de programación: lee el encabezado y el tamaño de cada tabla de
+    cada empresa para ordenar el trabajo de mayor a menor y mostrar el
+    avance en bytes y registros. Con checkpoint se excluyen las tablas ya
+    completadas.
+    """
+    salida("Midiendo tablas de empresas (encabezados y tamaños)...")
+    programa = WorkScheduler(
+        [tabla for tabla, _ in path_manager.tablePath], workers=max(4, args.workers)
+    ).measure(empresas, checkpoint.completed if checkpoint is not None else None)
+    salida(f"Trabajo: {programa.records:,} registro(s), {programa.bytes / 1e6:,.1f} MB en {len(empresas)} empresa(s)")
+    if args.workers > 1:
+        mayores = ", ".join(
+            f"{empresa_path[path_manager.indexCompanyName():]} ({tam['bytes'] / 1e6:,.1f} MB)"
+            for empresa_path, tam in programa.largest() if tam["bytes"]
+        )
+        if mayores:
+            salida(f"Se inician primero las empresas más grandes: {mayores}")
+    return programa
+
+
+def barra_trabajo(programa: WorkScheduler, descripcion: str, progreso: bool = True):
+    """
+    Barra de progreso en bytes (con el avance en registros) para las
+    empresas medidas; sin programa (--stream) avanza por empresa.
+    """
+    if programa is None:
+        return tqdm(desc=descripcion, unit="empresa", disable=not progreso)
+    return tqdm(total=programa.bytes or None, desc=descripcion, unit="B", unit_scale=True,
+                unit_divisor=1024, disable=not progreso)
+
+
+def avanzar_trabajo(pbar, programa: WorkScheduler, resultado: dict):
+    """Avanza la barra con los bytes y registros de una empresa terminada."""
+    if programa is None:
+        pbar.set_description(f"[{pbar.n + 1}] {resultado['empresa']}")
+        pbar.update(1)
+        return
+    tam = programa.complete(resultado["path"])
+    pbar.set_description(f"[{programa.done_companies}/{len(programa.sizes)}] {resultado['empresa']}")
+    pbar.set_postfix_str(f"{programa.done_records:,}/{programa.records:,} registros", refresh=False)
+    pbar.update(tam["bytes"])
+
+
+def generar_plan(args, path_manager, mgw_path: Path, empresas: list, perfil: Profiler = None):
+    """Recorre catálogo y empresas en solo lectura y escribe el plan de cambios."""
+    perfil = perfil or Profiler(None)
+    # Los mensajes del catálogo (truncados, errores...) llevan el prefijo de la instalación en modo flota
+    tablas = DBFManager(metrics=Metrics(enabled=perfil.enabled), output=salida)
+    plan = PlanManager(args.plan).create(path_manager)
+    empresas_con_errores = 0
+    tablas_omitidas = 0
+
+    try:
+        print("Generando plan para el catálogo principal (MGW00001.DBF)...")
+        plan.add(mgw_path, tablas.plan_info(mgw_path, ["CRUTADATOS", "CRUTARES01"], path_manager))
+        tablas_omitidas += tablas.skipped_tables
+        perfil.add_company(str(mgw_path), tablas.metrics.tables)
+
+        programa = medir_trabajo(args, path_manager, empresas)
+        print("Generando plan para las tablas de empresas...\n")
+        with barra_trabajo(programa, "Planeando") as pbar:
+            for _, resultado in iterar_empresas(
+                empresas, path_manager,
+                workers=args.workers,
+                executor=args.executor,
+                al_terminar=partial(avanzar_trabajo, pbar, programa),
+                solo_plan=True,
+                medir=perfil.enabled,
+                orden=programa.order(empresas)
+            ):
+                for mensaje in resultado["mensajes"]:
+                    pbar.write(mensaje)
+                for tabla_path, cambios in resultado["plan"]:
+                    plan.add(tabla_path, cambios)
+                perfil.add_company(resultado["path"], resultado["metricas"], resultado["segundos"])
+                tablas_omitidas += resultado["omitidas"]
+                if not resultado["ok"]:
+                    empresas_con_errores += 1
+    finally:
+        plan.close()
+
+    print("\n" + "=" * 70)
+    print("RESUMEN DEL PLAN (no se modificó ninguna tabla)")
+    print("=" * 70)
+    print(f"Archivo de plan:                  {plan.plan_path.absolute()}")
+    print(f"Tablas con cambios:               {len(plan.tables)}")
+    print(f"Campos a modificar:               {plan.entries}")
+    print(f"Campos que se truncarían:         {plan.truncated}")
+    print(f"Tablas omitidas (sin rutas a cambiar): {tablas_omitidas}")
+    print(f"Empresas con errores:             {empresas_con_errores}")
+    print("=" * 70)
+    if plan.truncated:
+        print("ADVERTENCIA: Revise en el plan las entradas con \"truncado\": true")
+    print(f"Para aplicar el plan: python main.py --apply {args.plan}")
+
+
+def aplicar_plan(args):
+    """Ejecuta exactamente un plan generado con --plan, verificando los valores previos."""
+    print("=" * 70)
+    print(f"Aplicando plan: {args.apply}")
+    print("=" * 70)
+
+    try:
+        header, tablas_plan = PlanManager(args.apply).read()
+    except (OSError, ValueError) as e:
+        print(f"ERROR: No se pudo leer el plan: {e}")
+        return
+
+    print(f"Plan generado: {header.get('creado', '?')}")
+    print(f"Base destino:  {header.get('newBase', '?')}")
+    print(f"Tablas en el plan: {len(tablas_plan)}\n")
+
+    journal = JournalManager(args.journal, compress=args.gzip).open()
+    try:
+        totales = aplicar_por_tabla(tablas_plan, args.workers, "Aplicando", journal)
+    finally:
+        journal.close()
+
+    print("\n" + "=" * 70)
+    print("RESUMEN DE APLICACIÓN DEL PLAN")
+    print("=" * 70)
+    imprimir_totales(totales, "Plan")
+    print(f"Bitácora de cambios:              {journal.journal_path.absolute()}")
+
+
+def aplicar_por_tabla(tablas_plan: dict, workers: int, descripcion: str, journal: JournalManager = None) -> dict:
+    """
+    Ejecuta apply_entries para cada tabla en un pool de hilos y reporta en
+    el orden de tablas_plan. Con journal, los cambios de cada tabla se
+    escriben en la bitácora antes de modificarla, así que la corrida se
+    puede deshacer con --rollback. Regresa los totales de aplicados, ya
+    aplicados, conflictos y tablas con errores.
+    """
+    totales = {"aplicados": 0, "ya_aplicados": 0, "conflictos": [], "tablas_con_errores": 0}
+    candado = threading.Lock()
+
+    def registrar(tabla, cambios):
+        carpeta = Path(tabla).parent
+        # Las tablas de empresa están en su carpeta; el catálogo se registra con empresa ""
+        empresa = "" if Path(tabla).name.upper() == "MGW00001.DBF" else carpeta.name
+        with candado:
+            registrar_en_bitacora(journal, empresa, str(carpeta), carpeta, cambios)
+
+    def aplicar_tabla(tabla):
+        on_apply = partial(registrar, tabla) if journal is not None else None
+        return apply_entries(Path(tabla), tablas_plan[tabla], on_apply=on_apply, output=tqdm.write)
+
+    orden = list(tablas_plan)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, \
+            tqdm(total=len(orden), desc=descripcion, unit="tabla") as pbar:
+        futuros = [pool.submit(aplicar_tabla, tabla) for tabla in orden]
+        for futuro in as_completed(futuros):
+            pbar.update(1)
+
+        # Reportar en el orden del plan
+        for tabla, futuro in zip(orden, futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                pbar.write(f"Error en {tabla}: {e}")
+                totales["tablas_con_errores"] += 1
+                continue
+            totales["aplicados"] += len(resultado["aplicados"])
+            totales["ya_aplicados"] += len(resultado["ya_aplicados"])
+            totales["conflictos"].extend(resultado["conflictos"])
+            if resultado["aplicados"]:
+                pbar.write(f"{tabla}: {len(resultado['aplicados'])} campo(s) actualizado(s)")
+
+    return totales
+
+
+def imprimir_totales(totales: dict, origen: str):
+    """Resumen común de --apply y --rollback (origen: "Plan" o "Bitácora")."""
+    conflictos = totales["conflictos"]
+    print(f"Campos actualizados:              {totales['aplicados']}")
+    print(f"Campos que ya estaban aplicados:  {totales['ya_aplicados']}")
+    print(f"Conflictos (no aplicados):        {len(conflictos)}")
+    print(f"Tablas con errores:               {totales['tablas_con_errores']}")
+    print("=" * 70)
+
+    for conflicto in conflictos[:20]:
+        print(f"{conflicto['tabla']} registro {conflicto['registro']} {conflicto['campo']}: {conflicto['motivo']}")
+        print(f"   {origen + ':':<9} {conflicto['antes']}")
+        print(f"   Actual:   {conflicto['actual']}")
+    if len(conflictos) > 20:
+        print(f"... y {len(conflictos) - 20} conflicto(s) más")
+
+
+def revertir_cambios(args):
+    """
+    Deshace una corrida a partir de su bitácora de cambios: regresa el valor
+    original solo en los campos modificados, si su valor actual sigue siendo
+    el que escribió la corrida. La reversión registra sus propios cambios en
+    la bitácora (--journal) antes de escribir, así que también se puede
+    deshacer con --rollback.
+    """
+    print("=" * 70)
+    print(f"Revirtiendo cambios de la bitácora: {args.rollback}")
+    print("=" * 70)
+
+    try:
+        bitacora = JournalManager(args.rollback)
+        # Cambios registrados por empresas que no alcanzaron a integrarse
+        bitacora.recover()
+        tablas_plan = rollback_entries(bitacora)
+    except OSError as e:
+        print(f"ERROR: No se pudo leer la bitácora: {e}")
+        return
+
+    campos = sum(len(entradas) for entradas in tablas_plan.values())
+    print(f"Tablas a revertir: {len(tablas_plan)}")
+    print(f"Campos a revertir: {campos}\n")
+
+    # La bitácora que se revierte ya existe: open() registra la reversión en otra con fecha y hora
+    journal = JournalManager(args.journal, compress=args.gzip).open()
+    try:
+        totales = aplicar_por_tabla(tablas_plan, max(4, args.workers), "Revirtiendo", journal)
+    finally:
+        journal.close()
+
+    print("\n" + "=" * 70)
+    print("RESUMEN DE REVERSIÓN")
+    print("=" * 70)
+    imprimir_totales(totales, "Bitácora")
+    print(f"Bitácora de la reversión:         {journal.journal_path.absolute()}")
+
+
+def recortar(texto: str, largo: int = 50) -> str:
+    return texto[:largo] + "..." if len(texto) > largo else texto
+
+
+def agrupar_por_empresa(journal):
+    """Agrupa los cambios consecutivos de la bitácora por empresa ("" es el catálogo)."""
+    actual = None
+    grupo = []
+    for cambio in journal.read():
+        clave = (cambio["empresa"], cambio["path"])
+        if clave != actual and grupo:
+            yield actual, grupo
+            grupo = []
+        actual = clave
+        grupo.append(cambio)
+    if grupo:
+        yield actual, grupo
+
+
+def imprimir_detalle(journal):
+    """Imprime el detalle de cambios leyendo la bitácora de vuelta."""
+    print("\n" + "=" * 70)
+    print("DETALLE DE CAMBIOS")
+    print("=" * 70)
+    
+    encabezado_empresas = False
+    num_catalogo = 0
+    
+    for (empresa, empresa_path), cambios in agrupar_por_empresa(journal):
+        if empresa == "":
+            # Cambios en catálogo
+            if num_catalogo == 0:
+                print("CATÁLOGO PRINCIPAL (MGW00001.DBF)")
+                print("=" * 70)
+            for cambio in cambios:
+                num_catalogo += 1
+                print(f"\n[Empresa #{num_catalogo}] Registro: {cambio.get('registro', '?')}")
+                for col in cambio['antes'].keys():
+                    print(f"{col}:")
+                    print(f"Antes: {recortar(cambio['antes'][col])}")
+                    print(f"Ahora: {recortar(cambio['despues'][col])}")
+            continue
+        
+        if not encabezado_empresas:
+            print("\n" + "=" * 70)
+            print("TABLAS DE CADA EMPRESA (mgw10006.dbf, mgw10000.dbf)")
+            print("=" * 70)
+            encabezado_empresas = True
+        
+        print(f"{empresa}")
+        print(f"Ruta: {empresa_path}")
+        print(f"Cambios: {len(cambios)}")
+        
+        # Mostrar primeros cambios como ejemplo
+        for i, cambio in enumerate(cambios[:2], 1):
+            print(f"\n   Cambio #{i} en {cambio['tabla']}:")
+            for col in cambio['antes'].keys():
+                print(f"{col}:")
+                print(f"Antes: {recortar(cambio['antes'][col])}")
+                print(f"Ahora: {recortar(cambio['despues'][col])}")
+        
+        if len(cambios) > 2:
+            print(f"   ... y {len(cambios) - 2} cambio(s) más")
+
+
+def escribir_log(journal, log_file: Path):
+    """Genera el log de texto completo a partir de la bitácora de cambios."""
+    with open(log_file, 'w', encoding='utf-8') as f:
+        f.write("="*80 + "\n")
+        f.write("LOG DE CAMBIOS - CONTPAQi Facturación Electrónica\n")
+        f.write("="*80 + "\n\n")
+        
+        num_catalogo = 0
+        
+        for (empresa, empresa_path), cambios in agrupar_por_empresa(journal):
+            if empresa == "":
+                # Catálogo principal
+                if num_catalogo == 0:
+                    f.write("="*80 + "\n")
+                    f.write("CATÁLOGO PRINCIPAL DE EMPRESAS (MGW00001.DBF)\n")
+                    f.write("="*80 + "\n\n")
+                
+                for cambio in cambios:
+                    num_catalogo += 1
+                    f.write(f"[Empresa #{num_catalogo}] Registro: {cambio.get('registro', '?')}\n")
+                    f.write("-" * 80 + "\n")
+                    
+                    for col in cambio['antes'].keys():
+                        f.write(f"  Campo: {col}\n")
+                        f.write(f"    ANTES: {cambio['antes'][col]}\n")
+                        f.write(f"    AHORA: {cambio['despues'][col]}\n")
+                    f.write("\n")
+                continue
+            
+            # Tablas de empresas
+            f.write(f"\n{'='*80}\n")
+            f.write(f"EMPRESA: {empresa}\n")
+            f.write(f"RUTA: {empresa_path}\n")
+            f.write(f"{'='*80}\n\n")
+            
+            for i, cambio in enumerate(cambios, 1):
+                f.write(f"[Cambio #{i}] Archivo: {cambio['tabla']}\n")
+                f.write(f"  Registro: {cambio.get('registro', '?')}\n")
+                f.write("-" * 80 + "\n")
+                
+                for col in cambio['antes'].keys():
+                    f.write(f"  Campo: {col}\n")
+                    f.write(f"    ANTES: {cambio['antes'][col]}\n")
+                    f.write(f"    AHORA: {cambio['despues'][col]}\n")
+                f.write("\n")
+
+
+def verificar_rutas(args):
+    """
+    Verifica que existan las rutas escritas por una corrida (valores
+    nuevos de la bitácora de cambios) y muestra el resultado por empresa y
+    columna. Las rutas UNC se traducen a montajes locales con --mount.
+    """
+    print("=" * 70)
+    print(f"Verificando rutas de la bitácora: {args.verify}")
+    print("=" * 70)
+
+    try:
+        montajes = RuleSet([m.split("=", 1) for m in args.mount]) if args.mount else None
+    except ValueError as e:
+        print(f"ERROR: Montaje inválido (use --mount \"\\\\SERVIDOR\\Recurso=RUTA_LOCAL\"): {e}")
+        return
+
+    # Último valor escrito de cada campo (la bitácora puede tener varias corridas)
+    escritos = {}
+    try:
+        bitacora = JournalManager(args.verify)
+        bitacora.recover()
+        for cambio in bitacora.read():
+            antes = cambio.get("antes") or {}
+            for campo, ruta in (cambio.get("despues") or {}).items():
+                if ruta and ruta != antes.get(campo):
+                    escritos[(cambio["ruta_tabla"], cambio["registro"], campo)] = (cambio["empresa"], ruta)
+    except OSError as e:
+        print(f"ERROR: No se pudo leer la bitácora: {e}")
+        return
+
+    verificador = PathVerifier(montajes)
+    rutas = sorted({ruta for _, ruta in escritos.values()})
+    print(f"Campos reescritos: {len(escritos)} ({len(rutas)} ruta(s) distintas)\n")
+
+    with ThreadPoolExecutor(max_workers=max(4, args.workers)) as pool:
+        estados = dict(zip(rutas, tqdm(pool.map(verificador.check, rutas), total=len(rutas),
+                                        desc="Verificando", unit="ruta")))
+
+    grupos = {}
+    problemas = []
+    for (tabla, registro, campo), (empresa, ruta) in escritos.items():
+        grupo = grupos.setdefault((empresa or "(catálogo)", campo), {
+            PathVerifier.OK: 0, PathVerifier.MISSING: 0, PathVerifier.UNMAPPED: 0
+        })
+        estado = estados[ruta]
+        grupo[estado] += 1
+        if estado != PathVerifier.OK:
+            problemas.append({"empresa": empresa, "campo": campo, "tabla": tabla,
+                              "registro": registro, "ruta": ruta, "estado": estado})
+
+    print("\n" + "=" * 86)
+    print(f"{'Empresa':<30} {'Columna':<12} {'Campos':>8} {'OK':>8} {'No existen':>11} {'Sin montaje':>12}")
+    print("-" * 86)
+    for (empresa, campo), grupo in sorted(grupos.items()):
+        total = sum(grupo.values())
+        print(f"{recortar(empresa, 30):<30} {campo:<12} {total:>8} {grupo[PathVerifier.OK]:>8} "
+              f"{grupo[PathVerifier.MISSING]:>11} {grupo[PathVerifier.UNMAPPED]:>12}")
+    print("=" * 86)
+    print(f"Carpetas listadas: {verificador.listings} (una por carpeta, no una por ruta)")
+
+    faltantes = [p for p in problemas if p["estado"] == PathVerifier.MISSING]
+    for problema in faltantes[:20]:
+        print(f"No existe: {problema['ruta']}  ({problema['empresa'] or 'catálogo'} {problema['campo']}, registro {problema['registro']})")
+    if len(faltantes) > 20:
+        print(f"... y {len(faltantes) - 20} ruta(s) más")
+    if any(p["estado"] == PathVerifier.UNMAPPED for p in problemas):
+        print("Advertencia: hay rutas UNC sin montaje local; indíquelo con --mount \"\\\\SERVIDOR\\Recurso=RUTA_LOCAL\"")
+
+    reporte = Path("verificacion_rutas.json")
+    with open(reporte, "w", encoding="utf-8") as f:
+        json.dump({
+            "bitacora": str(args.verify),
+            "grupos": [
+                dict(empresa=empresa, campo=campo, **grupo)
+                for (empresa, campo), grupo in sorted(grupos.items())
+            ],
+            "problemas": problemas
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Reporte completo: {reporte.absolute()}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Cambio de rutas en tablas DBF de Contpaqi Factura Electrónica"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Número de empresas a procesar en paralelo (por defecto: 1, secuencial)"
+    )
+    parser.add_argument(
+        "--executor", choices=["thread", "process"], default="thread",
+        help="Tipo de worker para el modo paralelo (por defecto: thread)"
+    )
+    parser.add_argument(
+        "--checkpoint", metavar="ARCHIVO", default="cambio_rutas.checkpoint.jsonl",
+        help="Bitácora de tablas completadas (por defecto: cambio_rutas.checkpoint.jsonl)"
+    )
+    parser.add_argument(
+        "--journal", metavar="ARCHIVO", default="cambios_rutas.jsonl",
+        help="Bitácora JSON Lines con cada cambio aplicado; si ya existe y no se usa --resume, "
+             "se crea otra con la fecha y hora en el nombre (por defecto: cambios_rutas.jsonl)"
+    )
+    parser.add_argument(
+        "--gzip", action="store_true",
+        help="Comprime la bitácora de cambios con gzip"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Reanuda una corrida interrumpida omitiendo las tablas completadas que no han cambiado"
+    )
+    columnas = parser.add_mutually_exclusive_group()
+    columnas.add_argument(
+        "--discover", metavar="ARCHIVO", nargs="?", const="columnas_rutas.json",
+        help="Descubre las columnas con rutas de todas las tablas y guarda el mapa (por defecto: columnas_rutas.json)"
+    )
+    columnas.add_argument(
+        "--columns", metavar="ARCHIVO",
+        help="Usa un mapa de tablas y columnas guardado con --discover en lugar del predeterminado"
+    )
+    parser.add_argument(
+        "--mount", metavar="UNC=LOCAL", action="append", default=[],
+        help="Para --verify: traduce un prefijo UNC a una ruta local (puede repetirse)"
+    )
+    parser.add_argument(
+        "--rules", metavar="ARCHIVO",
+        help="Reglas adicionales 'prefijo anterior -> base nueva' (una por línea) para consolidar varias bases"
+    )
+    parser.add_argument(
+        "--backup", metavar="CARPETA",
+        help="Antes de escribir, respalda en CARPETA solo las tablas que se van a modificar "
+             "(copia .gz completa; el reflink instantáneo solo está disponible en Linux con btrfs/XFS)"
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Procesa cada empresa en cuanto se lee del catálogo, sin medir ni ordenar por tamaño "
+             "(no se combina con --discover ni --backup)"
+    )
+    parser.add_argument(
+        "--lock-wait", metavar="SEGUNDOS", type=float, default=300.0,
+        help="Tiempo máximo de espera al final para reintentar tablas en uso por otro programa (por defecto: 300)"
+    )
+    parser.add_argument(
+        "--interval", metavar="SEGUNDOS", type=float, default=30.0,
+        help="Para --watch: segundos entre revisiones del catálogo (por defecto: 30)"
+    )
+    parser.add_argument(
+        "--profile", metavar="PREFIJO", nargs="?", const="perfil_rutas",
+        help="Guarda un perfil cProfile (PREFIJO.prof) y métricas por tabla (PREFIJO.metrics.json)"
+    )
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument(
+        "--fleet", metavar="ARCHIVO",
+        help="Modo flota: procesa sin preguntas todas las instalaciones de un archivo INI"
+    )
+    modo.add_argument(
+        "--plan", metavar="ARCHIVO",
+        help="Solo genera el plan de cambios en ARCHIVO, sin modificar ninguna tabla"
+    )
+    modo.add_argument(
+        "--apply", metavar="ARCHIVO",
+        help="Aplica un plan generado con --plan (no pide configuración); los cambios se registran "
+             "en la bitácora (--journal) para poder deshacerlos con --rollback"
+    )
+    modo.add_argument(
+        "--verify", metavar="ARCHIVO",
+        help="Verifica que existan las rutas escritas según una bitácora de cambios"
+    )
+    modo.add_argument(
+        "--watch", metavar="ESTADO", nargs="?", const="cambio_rutas.watch.json",
+        help="Vigila MGW00001.DBF y procesa solo las empresas nuevas o modificadas "
+             "(estado por defecto: cambio_rutas.watch.json)"
+    )
+    modo.add_argument(
+        "--audit", metavar="ARCHIVO", nargs="?", const="inventario_rutas.sqlite",
+        help="Solo lectura: inventario SQLite de todas las rutas configuradas y histograma de prefijos base "
+             "(por defecto: inventario_rutas.sqlite)"
+    )
+    modo.add_argument(
+        "--relocate", metavar="CARPETA", nargs="?", const="",
+        help="Copia cada empresa a la base nueva (o a CARPETA) verificando cada archivo y reescribe "
+             "las rutas en la copia"
+    )
+    modo.add_argument(
+        "--rollback", metavar="ARCHIVO",
+        help="Deshace los cambios registrados en una bitácora de cambios (--journal); la reversión "
+             "registra sus propios cambios en otra bitácora (--journal) para poder deshacerla también"
+    )
+    args = parser.parse_args(argv)
+    if args.interval <= 0:
+        parser.error("--interval debe ser mayor que cero")
+    if args.lock_wait < 0:
+        parser.error("--lock-wait no puede ser negativo")
+    if args.stream and (args.discover or args.backup):
+        parser.error("--stream no se puede combinar con --discover ni --backup (necesitan la lista completa de empresas)")
+    return args
+
+
+def configurar_interactivo() -> PathManager:
+    """Pregunta la ruta de instalación y el destino (local o red) y construye el PathManager."""
     type_selection = "0"
     server_name = str()
     server_route = str()
@@ -85,27 +958,22 @@ def main():
     
     # === CONSTRUCCIÓN DE newBase ===
     if len(server_name) == 0:
-        # MODO LOCAL
+        # MODO LOCAL: newBase es solo la letra de disco
         print(str("Advertencia: Nombre del servidor no definido, cambiando a" if type_selection == '1' else "Configurando en") + " modo LOCAL")
-        
-        # En modo local, newBase es solo la letra de disco
-        datosRutas.newBase = datosRutas.letterBase.rstrip("\\")
+        datosRutas.set_target()
         print(f"Base destino: {datosRutas.newBase}")
         
     else:
         # MODO RED
         print(f"Configurando en modo RED (servidor: {server_name})")
         
-        # Construir ruta de red (build_netPath ya maneja la lógica de "Empresas")
-        datosRutas.build_netPath(
+        # newBase es la ruta de red completa hasta "Empresas" (build_netPath ya maneja
+        # la lógica de "Empresas"); change_path extraerá la parte DESPUÉS de "Empresas"
+        datosRutas.set_target(
             hostname=server_name, 
             netPath=server_route if len(server_route) > 1 else None
         )
         
-        # newBase es la ruta de red completa hasta "Empresas"
-        # Esto es correcto porque change_path extraerá la parte DESPUÉS de "Empresas"
-        datosRutas.newBase = datosRutas.get_netPath()
-        
         print(f"Base destino: {datosRutas.newBase}")
         
         # Verificar estructura
@@ -115,120 +983,932 @@ def main():
             print(f"Advertencia: La ruta no termina en 'Empresas'")
             print(f"Esto puede causar rutas incorrectas")
     
-    print("\n" + "=" * 70)
-    print("Iniciando procesamiento...")
-    print("=" * 70)
-    
-    # === PASO 1: OBTENER RUTAS DE EMPRESAS ===
-    print("Leyendo catálogo de empresas...")
+    return datosRutas
+
+
+def buscar_catalogo(datosRutas, salida=print):
+    """
+    Ruta de MGW00001.DBF en la ruta de instalación (sin distinguir
+    mayúsculas), o None si no existe, después de informarlo.
+    """
     mgw_path = Path(datosRutas.get_absPath()) / "MGW00001.DBF"
+    try:
+        mgw_path = DirectoryIndex.scan(mgw_path.parent).resolve(mgw_path.name) or mgw_path
+    except OSError:
+        pass
     
     if not mgw_path.exists():
-        print(f"ERROR: No se encontró {mgw_path}")
-        print("   Verifique que la ruta de instalación sea correcta.")
-        input("\nPresione ENTER para salir...")
+        salida(f"ERROR: No se encontró {mgw_path}")
+        salida("   Verifique que la ruta de instalación sea correcta.")
+        return None
+    return mgw_path
+
+
+def leer_empresas(datosRutas, salida=print):
+    """
+    Lee el catálogo MGW00001.DBF (solo lectura) y regresa (mgw_path, empresas).
+    
+    Si el catálogo no existe o no tiene empresas, regresa (mgw_path, None)
+    después de informar el motivo.
+    """
+    # === PASO 1: OBTENER RUTAS DE EMPRESAS ===
+    salida("Leyendo catálogo de empresas...")
+    mgw_path = buscar_catalogo(datosRutas, salida)
+    if mgw_path is None:
+        return Path(datosRutas.get_absPath()) / "MGW00001.DBF", None
+    
+    empresas = DBFManager().extract_info(mgw_path, path_manager=datosRutas, collect_paths=True)
+    
+    if not empresas:
+        salida("No se encontraron empresas registradas.")
+        return mgw_path, None
+    
+    salida(f"Se encontraron {len(empresas)} empresa(s)")
+    return mgw_path, empresas
+
+
+def descubrir_columnas(args, datosRutas, empresas: list, salida=print):
+    """
+    Define las tablas y columnas de rutas a procesar (datosRutas.tablePath).
+
+    Con --columns se usa un mapa guardado; con --discover se leen solo los
+    encabezados y una muestra de registros de todas las tablas de cada
+    empresa, se unen con las columnas documentadas y el mapa se guarda en
+    JSON para revisarlo o reutilizarlo con --columns. Lanza OSError o
+    ValueError si el mapa no se puede leer.
+    """
+    if args.columns:
+        mapa = load_map(args.columns)
+        datosRutas.tablePath = to_table_path(mapa)
+        salida(f"Columnas de rutas cargadas de {args.columns}: {len(mapa)} tabla(s)")
+        return
+    if not args.discover:
+        return
+    
+    salida("Descubriendo columnas de rutas (encabezados y muestra de registros)...")
+    descubridor = ColumnDiscovery(datosRutas)
+    
+    def escanear(empresa_path):
+        try:
+            indice = DirectoryIndex.scan(empresa_path)
+        except OSError:
+            return {}
+        return descubridor.scan_directory(indice, exclude=["MGW00001.DBF"])
+    
+    with ThreadPoolExecutor(max_workers=max(4, args.workers)) as pool:
+        mapas = list(pool.map(escanear, empresas))
+    
+    documentadas = {tabla.lower(): columnas for tabla, columnas in datosRutas.tablePath}
+    mapa = merge_maps(mapas, base=documentadas)
+    for tabla, columnas in sorted(mapa.items()):
+        nuevas = [c for c in columnas if c not in documentadas.get(tabla, [])]
+        marca = f"  (nuevas: {', '.join(nuevas)})" if nuevas else ""
+        salida(f"   {tabla}: {', '.join(columnas)}{marca}")
+    
+    save_map(args.discover, mapa)
+    datosRutas.tablePath = to_table_path(mapa)
+    salida(f"Mapa de columnas guardado en: {Path(args.discover).absolute()}")
+
+
+def auditar_rutas(args, datosRutas):
+    """
+    Auditoría en solo lectura (--audit): extrae todas las rutas de las
+    columnas configuradas del catálogo y de las tablas de cada empresa a un
+    inventario SQLite, actualizándolo solo en las tablas que cambiaron, y
+    muestra el histograma de prefijos base.
+    """
+    mgw_path, empresas = leer_empresas(datosRutas)
+    if empresas is None:
+        return
+    try:
+        descubrir_columnas(args, datosRutas, empresas)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: No se pudo leer el mapa de columnas: {e}")
         return
     
-    empresas = tablas.extract_info(mgw_path, path_manager=datosRutas, collect_paths=True)
+    def tablas_de(empresa_path):
+        try:
+            indice = DirectoryIndex.scan(empresa_path)
+        except OSError as e:
+            print(f"Advertencia: {empresa_path}: carpeta no accesible ({e})")
+            return []
+        nombre_empresa = empresa_path[datosRutas.indexCompanyName():]
+        return [
+            (nombre_empresa, tabla_path, columnas)
+            for tabla_path, columnas in ((indice.resolve(t), c) for t, c in datosRutas.tablePath)
+            if tabla_path is not None
+        ]
+    
+    tablas = [("", mgw_path, ["CRUTADATOS", "CRUTARES01"])]
+    with ThreadPoolExecutor(max_workers=max(4, args.workers)) as pool:
+        for lista in pool.map(tablas_de, empresas):
+            tablas.extend(lista)
     
+    print(f"Actualizando inventario {Path(args.audit).absolute()} ({len(tablas)} tabla(s))...")
+    with PathInventory(args.audit, datosRutas.basePath, workers=max(4, args.workers)).open() as inventario:
+        inventario.refresh(tablas)
+        for tabla_path, error in inventario.errors:
+            print(f"Error: No se pudo leer {tabla_path}: {error}")
+        totales = inventario.totals()
+        histograma = inventario.histogram()
+    
+    print("\n" + "=" * 90)
+    print("INVENTARIO DE RUTAS (no se modificó ninguna tabla)")
+    print("=" * 90)
+    print(f"Tablas leídas: {inventario.refreshed}, sin cambios: {inventario.unchanged}, "
+          f"eliminadas: {inventario.removed}, con error: {len(inventario.errors)}")
+    print(f"Empresas: {totales['empresas']}, tablas: {totales['tablas']}, "
+          f"rutas: {totales['rutas']}, rutas distintas: {totales['distintas']}")
+    print("-" * 90)
+    print(f"{'Prefijo base':<50} {'Rutas':>10} {'Distintas':>10} {'Empresas':>9}")
+    print("-" * 90)
+    for prefijo, rutas, distintas, num_empresas in histograma:
+        print(f"{recortar(prefijo or '(relativa)', 50):<50} {rutas:>10} {distintas:>10} {num_empresas:>9}")
+    print("=" * 90)
+    if histograma:
+        # Literal SQL: las comillas simples del prefijo se duplican
+        prefijo = histograma[0][0].replace("'", "''")
+        print(f"Ejemplo: sqlite3 {args.audit} \"SELECT empresa, COUNT(*) FROM rutas "
+              f"WHERE prefijo = '{prefijo}' GROUP BY empresa\"")
+
+
+def reubicar_empresas(args, datosRutas, manifiesto: Path = Path("cambio_rutas.copia.jsonl")):
+    """
+    Reubicación (--relocate): copia la carpeta de cada empresa de la ruta de
+    instalación a la base nueva y reescribe las rutas en la copia.
+
+    Los archivos se copian en paralelo, por bloques y verificando el sha256;
+    en cuanto la copia de una empresa queda verificada se reescriben sus
+    tablas en el destino mientras las demás se siguen copiando. Al final se
+    actualizan en el catálogo solo los registros de las empresas
+    reubicadas; las carpetas de origen no se modifican. Con --resume se
+    continúa el manifiesto de la copia: las empresas terminadas se omiten y
+    los archivos ya copiados (cuyo origen no cambió) no se vuelven a copiar.
+    """
+    # Una sola lectura del catálogo: empresas y registros de cada una
+    print("Leyendo catálogo de empresas...")
+    mgw_path = buscar_catalogo(datosRutas)
+    if mgw_path is None:
+        return
+    catalogo = CatalogPass(mgw_path, datosRutas, write=False).run()
+    empresas = list(dict.fromkeys(catalogo.companies))
     if not empresas:
         print("No se encontraron empresas registradas.")
-        input("\nPresione ENTER para salir...")
         return
-    
     print(f"Se encontraron {len(empresas)} empresa(s)")
+
+    origen = datosRutas.get_absPath().rstrip("\\")
+    destino = (args.relocate or datosRutas.target_prefix()).rstrip("\\/")
+    if destino.lower() == origen.lower():
+        print(f"ERROR: La base destino es la misma que la ruta de instalación ({origen})")
+        print("   Indique la carpeta destino: python main.py --relocate CARPETA")
+        return
+
+    try:
+        descubrir_columnas(args, datosRutas, empresas)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: No se pudo leer el mapa de columnas: {e}")
+        return
+
+    # Solo se reubican las carpetas que están dentro de la ruta de instalación
+    prefijo_origen = origen.lower() + "\\"
+    for empresa_path in empresas:
+        if not empresa_path.lower().startswith(prefijo_origen):
+            print(f"Advertencia: {empresa_path} no está en {origen}, no se reubica")
+    empresas = [e for e in empresas if e.lower().startswith(prefijo_origen)]
+
+    # Al menos dos empresas a la vez: mientras una se reescribe, otra se copia
+    workers = max(2, args.workers)
+    copiador = FolderCopier(manifiesto, workers=max(4, args.workers))
+
+    def reubicar(empresa_path):
+        nombre = empresa_path[datosRutas.indexCompanyName():]
+        destino_empresa = Path(destino, *nombre.split("\\"))
+        copia = {"copiados": 0, "omitidos": 0, "bytes": 0, "errores": []}
+        if copiador.is_done(destino_empresa):
+            resultado = nuevo_resultado(str(destino_empresa), datosRutas, nombre)
+            resultado["mensajes"].append(f"{nombre}: reubicada en la corrida anterior, se omite")
+        else:
+            copia = copiador.copy_tree(empresa_path, destino_empresa)
+            if copia["errores"]:
+                resultado = nuevo_resultado(str(destino_empresa), datosRutas, nombre)
+                resultado["ok"] = False
+                resultado["mensajes"].extend(f"Error: No se pudo copiar {ruta}: {error}" for ruta, error in copia["errores"])
+            else:
+                # Copia verificada: se reescriben las rutas de la copia
+                resultado = procesar_empresa(str(destino_empresa), datosRutas, nombre=nombre,
+                                             bitacora=str(journal.part_path(destino_empresa)))
+                if resultado["ok"] and not resultado["bloqueadas"]:
+                    copiador.mark_done(destino_empresa)
+        resultado["copia"] = copia
+        return resultado
+
+    journal = JournalManager(args.journal, compress=args.gzip).open(append=args.resume)
+    reubicadas = []
+    errores = 0
+    cambios_empresas = 0
+    print(f"Reubicando {len(empresas)} empresa(s) de {origen} a {destino} ({workers} a la vez)...")
+    with copiador.open(resume=args.resume), ThreadPoolExecutor(max_workers=workers) as pool, \
+            tqdm(total=len(empresas), desc="Reubicando", unit="empresa") as pbar:
+        futuros = {pool.submit(reubicar, empresa_path): empresa_path for empresa_path in empresas}
+        for futuro in as_completed(futuros):
+            empresa_path = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                resultado = nuevo_resultado(empresa_path, datosRutas)
+                resultado["ok"] = False
+                resultado["mensajes"].append(f"Error en {resultado['empresa']}: {e}")
+            for mensaje in resultado["mensajes"]:
+                pbar.write(mensaje)
+            journal.merge(resultado["bitacora"])
+            cambios_empresas += resultado["cambios"]
+            if resultado["ok"] and not resultado["bloqueadas"]:
+                reubicadas.append(empresa_path)
+            else:
+                errores += 1
+            pbar.update(1)
+
+    # Catálogo: solo los registros de las empresas que quedaron copiadas y reescritas
+    tablas = DBFManager()
+    recnos = [recno for empresa_path in reubicadas for recno in catalogo.company_records.get(empresa_path, [])]
+    if recnos:
+        tablas.update_info(mgw_path, ["CRUTADATOS", "CRUTARES01"], datosRutas, records=recnos,
+                           on_apply=partial(registrar_en_bitacora, journal, "", datosRutas.get_absPath(), mgw_path.parent))
+    journal.close()
+
+    print("\n" + "=" * 70)
+    print("RESUMEN DE LA REUBICACIÓN")
+    print("=" * 70)
+    print(f"Empresas reubicadas: {len(reubicadas)}/{len(empresas)}")
+    print(f"Archivos copiados: {copiador.copied} ({copiador.bytes / 1e6:.1f} MB), "
+          f"ya copiados antes: {copiador.skipped}")
+    print(f"Cambios en tablas de empresas: {cambios_empresas}")
+    print(f"Cambios en catálogo: {tablas.changed}")
+    if tablas.last_error is not None:
+        print(f"Error: No se pudo actualizar el catálogo: {tablas.last_error}")
+    if errores:
+        print(f"Empresas con error: {errores} (el catálogo conserva su ruta anterior)")
+        print(f"   Para continuar: python main.py --relocate {destino} --resume")
+    print(f"Manifiesto de la copia: {Path(manifiesto).absolute()}")
+    print(f"Bitácora de cambios:    {journal.journal_path.absolute()}")
+    print("=" * 70)
+
+
+def respaldar_tablas(args, datosRutas, mgw_path: Path, empresas: list, checkpoint,
+                     salida=print, progreso: bool = True) -> dict:
+    """
+    Respalda en args.backup las tablas que el prefiltro indica que se van a
+    modificar (catálogo y tablas de empresas), con sus archivos de memo e
+    índice. Las tablas ya completadas según la bitácora de avance
+    (checkpoint, opcional) se omiten.
+    """
+    candidatas = []
+    acompanantes = {}
+    indices = [("", DirectoryIndex.scan(mgw_path.parent), [(mgw_path.name, None)])]
+    for empresa_path in empresas:
+        try:
+            indices.append((empresa_path, DirectoryIndex.scan(empresa_path), datosRutas.tablePath))
+        except OSError:
+            # La carpeta se reporta como error al procesar la empresa
+            continue
+    for empresa_path, indice, tablas in indices:
+        for tabla_nombre, _ in tablas:
+            tabla_path = indice.resolve(tabla_nombre)
+            if tabla_path is None:
+                continue
+            if checkpoint is None or not checkpoint.is_done(empresa_path, tabla_nombre, tabla_path):
+                candidatas.append(tabla_path)
+                acompanantes[str(tabla_path)] = indice.companions(tabla_path.name)
     
-    # === PASO 1.5: ACTUALIZAR MGW00001.DBF (TABLA MAESTRA) ===
-    print("Actualizando catálogo principal de empresas (MGW00001.DBF)...")
+    salida(f"Respaldando tablas a modificar en {Path(args.backup).absolute()}...")
+    respaldo = BackupManager(args.backup, datosRutas.get_absPath(), workers=max(4, args.workers))
+    with respaldo.open(resume=args.resume), \
+            tqdm(total=len(candidatas), desc="Respaldando", unit="tabla", disable=not progreso) as pbar:
+        resultado = respaldo.backup_tables(
+            candidatas,
+            needs_backup=lambda tabla_path: DBFManager().needs_rewrite(tabla_path, datosRutas),
+            on_done=lambda tabla_path: pbar.update(1),
+            companions_of=lambda tabla_path: acompanantes.get(str(tabla_path), [])
+        )
     
-    cambios_catalogo = tablas.update_info(
-        mgw_path,
-        ["CRUTADATOS", "CRUTARES01"],
-        datosRutas
-    )
+    for tabla_path, error in resultado["errores"]:
+        salida(f"Error: No se pudo respaldar {tabla_path}: {error}")
+    salida(f"Respaldo: {resultado['respaldados']} archivo(s) ({respaldo.bytes / 1e6:.1f} MB, "
+           f"{respaldo.reflinks} reflink, {respaldo.copies} copia(s)), "
+           f"{resultado['omitidos']} tabla(s) sin cambios no respaldadas")
+    return resultado
+
+
+def procesar_raiz(args, datosRutas, limite=None, salida=print, progreso: bool = True, detener=None,
+                  perfil: Profiler = None) -> dict:
+    """
+    Ejecuta el cambio de rutas completo de una instalación: catálogo
+    MGW00001.DBF y tablas de cada empresa, sin preguntas interactivas.
+    
+    limite es un semáforo compartido para acotar las empresas en paralelo
+    entre varias instalaciones (modo flota); detener es un threading.Event
+    que interrumpe la corrida como Ctrl-C. perfil (Profiler) recibe las
+    métricas por empresa y tabla con --profile. Regresa un resumen (dict).
+    """
+    perfil = perfil or Profiler(None)
+    # Los mensajes del catálogo (truncados, errores...) llevan el prefijo de la instalación en modo flota
+    tablas = DBFManager(metrics=Metrics(enabled=perfil.enabled), output=salida)
+    resumen = {
+        "error": None,
+        "empresas": 0,
+        "procesadas": 0,
+        "errores": 0,
+        "cambios_catalogo": 0,
+        "cambios_empresas": 0,
+        "omitidas": 0,
+        "reanudadas": 0,
+        "interrumpido": False,
+        "cache": (0, 0),
+        "reglas": [],
+        "bloqueadas": [],
+        "journal": None
+    }
     
-    if cambios_catalogo:
-        print(f"Catálogo actualizado: {len(cambios_catalogo)} cambio(s)")
-        print("\nDetalle de cambios en catálogo:")
-        for cambio in cambios_catalogo[:3]:
-            print(f"\n  Registro #{cambio.get('record', '?')}:")
-            for col in cambio['before'].keys():
-                before = cambio['before'][col][:60] + "..." if len(cambio['before'][col]) > 60 else cambio['before'][col]
-                after = cambio['after'][col][:60] + "..." if len(cambio['after'][col]) > 60 else cambio['after'][col]
-                print(f"    {col}:")
-                print(f"      Antes: {before}")
-                print(f"      Ahora: {after}")
+    # === PASO 1: LEER Y ACTUALIZAR MGW00001.DBF (TABLA MAESTRA) EN UNA SOLA PASADA ===
+    mgw_path = buscar_catalogo(datosRutas, salida)
+    if mgw_path is None:
+        resumen["error"] = f"Catálogo no encontrado o sin empresas: {Path(datosRutas.get_absPath()) / 'MGW00001.DBF'}"
+        return resumen
+    
+    # Bitácora de avance para poder reanudar (--resume)
+    checkpoint = CheckpointManager(args.checkpoint).open(datosRutas, resume=args.resume)
+    escribir_catalogo = not checkpoint.is_done("", mgw_path.name, mgw_path)
+    if escribir_catalogo:
+        salida("Leyendo y actualizando catálogo de empresas (MGW00001.DBF)...")
+    else:
+        salida("Catálogo completado en la corrida anterior, solo se lee")
+    
+    # Las escrituras del catálogo esperan a que se respalden las empresas y se abra la bitácora
+    catalogo = CatalogPass(mgw_path, datosRutas, write=escribir_catalogo, defer=True, manager=tablas)
+    
+    registrado = False
+    
+    def registrar_catalogo():
+        """Avance y detalle de los cambios del catálogo, una vez aplicados."""
+        nonlocal registrado
+        if registrado:
+            return
+        registrado = True
+        cambios_catalogo = catalogo.changes
+        if escribir_catalogo:
+            perfil.add_company(str(mgw_path), tablas.metrics.tables)
+            journal.flush()
+            if catalogo.finished and catalogo.error is None:
+                checkpoint.mark_done("", mgw_path.name, fingerprint(mgw_path))
+        resumen["cambios_catalogo"] = len(cambios_catalogo)
         
-        if len(cambios_catalogo) > 3:
-            print(f"  ... y {len(cambios_catalogo) - 3} cambio(s) más")
+        if cambios_catalogo:
+            salida(f"Catálogo actualizado: {len(cambios_catalogo)} cambio(s)")
+            salida("\nDetalle de cambios en catálogo:")
+            for cambio in cambios_catalogo[:3]:
+                salida(f"\n  Registro #{cambio.get('record', '?')}:")
+                for col in cambio['before'].keys():
+                    salida(f"    {col}:")
+                    salida(f"      Antes: {recortar(cambio['before'][col], 60)}")
+                    salida(f"      Ahora: {recortar(cambio['after'][col], 60)}")
+            
+            if len(cambios_catalogo) > 3:
+                salida(f"  ... y {len(cambios_catalogo) - 3} cambio(s) más")
+        elif escribir_catalogo and catalogo.error is None:
+            salida("No se realizaron cambios en el catálogo (las rutas ya están actualizadas)")
+    
+    if args.stream:
+        # Con --stream cada empresa se procesa en cuanto la pasada del catálogo la entrega
+        empresas = leer_en_cola(iter(catalogo))
     else:
-        print("No se realizaron cambios en el catálogo (las rutas ya están actualizadas)")
+        empresas = list(catalogo)
+        if not empresas:
+            catalogo.close()
+            checkpoint.close()
+            resumen["error"] = f"Catálogo no encontrado o sin empresas: {mgw_path}"
+            salida("No se encontraron empresas registradas.")
+            return resumen
+        resumen["empresas"] = len(empresas)
+        salida(f"Se encontraron {len(empresas)} empresa(s)")
+    
+    try:
+        descubrir_columnas(args, datosRutas, [] if args.stream else empresas, salida)
+    except (OSError, ValueError) as e:
+        catalogo.close()
+        checkpoint.close()
+        resumen["error"] = f"No se pudo leer el mapa de columnas: {e}"
+        salida(f"ERROR: {resumen['error']}")
+        return resumen
+    
+    # Respaldo de las tablas que se van a modificar (--backup), antes de escribir
+    if args.backup:
+        respaldo = respaldar_tablas(args, datosRutas, mgw_path, empresas, checkpoint, salida, progreso)
+        if respaldo["errores"]:
+            catalogo.close()
+            checkpoint.close()
+            resumen["error"] = f"Falló el respaldo de {len(respaldo['errores'])} archivo(s); no se modificó ninguna tabla"
+            salida(f"ERROR: {resumen['error']}")
+            return resumen
+    
+    # Bitácora de cambios: cada cambio se escribe en cuanto se aplica
+    journal = JournalManager(args.journal, compress=args.gzip).open(append=args.resume)
+    resumen["journal"] = journal
+    
+    if not args.stream:
+        catalogo.commit(on_apply=partial(registrar_en_bitacora, journal, "", datosRutas.get_absPath(), mgw_path.parent))
+        registrar_catalogo()
     
     # === PASO 2: PROCESAR CADA EMPRESA ===
-    print("Actualizando rutas en tablas de empresas...\n")
+    salida("Actualizando rutas en tablas de empresas...\n")
     
-    total_cambios = 0
-    empresas_procesadas = 0
-    empresas_con_errores = 0
+    resumen["omitidas"] = tablas.skipped_tables
     
-    # Log detallado de cada empresa
-    cambios_por_empresa = []
+    # Memo de rutas: con workers en procesos cada uno tiene su propia copia
+    cache_procesos = {"hits": 0, "misses": 0}
+    reglas_procesos = [0] * len(datosRutas.rule_hits)
     
-    with tqdm(empresas, desc="Procesando", unit="empresa", disable=False) as pbar:
-        for i, empresa_path in enumerate(pbar, start=1):
-            # Extraer nombre de empresa
-            nombre_empresa = empresa_path[datosRutas.indexCompanyName():]
-            pbar.set_description(f"[{i}/{len(empresas)}] {nombre_empresa}")
-            
-            empresa_ok = True
-            cambios_empresa = []
+    if args.workers > 1:
+        salida(f"Modo paralelo: {args.workers} worker(s) ({args.executor})\n")
+    
+    # Tablas en uso por otro programa: se reintentan con espera exponencial
+    cola = RetryQueue()
+    diferidas = {}
+    
+    def contar(resultado, reintento=None):
+        """Cuenta la empresa como procesada o con error cuando ya no tiene tablas en uso pendientes."""
+        estado = diferidas.get(resultado["path"])
+        if estado is None and not resultado["bloqueadas"]:
+            resumen["procesadas" if resultado["ok"] else "errores"] += 1
+            return
+        if estado is None:
+            estado = diferidas[resultado["path"]] = {"ok": True, "tablas": set()}
+        estado["ok"] = estado["ok"] and resultado["ok"]
+        estado["tablas"].discard(reintento)
+        for tabla_nombre, error in resultado["bloqueadas"]:
+            estado["tablas"].add(tabla_nombre)
+            cola.defer((resultado["path"], tabla_nombre), (resultado["path"], tabla_nombre), error)
+        if not estado["tablas"]:
+            del diferidas[resultado["path"]]
+            resumen["procesadas" if estado["ok"] else "errores"] += 1
+    
+    def catalogo_en_uso(error):
+        cola.defer(("", mgw_path.name), ("", mgw_path.name), error)
+        salida(f"Advertencia: {mgw_path.name} en uso, se reintentará")
+    
+    if not args.stream and escribir_catalogo and is_lock_error(catalogo.error):
+        catalogo_en_uso(catalogo.error)
+    
+    programa = None if args.stream else medir_trabajo(args, datosRutas, empresas, salida, checkpoint)
+    
+    with barra_trabajo(programa, "Procesando", progreso) as pbar:
+        def mostrar(mensaje):
+            if progreso:
+                pbar.write(mensaje)
+            else:
+                salida(mensaje)
+        
+        def avanzar(resultado):
+            avanzar_trabajo(pbar, programa, resultado)
+            # En cuanto termina cada empresa: primero sus cambios a la bitácora,
+            # después sus tablas al avance (nunca una tabla marcada sin sus cambios)
+            journal.merge(resultado["bitacora"])
+            for tabla_nombre, huella in resultado["completadas"]:
+                checkpoint.mark_done(resultado["path"], tabla_nombre, huella)
+        
+        def reintentar(empresa_path, tabla_nombre):
+            if empresa_path == "":
+                tablas.update_info(mgw_path, ["CRUTADATOS", "CRUTARES01"], datosRutas,
+                                   on_apply=partial(registrar_en_bitacora, journal, "", datosRutas.get_absPath(), mgw_path.parent))
+                resumen["cambios_catalogo"] += tablas.changed
+                if tablas.last_error is None:
+                    checkpoint.mark_done("", mgw_path.name, fingerprint(mgw_path))
+                    mostrar(f"Reintento: {mgw_path.name} actualizado, {tablas.changed} cambio(s)")
+                elif is_lock_error(tablas.last_error):
+                    catalogo_en_uso(tablas.last_error)
+                return
             
-            for tabla_nombre, columnas in datosRutas.tablePath:
-                tabla_path = Path(empresa_path) / tabla_nombre
+            argumentos = (empresa_path, datosRutas, False, None, perfil.enabled, [tabla_nombre])
+            bitacora = str(journal.part_path(empresa_path))
+            if limite:
+                resultado = procesar_empresa_limitado(limite, *argumentos, bitacora=bitacora)
+            else:
+                resultado = procesar_empresa(*argumentos, bitacora=bitacora)
+            journal.merge(resultado["bitacora"])
+            for tabla, huella in resultado["completadas"]:
+                checkpoint.mark_done(resultado["path"], tabla, huella)
+                mostrar(f"Reintento: {resultado['empresa']}/{tabla} actualizada")
+            for mensaje in resultado["mensajes"]:
+                mostrar(mensaje)
+            resumen["cambios_empresas"] += resultado["cambios"]
+            perfil.add_company(resultado["path"], resultado["metricas"], resultado["segundos"])
+            contar(resultado, reintento=tabla_nombre)
+        
+        def atender_diferidas():
+            for empresa_path, tabla_nombre in cola.due():
+                reintentar(empresa_path, tabla_nombre)
+            journal.flush()
+        
+        try:
+            for i, resultado in iterar_empresas(
+                empresas, datosRutas,
+                workers=args.workers,
+                executor=args.executor,
+                al_terminar=avanzar,
+                checkpoint=checkpoint,
+                limite=limite,
+                medir=perfil.enabled,
+                orden=programa.order(empresas) if programa is not None else None,
+                journal=journal
+            ):
+                if args.stream:
+                    resumen["empresas"] += 1
+                for mensaje in resultado["mensajes"]:
+                    mostrar(mensaje)
                 
-                if not tabla_path.exists():
-                    print(f"{nombre_empresa}: {tabla_nombre} no encontrado")
-                    empresa_ok = False
-                    continue
+                resumen["cambios_empresas"] += resultado["cambios"]
+                cache_procesos["hits"] += resultado["cache"]["hits"]
+                cache_procesos["misses"] += resultado["cache"]["misses"]
+                for regla, aciertos in enumerate(resultado["reglas"]):
+                    reglas_procesos[regla] += aciertos
+                resumen["omitidas"] += resultado["omitidas"]
+                resumen["reanudadas"] += resultado["reanudadas"]
+                perfil.add_company(resultado["path"], resultado["metricas"], resultado["segundos"])
+                contar(resultado)
                 
-                try:
-                    # Procesar tabla
-                    cambios = tablas.update_info(tabla_path, columnas, datosRutas)
-                    
-                    if cambios:
-                        cambios_empresa.extend(cambios)
-                        total_cambios += len(cambios)
-                        
-                        # Mostrar resumen de cambios en esta tabla
-                        print(f"{nombre_empresa}/{tabla_nombre}: {len(cambios)} cambio(s)")
-                    
-                except Exception as e:
-                    print(f"Error en {nombre_empresa}/{tabla_nombre}: {e}")
-                    empresa_ok = False
+                # Las tablas en uso se reintentan mientras avanzan las demás empresas
+                atender_diferidas()
+                
+                if detener is not None and detener.is_set():
+                    raise KeyboardInterrupt
             
-            if empresa_ok:
-                empresas_procesadas += 1
-                if cambios_empresa:
-                    cambios_por_empresa.append({
-                        "empresa": nombre_empresa,
-                        "path": empresa_path,
-                        "cambios": cambios_empresa
-                    })
-            else:
-                empresas_con_errores += 1
+            if args.stream:
+                # La pasada del catálogo terminó junto con la última empresa
+                catalogo.commit(on_apply=partial(registrar_en_bitacora, journal, "", datosRutas.get_absPath(), mgw_path.parent))
+                registrar_catalogo()
+                if escribir_catalogo and is_lock_error(catalogo.error):
+                    catalogo_en_uso(catalogo.error)
+            
+            # Al final se espera a las tablas que siguen en uso, hasta --lock-wait segundos
+            limite_espera = time.monotonic() + args.lock_wait
+            while len(cola):
+                espera = cola.wait_time()
+                if time.monotonic() + espera > limite_espera:
+                    break
+                if espera > 0:
+                    if espera >= 1:
+                        mostrar(f"Esperando {espera:.0f} s para reintentar {len(cola)} tabla(s) en uso...")
+                    if detener is not None:
+                        if detener.wait(espera):
+                            raise KeyboardInterrupt
+                    else:
+                        time.sleep(espera)
+                atender_diferidas()
+        except KeyboardInterrupt:
+            resumen["interrumpido"] = True
+        finally:
+            if args.stream:
+                # El hilo lector debe terminar antes de cerrar el catálogo que recorre
+                empresas.close()
+            # Con --stream interrumpido, las escrituras del catálogo se descartan (queda pendiente para --resume)
+            catalogo.close()
+            registrar_catalogo()
+            journal.close()
+            checkpoint.close()
+    
+    # Lo que sigue en uso queda pendiente para una corrida con --resume
+    resumen["bloqueadas"] = [
+        {"empresa": empresa_path, "tabla": tabla_nombre, "intentos": intentos, "error": error}
+        for (empresa_path, tabla_nombre), intentos, error in cola.pending()
+    ]
+    resumen["errores"] += len(diferidas)
     
+    cache = datosRutas.cache_info()
+    cache_hits, cache_misses = cache["hits"], cache["misses"]
+    reglas = datosRutas.rule_info()
+    if args.executor == "process" and args.workers > 1 and limite is None:
+        cache_hits += cache_procesos["hits"]
+        cache_misses += cache_procesos["misses"]
+        for regla, aciertos in zip(reglas, reglas_procesos):
+            regla["aciertos"] += aciertos
+    resumen["cache"] = (cache_hits, cache_misses)
+    resumen["reglas"] = reglas
+    
+    return resumen
+
+
+def imprimir_resumen(args, resumen: dict):
     # === RESUMEN FINAL ===
     print("\n" + "=" * 70)
     print("RESUMEN DE PROCESAMIENTO")
     print("=" * 70)
-    print(f"Cambios en catálogo (MGW00001):   {len(cambios_catalogo)}")
-    print(f"Empresas procesadas correctamente: {empresas_procesadas}")
-    print(f"Empresas con errores:             {empresas_con_errores}")
-    print(f"Total de cambios en empresas:      {total_cambios}")
-    print(f"TOTAL GENERAL DE CAMBIOS:          {len(cambios_catalogo) + total_cambios}")
+    print(f"Cambios en catálogo (MGW00001):   {resumen['cambios_catalogo']}")
+    print(f"Empresas procesadas correctamente: {resumen['procesadas']}")
+    print(f"Empresas con errores:             {resumen['errores']}")
+    print(f"Total de cambios en empresas:      {resumen['cambios_empresas']}")
+    print(f"TOTAL GENERAL DE CAMBIOS:          {resumen['cambios_catalogo'] + resumen['cambios_empresas']}")
+    print(f"Tablas omitidas (sin rutas a cambiar): {resumen['omitidas']}")
+    if args.resume:
+        print(f"Tablas ya completadas (reanudación):   {resumen['reanudadas']}")
+    print(f"Memo de rutas (aciertos/fallos):   {resumen['cache'][0]}/{resumen['cache'][1]}")
+    if resumen["reglas"]:
+        print("Rutas reescritas por regla:")
+        for regla in resumen["reglas"]:
+            print(f"   {regla['aciertos']:>8}  {regla['origen']} -> {regla['destino']}")
+    print(f"Bitácora de cambios:               {resumen['journal'].journal_path.absolute()}")
+    if resumen["bloqueadas"]:
+        print(f"Tablas que siguen en uso por otro programa: {len(resumen['bloqueadas'])}")
+        for bloqueada in resumen["bloqueadas"]:
+            print(f"   {bloqueada['empresa'] or '(catálogo)'}\\{bloqueada['tabla']}  "
+                  f"({bloqueada['intentos']} intento(s)): {bloqueada['error']}")
+        print(f"   Cuando se liberen: python main.py --resume --checkpoint {args.checkpoint}")
+    print("=" * 70)
+
+
+def vigilar_catalogo(args, datosRutas, detener=None):
+    """
+    Modo vigilancia (--watch): revisa MGW00001.DBF cada args.interval
+    segundos y, cuando aparecen registros nuevos o modificados (empresas
+    creadas o restauradas después de la migración), actualiza solo esos
+    registros del catálogo y las tablas de sus empresas.
+    
+    Mientras el catálogo no cambia cada revisión cuesta un stat. Los
+    registros procesados se guardan en el archivo de estado de --watch; sin
+    estado previo, la primera revisión procesa todas las empresas. Se
+    detiene con Ctrl-C o con el threading.Event detener.
+    """
+    detener = detener or threading.Event()
+    mgw_path, empresas = leer_empresas(datosRutas)
+    if not mgw_path.exists():
+        return
+    
+    try:
+        descubrir_columnas(args, datosRutas, empresas or [])
+    except (OSError, ValueError) as e:
+        print(f"ERROR: No se pudo leer el mapa de columnas: {e}")
+        return
+    
+    vigia = CatalogWatcher(mgw_path, args.watch).load()
+    if vigia.signatures:
+        print(f"Estado de vigilancia: {len(vigia.signatures)} registro(s) ya procesado(s) ({args.watch})")
+    else:
+        print("Sin estado de vigilancia previo: la primera revisión procesa todas las empresas")
+    
+    tablas = DBFManager()
+    lotes = 0
+    journal = JournalManager(args.journal, compress=args.gzip).open(append=True)
+    print(f"Vigilando {mgw_path} cada {args.interval:g} s (Ctrl-C para terminar)")
+    try:
+        while not detener.is_set():
+            try:
+                registros = vigia.poll()
+            except (OSError, DBFFormatError) as e:
+                print(f"Advertencia: No se pudo leer el catálogo: {e}")
+                registros = []
+            if registros:
+                procesados = procesar_registros(args, datosRutas, tablas, mgw_path, registros, journal,
+                                                respaldo_previo=lotes > 0)
+                vigia.mark(procesados)
+                lotes += 1
+            detener.wait(args.interval)
+    except KeyboardInterrupt:
+        print("\nVigilancia detenida")
+    finally:
+        journal.close()
+    print(f"Revisiones: {vigia.polls}, lecturas del catálogo: {vigia.reads}, lotes procesados: {lotes}")
+    print(f"Bitácora de cambios: {journal.journal_path.absolute()}")
+
+
+def procesar_registros(args, datosRutas, tablas: DBFManager, mgw_path: Path, registros: list, journal,
+                       respaldo_previo: bool = False) -> list:
+    """
+    Procesa un lote del modo vigilancia: los registros indicados del
+    catálogo y las tablas de sus empresas. Regresa los números de registro
+    que quedaron completos (los de empresas con error se reintentan).
+    """
+    print(f"\n[{time.strftime('%H:%M:%S')}] {len(registros)} registro(s) nuevo(s) o modificado(s) en el catálogo")
+    # Una sola pasada del catálogo: empresas de esos registros y sus rutas nuevas
+    catalogo = CatalogPass(mgw_path, datosRutas, defer=True, records=registros, manager=tablas).run()
+    empresas = catalogo.company_records
+    
+    if args.backup:
+        # Después del primer lote el manifiesto se conserva y se agrega
+        args_respaldo = argparse.Namespace(**{**vars(args), "resume": args.resume or respaldo_previo})
+        respaldo = respaldar_tablas(args_respaldo, datosRutas, mgw_path, list(empresas), None, progreso=False)
+        if respaldo["errores"]:
+            catalogo.close()
+            print("ERROR: Falló el respaldo; el lote se reintentará en la siguiente revisión")
+            return []
+    
+    cambios = catalogo.commit(on_apply=partial(registrar_en_bitacora, journal, "", datosRutas.get_absPath(), mgw_path.parent))
+    if catalogo.error is not None:
+        journal.flush()
+        return []
+    if cambios:
+        print(f"Catálogo: {len(cambios)} cambio(s)")
+    
+    procesados = set(registros)
+    integrar = lambda resultado: journal.merge(resultado["bitacora"])
+    for _, resultado in iterar_empresas(list(empresas), datosRutas, workers=args.workers, executor=args.executor,
+                                        al_terminar=integrar, journal=journal):
+        for mensaje in resultado["mensajes"]:
+            print(mensaje)
+        completa = resultado["ok"] and not resultado["bloqueadas"]
+        estado = "OK" if completa else "pendiente, se reintentará"
+        print(f"   {resultado['empresa']}: {resultado['cambios']} cambio(s), {estado}")
+        if not completa:
+            procesados -= set(empresas[resultado["path"]])
+    journal.flush()
+    return sorted(procesados)
+
+
+def ejecutar_flota(args, perfil: Profiler = None):
+    """
+    Modo flota: procesa sin preguntas todas las instalaciones del archivo de
+    configuración, en paralelo, con un límite de empresas por instalación y
+    uno global, y muestra un resumen consolidado.
+    """
+    flota = FleetManager(args.fleet, args.rules)
+    try:
+        raices = flota.load()
+    except (OSError, ValueError, configparser.Error) as e:
+        print(f"ERROR: No se pudo leer la configuración de flota: {e}")
+        return
+    
+    print("=" * 70)
+    print(f"Modo flota: {len(raices)} instalación(es), hasta {flota.max_workers} empresa(s) en paralelo")
+    print("=" * 70)
+    for raiz in raices:
+        pm = raiz["path_manager"]
+        print(f"[{raiz['nombre']}] {pm.get_absPath()} → {pm.newBase} (workers: {raiz['workers']})")
+    print()
+    
+    limite = threading.BoundedSemaphore(flota.max_workers)
+    detener = threading.Event()
+    candado_salida = threading.Lock()
+    
+    def ejecutar_raiz(raiz):
+        def salida(mensaje=""):
+            with candado_salida:
+                for linea in str(mensaje).strip("\n").splitlines() or [""]:
+                    print(f"[{raiz['nombre']}] {linea}")
+        
+        args_raiz = argparse.Namespace(**vars(args))
+        args_raiz.workers = raiz["workers"]
+        args_raiz.executor = "thread"
+        args_raiz.checkpoint = raiz["checkpoint"]
+        args_raiz.journal = raiz["journal"]
+        if args.backup:
+            args_raiz.backup = str(Path(args.backup) / raiz["nombre"])
+        if args.discover:
+            args_raiz.discover = f"{raiz['nombre']}.columnas.json"
+        return procesar_raiz(args_raiz, raiz["path_manager"], limite=limite, salida=salida,
+                             progreso=False, detener=detener, perfil=perfil)
+    
+    resumenes = {}
+    with ThreadPoolExecutor(max_workers=len(raices)) as pool:
+        futuros = {pool.submit(ejecutar_raiz, raiz): raiz["nombre"] for raiz in raices}
+        try:
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                try:
+                    resumenes[nombre] = futuro.result()
+                except Exception as e:
+                    resumenes[nombre] = {"error": str(e)}
+                with candado_salida:
+                    print(f"[{nombre}] Terminado")
+        except KeyboardInterrupt:
+            detener.set()
+            print("\nDeteniendo la flota después de las empresas en curso...")
+            for futuro, nombre in futuros.items():
+                try:
+                    resumenes[nombre] = futuro.result()
+                except Exception as e:
+                    resumenes[nombre] = {"error": str(e)}
+    
+    # === RESUMEN CONSOLIDADO (en el orden del archivo de configuración) ===
+    print("\n" + "=" * 100)
+    print("RESUMEN CONSOLIDADO DE LA FLOTA")
+    print("=" * 100)
+    print(f"{'Instalación':<20} {'Empresas':>8} {'OK':>6} {'Errores':>8} {'Catálogo':>9} {'Cambios':>9} {'Omitidas':>9}  Estado")
+    print("-" * 100)
+    totales = {"empresas": 0, "procesadas": 0, "errores": 0, "cambios_catalogo": 0, "cambios_empresas": 0, "omitidas": 0}
+    for raiz in raices:
+        r = resumenes.get(raiz["nombre"], {"error": "sin resultado"})
+        if r.get("error"):
+            estado = f"ERROR: {r['error']}"
+        elif r.get("interrumpido"):
+            estado = "Interrumpido (use --resume)"
+        elif r.get("bloqueadas"):
+            estado = f"{len(r['bloqueadas'])} tabla(s) en uso (use --resume)"
+        elif r.get("errores"):
+            estado = "Con errores"
+        else:
+            estado = "OK"
+        for clave in totales:
+            totales[clave] += r.get(clave, 0)
+        print(f"{raiz['nombre']:<20} {r.get('empresas', 0):>8} {r.get('procesadas', 0):>6} {r.get('errores', 0):>8} "
+              f"{r.get('cambios_catalogo', 0):>9} {r.get('cambios_empresas', 0):>9} {r.get('omitidas', 0):>9}  {estado}")
+    print("-" * 100)
+    print(f"{'TOTAL':<20} {totales['empresas']:>8} {totales['procesadas']:>6} {totales['errores']:>8} "
+          f"{totales['cambios_catalogo']:>9} {totales['cambios_empresas']:>9} {totales['omitidas']:>9}")
+    print("=" * 100)
+
+
+def guardar_perfil(perfil: Profiler):
+    """Escribe el perfil de --profile e informa dónde quedó."""
+    archivos = perfil.dump()
+    if archivos is None:
+        return
+    print(f"Perfil cProfile:  {archivos[0].absolute()}")
+    print(f"Métricas:         {archivos[1].absolute()}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    perfil = Profiler(args.profile)
+    
+    if args.apply:
+        aplicar_plan(args)
+        input("\nPresione ENTER para salir...")
+        return
+    
+    if args.rollback:
+        revertir_cambios(args)
+        input("\nPresione ENTER para salir...")
+        return
+    
+    if args.verify:
+        verificar_rutas(args)
+        input("\nPresione ENTER para salir...")
+        return
+    
+    if args.fleet:
+        with perfil:
+            ejecutar_flota(args, perfil)
+        guardar_perfil(perfil)
+        return
+    
+    datosRutas = configurar_interactivo()
+    
+    if args.rules:
+        try:
+            datosRutas.set_rules(RuleSet.load(args.rules))
+        except (OSError, ValueError) as e:
+            print(f"ERROR: No se pudieron leer las reglas: {e}")
+            input("\nPresione ENTER para salir...")
+            return
+        print(f"Reglas adicionales: {len(datosRutas.rules)} (de {args.rules})")
+    
+    print("\n" + "=" * 70)
+    print("Iniciando procesamiento...")
     print("=" * 70)
     
-    if len(cambios_catalogo) + total_cambios == 0:
+    if args.watch:
+        vigilar_catalogo(args, datosRutas)
+        return
+    
+    if args.relocate is not None:
+        reubicar_empresas(args, datosRutas)
+        input("\nPresione ENTER para salir...")
+        return
+    
+    if args.audit:
+        auditar_rutas(args, datosRutas)
+        input("\nPresione ENTER para salir...")
+        return
+    
+    if args.plan:
+        mgw_path, empresas = leer_empresas(datosRutas)
+        if empresas is not None:
+            try:
+                descubrir_columnas(args, datosRutas, empresas)
+            except (OSError, ValueError) as e:
+                print(f"ERROR: No se pudo leer el mapa de columnas: {e}")
+                empresas = None
+        if empresas is not None:
+            with perfil:
+                generar_plan(args, datosRutas, mgw_path, empresas, perfil)
+            guardar_perfil(perfil)
+        input("\nPresione ENTER para salir...")
+        return
+    
+    with perfil:
+        resumen = procesar_raiz(args, datosRutas, perfil=perfil)
+    
+    if resumen["error"]:
+        input("\nPresione ENTER para salir...")
+        return
+    
+    if resumen["interrumpido"]:
+        print("\nProceso interrumpido. Para continuar donde se quedó:")
+        print(f"   python main.py --resume --checkpoint {args.checkpoint}")
+    
+    imprimir_resumen(args, resumen)
+    guardar_perfil(perfil)
+    journal = resumen["journal"]
+    
+    if resumen["cambios_catalogo"] + resumen["cambios_empresas"] == 0:
         print("ADVERTENCIA: No se aplicaron cambios.")
         print("   Posibles causas:")
         print("   - Las rutas ya están configuradas correctamente")
@@ -236,56 +1916,8 @@ def main():
         print("   - Los archivos están vacíos o sin rutas configuradas")
         print("Sugerencia: Use el script de debug para inspeccionar los DBF")
     else:
-        # Mostrar resumen por empresa
-        print("\n" + "=" * 70)
-        print("DETALLE DE CAMBIOS")
-        print("=" * 70)
-        
-        # Mostrar cambios en catálogo primero
-        if cambios_catalogo:
-            print("CATÁLOGO PRINCIPAL (MGW00001.DBF)")
-            print("=" * 70)
-            for i, cambio in enumerate(cambios_catalogo, 1):
-                print(f"\n[Empresa #{i}] Registro: {cambio.get('record', '?')}")
-                for col in cambio['before'].keys():
-                    before = cambio['before'][col]
-                    after = cambio['after'][col]
-                    
-                    before_short = before[:50] + "..." if len(before) > 50 else before
-                    after_short = after[:50] + "..." if len(after) > 50 else after
-                    
-                    print(f"{col}:")
-                    print(f"Antes: {before_short}")
-                    print(f"Ahora: {after_short}")
-        
-        # Mostrar cambios por empresa
-        if cambios_por_empresa:
-            print("\n" + "=" * 70)
-            print("TABLAS DE CADA EMPRESA (mgw10006.dbf, mgw10000.dbf)")
-            print("=" * 70)
-            
-            for emp_info in cambios_por_empresa:
-                print(f"{emp_info['empresa']}")
-                print(f"Ruta: {emp_info['path']}")
-                print(f"Cambios: {len(emp_info['cambios'])}")
-            
-            # Mostrar primeros cambios como ejemplo
-            for i, cambio in enumerate(emp_info['cambios'][:2], 1):
-                print(f"\n   Cambio #{i} en {cambio['table']}:")
-                for col in cambio['before'].keys():
-                    before = cambio['before'][col]
-                    after = cambio['after'][col]
-                    
-                    # Truncar si es muy largo
-                    before_short = before[:50] + "..." if len(before) > 50 else before
-                    after_short = after[:50] + "..." if len(after) > 50 else after
-                    
-                    print(f"{col}:")
-                    print(f"Antes: {before_short}")
-                    print(f"Ahora: {after_short}")
-            
-            if len(emp_info['cambios']) > 2:
-                print(f"   ... y {len(emp_info['cambios']) - 2} cambio(s) más")
+        # Mostrar resumen por empresa (leído de la bitácora de cambios)
+        imprimir_detalle(journal)
         
         # Opción de guardar log completo
         print("\n" + "=" * 70)
@@ -294,49 +1926,10 @@ def main():
         
         if guardar in ['s', 'si', 'sí', 'yes', 'y']:
             log_file = Path("cambios_rutas.log")
-            
-            with open(log_file, 'w', encoding='utf-8') as f:
-                f.write("="*80 + "\n")
-                f.write("LOG DE CAMBIOS - CONTPAQi Facturación Electrónica\n")
-                f.write("="*80 + "\n\n")
-                
-                # Catálogo principal
-                if cambios_catalogo:
-                    f.write("="*80 + "\n")
-                    f.write("CATÁLOGO PRINCIPAL DE EMPRESAS (MGW00001.DBF)\n")
-                    f.write("="*80 + "\n\n")
-                    
-                    for i, cambio in enumerate(cambios_catalogo, 1):
-                        f.write(f"[Empresa #{i}] Registro: {cambio.get('record', '?')}\n")
-                        f.write("-" * 80 + "\n")
-                        
-                        for col in cambio['before'].keys():
-                            f.write(f"  Campo: {col}\n")
-                            f.write(f"    ANTES: {cambio['before'][col]}\n")
-                            f.write(f"    AHORA: {cambio['after'][col]}\n")
-                        f.write("\n")
-                
-                # Tablas de empresas
-                for emp_info in cambios_por_empresa:
-                    f.write(f"\n{'='*80}\n")
-                    f.write(f"EMPRESA: {emp_info['empresa']}\n")
-                    f.write(f"RUTA: {emp_info['path']}\n")
-                    f.write(f"{'='*80}\n\n")
-                    
-                    for i, cambio in enumerate(emp_info['cambios'], 1):
-                        f.write(f"[Cambio #{i}] Archivo: {cambio['table']}\n")
-                        f.write(f"  Registro: {cambio.get('record', '?')}\n")
-                        f.write("-" * 80 + "\n")
-                        
-                        for col in cambio['before'].keys():
-                            f.write(f"  Campo: {col}\n")
-                            f.write(f"    ANTES: {cambio['before'][col]}\n")
-                            f.write(f"    AHORA: {cambio['after'][col]}\n")
-                        f.write("\n")
-            
+            escribir_log(journal, log_file)
             print(f"Log guardado en: {log_file.absolute()}")
     
     input("\nPresione ENTER para salir...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,93 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.synthetic import write_table
+from clases.catalog import CatalogPass
+from clases.dbf import DBFManager
+from clases.path import PathManager
+from clases.reader import DBFReader
+
+CAMPOS = [("CIDEMPRESA", "N", 6, 0), ("CRUTADATOS", "C", 60, 0), ("CRUTARES01", "C", 60, 0)]
+LOCAL = "C:\\Compacw\\Empresas"
+NUEVA = "\\\\NUEVO\\Compacw\\Empresas"
+
+
+class CatalogPassTest(unittest.TestCase):
+    """CatalogPass con defer=True: nada se escribe antes de commit()."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.catalogo = self.tmp / "MGW00001.DBF"
+        write_table(self.catalogo, CAMPOS, [
+            (1, f"{LOCAL}\\Emp1", f"{LOCAL}\\Emp1\\Respaldos"),
+            (2, f"{NUEVA}\\Emp2", ""),
+            (3, f"{LOCAL}\\Emp3", "")
+        ])
+        self.original = self.catalogo.read_bytes()
+        self.rutas = PathManager()
+        self.rutas.set_target(hostname="NUEVO")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def pasada(self, **kwargs) -> CatalogPass:
+        return CatalogPass(self.catalogo, self.rutas, defer=True,
+                           manager=DBFManager(output=lambda _: None), **kwargs).run()
+
+    def valores(self) -> dict:
+        with DBFReader(self.catalogo) as reader:
+            return {recno: v["CRUTADATOS"] for recno, v in reader.iter_values(["CRUTADATOS"])}
+
+    def test_sin_escrituras_antes_de_commit(self):
+        catalogo = self.pasada()
+        self.assertEqual(catalogo.companies, [f"{LOCAL}\\Emp1", f"{LOCAL}\\Emp2", f"{LOCAL}\\Emp3"])
+        self.assertEqual(catalogo.company_records[f"{LOCAL}\\Emp3"], [3])
+        self.assertTrue(catalogo.finished)
+        self.assertEqual(self.catalogo.read_bytes(), self.original)
+
+        cambios = catalogo.commit()
+        self.assertEqual([c["record"] for c in cambios], [1, 3])
+        self.assertEqual(self.valores(), {1: f"{NUEVA}\\Emp1", 2: f"{NUEVA}\\Emp2", 3: f"{NUEVA}\\Emp3"})
+
+    def test_close_descarta_lo_pendiente(self):
+        catalogo = self.pasada()
+        catalogo.close()
+        self.assertEqual(len(catalogo.commit()), 0)
+        self.assertEqual(self.catalogo.read_bytes(), self.original)
+
+    def test_on_apply_antes_de_escribir(self):
+        vistos = []
+
+        def on_apply(cambios):
+            # El catálogo todavía no se ha modificado
+            vistos.append((self.catalogo.read_bytes() == self.original, list(cambios)))
+
+        self.pasada().commit(on_apply=on_apply)
+        self.assertEqual(len(vistos), 1)
+        intacto, cambios = vistos[0]
+        self.assertTrue(intacto)
+        self.assertEqual([c["record"] for c in cambios], [1, 3])
+        self.assertEqual(cambios[0]["after"], {"CRUTADATOS": f"{NUEVA}\\Emp1", "CRUTARES01": f"{NUEVA}\\Emp1\\Respaldos"})
+
+    def test_solo_registros_indicados(self):
+        catalogo = self.pasada(records=[3])
+        self.assertEqual(catalogo.companies, [f"{LOCAL}\\Emp3"])
+        catalogo.commit()
+        self.assertEqual(self.valores(), {1: f"{LOCAL}\\Emp1", 2: f"{NUEVA}\\Emp2", 3: f"{NUEVA}\\Emp3"})
+
+    def test_solo_lectura(self):
+        catalogo = self.pasada(write=False)
+        self.assertEqual(len(catalogo.companies), 3)
+        vistos = []
+        self.assertEqual(len(catalogo.commit(on_apply=vistos.append)), 0)
+        self.assertEqual(vistos, [])
+        self.assertEqual(self.catalogo.read_bytes(), self.original)
+
+
+if __name__ == "__main__":
+    unittest.main()
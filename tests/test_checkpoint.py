@@ -0,0 +1,108 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.synthetic import write_table
+from clases.checkpoint import CheckpointManager, fingerprint
+from clases.path import PathManager
+from clases.rules import RuleSet
+
+CAMPOS = [("CIDEMPRESA", "N", 6, 0), ("CRUTAENT01", "C", 40, 0)]
+
+
+def rutas(hostname: str = "NUEVO") -> PathManager:
+    path_manager = PathManager()
+    path_manager.set_target(hostname=hostname)
+    return path_manager
+
+
+class CheckpointTest(unittest.TestCase):
+    """Huella de tablas y reanudación con --resume."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.tabla = self.tmp / "mgw10000.dbf"
+        write_table(self.tabla, CAMPOS, [(1, "C:\\uno"), (2, "C:\\dos")])
+        self.avance = self.tmp / "avance.jsonl"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def abrir(self, path_manager=None, resume=True) -> CheckpointManager:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return CheckpointManager(self.avance).open(path_manager or rutas(), resume=resume)
+
+    def completar(self):
+        checkpoint = self.abrir(resume=False)
+        checkpoint.mark_done("Emp1", "mgw10000.dbf", fingerprint(self.tabla))
+        checkpoint.close()
+
+    def test_huella(self):
+        huella = fingerprint(self.tabla)
+        self.assertEqual(huella["registros"], 2)
+        self.assertEqual(huella["size"], self.tabla.stat().st_size)
+        self.assertEqual(fingerprint(self.tabla), huella)
+
+        write_table(self.tabla, CAMPOS, [(1, "C:\\uno"), (2, "C:\\dos"), (3, "C:\\tres")])
+        self.assertNotEqual(fingerprint(self.tabla), huella)
+
+    def test_huella_cambia_con_la_fecha(self):
+        huella = fingerprint(self.tabla)
+        stat = self.tabla.stat()
+        os.utime(self.tabla, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertNotEqual(fingerprint(self.tabla), huella)
+
+    def test_reanudar_omite_completadas(self):
+        self.completar()
+        checkpoint = self.abrir()
+        self.assertTrue(checkpoint.is_done("Emp1", "mgw10000.dbf", self.tabla))
+        self.assertFalse(checkpoint.is_done("Emp2", "mgw10000.dbf", self.tabla))
+        checkpoint.close()
+
+    def test_tabla_modificada_se_vuelve_a_procesar(self):
+        self.completar()
+        with open(self.tabla, "r+b") as f:
+            f.seek(0, 2)
+            f.write(b" ")
+        checkpoint = self.abrir()
+        self.assertFalse(checkpoint.is_done("Emp1", "mgw10000.dbf", self.tabla))
+        checkpoint.close()
+
+    def test_otra_configuracion_inicia_desde_cero(self):
+        self.completar()
+        self.assertEqual(self.abrir(rutas("OTRO")).completed, {})
+
+        self.completar()
+        path_manager = rutas()
+        path_manager.set_rules(RuleSet([("D:\\Datos", "\\\\ARCHIVO\\Datos")]))
+        self.assertEqual(self.abrir(path_manager).completed, {})
+
+    def test_sin_resume_inicia_desde_cero(self):
+        self.completar()
+        self.assertEqual(self.abrir(resume=False).completed, {})
+
+    def test_ultima_linea_incompleta(self):
+        self.completar()
+        with open(self.avance, "a", encoding="utf-8") as f:
+            f.write('{"empresa": "Emp2", "tabla": "mgw1')
+
+        checkpoint = self.abrir()
+        self.assertEqual(list(checkpoint.completed), [("Emp1", "mgw10000.dbf")])
+        # La siguiente tabla no se pega a la línea cortada
+        checkpoint.mark_done("Emp3", "mgw10000.dbf", fingerprint(self.tabla))
+        checkpoint.close()
+
+        checkpoint = self.abrir()
+        self.assertEqual(set(checkpoint.completed), {("Emp1", "mgw10000.dbf"), ("Emp3", "mgw10000.dbf")})
+        checkpoint.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
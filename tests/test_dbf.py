@@ -0,0 +1,114 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.synthetic import write_table
+from clases.dbf import DBFManager
+from clases.path import PathManager
+from clases.reader import DBFReader
+from clases.rules import RuleSet
+
+CAMPOS = [("CIDEMPRESA", "N", 6, 0), ("CRUTAENT01", "C", 60, 0)]
+MIGRADA = "\\\\NUEVO\\Compacw\\Empresas\\Emp1\\XML"
+
+
+class NeedsRewriteTest(unittest.TestCase):
+    """El prefiltro de bytes nunca descarta una tabla que change_path modificaría."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.tabla = self.tmp / "mgw10000.dbf"
+        self.rutas = PathManager()
+        self.rutas.set_target(hostname="NUEVO")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def prefiltro(self, *valores) -> bool:
+        write_table(self.tabla, CAMPOS, [(i + 1, valor) for i, valor in enumerate(valores)])
+        resultado = DBFManager().needs_rewrite(self.tabla, self.rutas)
+        # Debe coincidir con lo que realmente cambiaría change_path
+        cambia = any(self.rutas.change_path(valor) != valor for valor in valores if valor)
+        if cambia:
+            self.assertTrue(resultado)
+        return resultado
+
+    def test_sin_rutas(self):
+        self.assertFalse(self.prefiltro("", "D:\\Otra\\Carpeta"))
+
+    def test_ya_migradas(self):
+        self.assertFalse(self.prefiltro(MIGRADA, ""))
+
+    def test_ruta_anterior(self):
+        self.assertTrue(self.prefiltro(MIGRADA, "C:\\COMPACW\\EMPRESAS\\Emp1"))
+
+    def test_ruta_con_diagonales(self):
+        self.assertTrue(self.prefiltro("C:/Compacw/Empresas/Emp1"))
+
+    def test_migrada_con_diagonales_se_normaliza(self):
+        self.assertTrue(self.prefiltro(MIGRADA + "/2024"))
+
+    def test_regla_sin_empresas_con_diagonales(self):
+        self.rutas.set_rules(RuleSet([("D:\\Datos\\Contpaq", "\\\\ARCHIVO\\Datos")]))
+        self.assertTrue(self.prefiltro("d:/datos/contpaq/Emp1"))
+
+    def test_regla_unc_con_diagonales(self):
+        self.rutas.set_rules(RuleSet([("\\\\VIEJO\\Datos", "\\\\ARCHIVO\\Datos")]))
+        self.assertTrue(self.prefiltro("//viejo/datos/Emp1"))
+
+    def test_regla_con_acentos(self):
+        self.rutas.set_rules(RuleSet([("D:\\Compañía", "\\\\ARCHIVO\\Datos")]))
+        self.assertTrue(self.prefiltro("D:\\COMPAÑÍA\\Emp1"))
+
+    def test_ya_migradas_por_una_regla(self):
+        self.rutas.set_rules(RuleSet([("D:\\Datos\\Compacw\\Empresas", "\\\\ARCHIVO\\Compacw\\Empresas")]))
+        self.assertFalse(self.prefiltro("\\\\ARCHIVO\\Compacw\\Empresas\\Emp1\\XML", MIGRADA))
+        self.assertTrue(self.prefiltro("\\\\ARCHIVO\\Compacw\\Empresas2\\Emp1"))
+
+
+class UpdateInfoBitacoraTest(unittest.TestCase):
+    """update_info con on_apply: cada lote se entrega antes de escribirse y no se acumula."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.tabla = self.tmp / "mgw10000.dbf"
+        write_table(self.tabla, CAMPOS, [(i + 1, f"C:\\Compacw\\Empresas\\Emp1\\{i}") for i in range(5)])
+        self.rutas = PathManager()
+        self.rutas.set_target(hostname="NUEVO")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def valor(self, recno: int) -> str:
+        with DBFReader(self.tabla) as reader:
+            return dict(reader.iter_values(["CRUTAENT01"]))[recno]["CRUTAENT01"]
+
+    def test_lotes_antes_de_escribir(self):
+        lotes = []
+
+        def on_apply(cambios):
+            # Ningún registro del lote se ha escrito todavía
+            lotes.append([(c["record"], self.valor(c["record"]) == c["before"]["CRUTAENT01"]) for c in cambios])
+
+        manager = DBFManager(output=lambda _: None)
+        manager.BATCH_RECORDS = 2
+        cambios = manager.update_info(self.tabla, ["CRUTAENT01"], self.rutas, on_apply=on_apply)
+        self.assertEqual(lotes, [[(1, True), (2, True)], [(3, True), (4, True)], [(5, True)]])
+        self.assertEqual(len(cambios), 0)
+        self.assertEqual(manager.changed, 5)
+        self.assertEqual(self.valor(5), "\\\\NUEVO\\Compacw\\Empresas\\Emp1\\4")
+
+    def test_sin_on_apply_regresa_los_cambios(self):
+        manager = DBFManager(output=lambda _: None)
+        manager.BATCH_RECORDS = 2
+        cambios = manager.update_info(self.tabla, ["CRUTAENT01"], self.rutas)
+        self.assertEqual([c["record"] for c in cambios], [1, 2, 3, 4, 5])
+        self.assertEqual(manager.changed, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from clases.fleet import FleetManager
+
+
+class FleetManagerTest(unittest.TestCase):
+    """Configuración de flota: rutas de reglas relativas al archivo INI."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.config = self.tmp / "config"
+        self.config.mkdir()
+        (self.config / "reglas_a.txt").write_text("D:\\Datos -> \\\\ARCHIVO\\Datos\n", encoding="utf-8")
+        (self.config / "flota.ini").write_text(
+            "[flota]\nmax_workers = 4\n\n"
+            "[ClienteA]\nserver = NUEVO\nrules = reglas_a.txt\n\n"
+            "[ClienteB]\nletterBase = E\n",
+            encoding="utf-8"
+        )
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_reglas_relativas_al_ini(self):
+        raices = FleetManager(Path("config") / "flota.ini").load()
+        reglas = {raiz["nombre"]: raiz["path_manager"].rule_info() for raiz in raices}
+        self.assertEqual([r["origen"] for r in reglas["ClienteA"]], ["D:\\Datos"])
+        self.assertEqual(reglas["ClienteB"], [])
+
+    def test_reglas_de_la_linea_de_comandos(self):
+        (self.tmp / "comunes.txt").write_text("F:\\Viejo -> \\\\ARCHIVO\\Viejo\n", encoding="utf-8")
+        raices = FleetManager(self.config / "flota.ini", "comunes.txt").load()
+        reglas = {raiz["nombre"]: [r["origen"] for r in raiz["path_manager"].rule_info()] for raiz in raices}
+        self.assertEqual(reglas, {"ClienteA": ["D:\\Datos"], "ClienteB": ["F:\\Viejo"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from clases.journal import JournalManager, rollback_entries
+
+
+def cambios(n: int) -> list:
+    return [
+        {
+            "table": "mgw10006.dbf",
+            "record": i + 1,
+            "before": {"CRUTAENT01": f"\\\\ANTERIOR\\Compacw\\Empresas\\Emp1\\{i}"},
+            "after": {"CRUTAENT01": f"\\\\NUEVO\\Compacw\\Empresas\\Emp1\\{i}"}
+        }
+        for i in range(n)
+    ]
+
+
+class JournalTruncadoTest(unittest.TestCase):
+    """Bitácoras de corridas interrumpidas: se recupera todo lo que se alcanzó a escribir."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def interrumpida(self, compress: bool, n: int) -> Path:
+        """Copia de la bitácora tal como queda si el proceso termina después de flush()."""
+        journal = JournalManager(self.tmp / "cambios.jsonl", compress=compress).open()
+        journal.write("Emp1", "C:\\Compacw\\Empresas\\Emp1", cambios(n))
+        journal.flush()
+        copia = self.tmp / ("interrumpida" + "".join(journal.journal_path.suffixes))
+        shutil.copyfile(journal.journal_path, copia)
+        journal.close()
+        return copia
+
+    def test_gzip_sin_marcador_de_fin(self):
+        copia = self.interrumpida(compress=True, n=500)
+        registros = list(JournalManager(copia).read())
+        self.assertEqual([r["registro"] for r in registros], list(range(1, 501)))
+
+    def test_gzip_cortado_a_la_mitad(self):
+        copia = self.interrumpida(compress=True, n=500)
+        datos = copia.read_bytes()
+        copia.write_bytes(datos[:len(datos) // 2])
+        registros = list(JournalManager(copia).read())
+        self.assertTrue(registros)
+        self.assertEqual([r["registro"] for r in registros], list(range(1, len(registros) + 1)))
+        self.assertEqual(sum(len(e) for e in rollback_entries(JournalManager(copia)).values()), len(registros))
+
+    def test_ultima_linea_incompleta(self):
+        copia = self.interrumpida(compress=False, n=3)
+        with open(copia, "a", encoding="utf-8") as f:
+            f.write('{"empresa": "Emp1", "registro": 4, "antes": {"CRUTA')
+        registros = list(JournalManager(copia).read())
+        self.assertEqual([r["registro"] for r in registros], [1, 2, 3])
+
+
+class JournalExistenteTest(unittest.TestCase):
+    """Una corrida nueva nunca sobrescribe la bitácora de una corrida anterior."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def corrida(self, compress: bool = False, append: bool = False) -> JournalManager:
+        journal = JournalManager(self.tmp / "cambios.jsonl", compress=compress).open(append=append)
+        journal.write("Emp1", "C:\\Compacw\\Empresas\\Emp1", cambios(2))
+        journal.close()
+        return journal
+
+    def test_nueva_corrida_usa_otra_bitacora(self):
+        primera = self.corrida()
+        segunda = self.corrida()
+        tercera = self.corrida()
+        self.assertEqual(primera.journal_path, self.tmp / "cambios.jsonl")
+        self.assertEqual(len({primera.journal_path, segunda.journal_path, tercera.journal_path}), 3)
+        self.assertTrue(segunda.journal_path.name.startswith("cambios."))
+        self.assertTrue(segunda.journal_path.name.endswith(".jsonl"))
+        self.assertEqual(len(list(JournalManager(primera.journal_path).read())), 2)
+
+    def test_gzip_conserva_extension(self):
+        self.corrida(compress=True)
+        segunda = self.corrida(compress=True)
+        self.assertTrue(segunda.journal_path.name.endswith(".jsonl.gz"))
+        self.assertEqual(len(list(JournalManager(segunda.journal_path).read())), 2)
+
+    def test_resume_continua_la_misma(self):
+        primera = self.corrida()
+        segunda = self.corrida(append=True)
+        self.assertEqual(segunda.journal_path, primera.journal_path)
+        self.assertEqual(len(list(JournalManager(primera.journal_path).read())), 4)
+
+
+class JournalAnexarTest(unittest.TestCase):
+    """Anexar (--resume, partes) después de una corrida interrumpida no pierde cambios."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def anexar(self, journal_path: Path):
+        journal = JournalManager(journal_path).open(append=True)
+        journal.write("Emp1", "C:\\Compacw\\Empresas\\Emp1", cambios(2)[:1])
+        journal.close()
+        return [r["registro"] for r in JournalManager(journal_path).read()]
+
+    def test_linea_cortada(self):
+        journal = JournalManager(self.tmp / "cambios.jsonl").open()
+        journal.write("Emp1", "C:\\Compacw\\Empresas\\Emp1", cambios(3))
+        journal.close()
+        with open(journal.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"empresa": "Emp1", "registro": 4, "antes": {"CRUTA')
+        self.assertEqual(self.anexar(journal.journal_path), [1, 2, 3, 1])
+
+    def test_gzip_sin_cerrar(self):
+        journal = JournalManager(self.tmp / "cambios.jsonl", compress=True).open()
+        journal.write("Emp1", "C:\\Compacw\\Empresas\\Emp1", cambios(3))
+        journal.flush()
+        copia = self.tmp / "cortada.jsonl.gz"
+        shutil.copyfile(journal.journal_path, copia)
+        journal.close()
+        self.assertEqual(self.anexar(copia), [1, 2, 3, 1])
+
+
+class JournalPartesTest(unittest.TestCase):
+    """Partes por empresa: se integran al terminar o, si la corrida se interrumpió, al abrir."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def parte(self, journal: JournalManager, empresa: str, n: int) -> Path:
+        parte = journal.part_path(f"C:\\Compacw\\Empresas\\{empresa}")
+        with JournalManager(parte).open(append=True) as escritor:
+            escritor.write(empresa, f"C:\\Compacw\\Empresas\\{empresa}", cambios(n))
+            escritor.sync()
+        return parte
+
+    def test_merge(self):
+        journal = JournalManager(self.tmp / "cambios.jsonl", compress=True).open()
+        parte = self.parte(journal, "Emp1", 3)
+        self.assertNotEqual(parte, journal.part_path("C:\\Compacw\\Empresas\\Emp2"))
+        self.assertEqual(journal.merge(parte), 3)
+        self.assertFalse(parte.exists())
+        self.assertEqual(journal.merge(parte), 0)
+        journal.close()
+        self.assertFalse(journal.parts_dir.exists())
+        self.assertEqual(len(list(JournalManager(journal.journal_path).read())), 3)
+
+    def test_partes_de_una_corrida_interrumpida(self):
+        anterior = JournalManager(self.tmp / "cambios.jsonl").open()
+        anterior.write("", "C:\\Compacw\\Empresas", cambios(1))
+        anterior.flush()
+        self.parte(anterior, "Emp1", 2)
+        self.parte(anterior, "Emp2", 3)
+        # El proceso termina sin integrar las partes ni cerrar la bitácora
+
+        nueva = JournalManager(self.tmp / "cambios.jsonl").open()
+        nueva.close()
+        self.assertNotEqual(nueva.journal_path, anterior.journal_path)
+        registros = list(JournalManager(anterior.journal_path).read())
+        self.assertEqual(sorted(r["empresa"] for r in registros), ["", "Emp1", "Emp1", "Emp2", "Emp2", "Emp2"])
+        self.assertFalse(anterior.parts_dir.exists())
+        self.assertEqual(list(JournalManager(nueva.journal_path).read()), [])
+
+    def test_rollback_recupera_partes(self):
+        journal = JournalManager(self.tmp / "cambios.jsonl").open()
+        self.parte(journal, "Emp1", 2)
+        journal.close()
+        lectura = JournalManager(self.tmp / "cambios.jsonl")
+        self.assertEqual(lectura.recover(), 2)
+        self.assertEqual(sum(len(e) for e in rollback_entries(lectura).values()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import pickle
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from clases.path import PathManager
+from clases.rules import RuleSet
+
+
+def rutas() -> PathManager:
+    path_manager = PathManager()
+    path_manager.set_target(hostname="NUEVO")
+    return path_manager
+
+
+class ChangePathMemoTest(unittest.TestCase):
+    """Memo LRU de change_path: mismos resultados, aciertos y fallos, desalojo y limpieza."""
+
+    def test_resultado_igual_con_y_sin_memo(self):
+        path_manager = rutas()
+        ruta = "C:\\Compacw\\Empresas\\Emp1\\XML"
+        primera = path_manager.change_path(ruta)
+        segunda = path_manager.change_path(ruta)
+        self.assertEqual(primera, "\\\\NUEVO\\Compacw\\Empresas\\Emp1\\XML")
+        self.assertEqual(segunda, primera)
+        self.assertEqual(path_manager.cache_info()["hits"], 1)
+        self.assertEqual(path_manager.cache_info()["misses"], 1)
+
+    def test_la_base_destino_es_parte_de_la_llave(self):
+        path_manager = rutas()
+        ruta = "C:\\Compacw\\Empresas\\Emp1"
+        self.assertEqual(path_manager.change_path(ruta, new_base="D:"), "D:\\Compacw\\Empresas\\Emp1")
+        self.assertEqual(path_manager.change_path(ruta), "\\\\NUEVO\\Compacw\\Empresas\\Emp1")
+        self.assertEqual(path_manager.cache_info()["misses"], 2)
+
+    def test_desalojo_lru(self):
+        path_manager = rutas()
+        path_manager.CACHE_SIZE = 3
+        for i in range(3):
+            path_manager.change_path(f"C:\\Compacw\\Empresas\\E{i}")
+        # E0 es la más reciente; E1 es la que se desaloja al agregar E3
+        path_manager.change_path("C:\\Compacw\\Empresas\\E0")
+        path_manager.change_path("C:\\Compacw\\Empresas\\E3")
+        self.assertEqual(path_manager.cache_info()["size"], 3)
+
+        path_manager.change_path("C:\\Compacw\\Empresas\\E0")
+        self.assertEqual(path_manager.cache_info()["hits"], 2)
+        path_manager.change_path("C:\\Compacw\\Empresas\\E1")
+        self.assertEqual(path_manager.cache_info()["misses"], 5)
+
+    def test_set_target_limpia_el_memo(self):
+        path_manager = rutas()
+        ruta = "C:\\Compacw\\Empresas\\Emp1"
+        path_manager.change_path(ruta)
+        path_manager.set_target(hostname="OTRO")
+        self.assertEqual(path_manager.cache_info(), {"hits": 0, "misses": 0, "size": 0, "maxsize": PathManager.CACHE_SIZE})
+        self.assertEqual(path_manager.change_path(ruta), "\\\\OTRO\\Compacw\\Empresas\\Emp1")
+
+    def test_aciertos_de_reglas_tambien_desde_el_memo(self):
+        path_manager = rutas()
+        path_manager.set_rules(RuleSet([("D:\\Datos", "\\\\ARCHIVO\\Datos")]))
+        for _ in range(3):
+            self.assertEqual(path_manager.change_path("D:\\Datos\\Emp1"), "\\\\ARCHIVO\\Datos\\Emp1")
+        self.assertEqual(path_manager.rule_info()[0]["aciertos"], 3)
+        self.assertEqual(path_manager.cache_info()["hits"], 2)
+
+    def test_se_puede_serializar(self):
+        # Los workers en procesos reciben una copia sin el lock
+        path_manager = rutas()
+        path_manager.change_path("C:\\Compacw\\Empresas\\Emp1")
+        copia = pickle.loads(pickle.dumps(path_manager))
+        self.assertEqual(copia.change_path("C:\\Compacw\\Empresas\\Emp1"), "\\\\NUEVO\\Compacw\\Empresas\\Emp1")
+        self.assertEqual(copia.cache_info()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.synthetic import write_table
+from clases.journal import JournalManager, rollback_entries
+from clases.plan import apply_entries
+from clases.reader import DBFFormatError, DBFReader
+
+CAMPOS = [("CIDEMPRESA", "N", 6, 0), ("CRUTAENT01", "C", 40, 0)]
+ANTERIOR = "C:\\Compacw\\Empresas\\Emp1\\XML"
+NUEVA = "\\\\NUEVO\\Compacw\\Empresas\\Emp1\\XML"
+
+
+def entrada(tabla, registro, antes, despues):
+    return {"tabla": str(tabla), "registro": registro, "campo": "CRUTAENT01", "antes": antes, "despues": despues}
+
+
+class ApplyEntriesTest(unittest.TestCase):
+    """--apply: verificación de valores previos, bitácora antes de escribir y respaldo con dbf."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        carpeta = self.tmp / "Emp1"
+        carpeta.mkdir()
+        self.tabla = carpeta / "mgw10000.dbf"
+        write_table(self.tabla, CAMPOS, [(1, ANTERIOR), (2, "D:\\otra"), (3, NUEVA)])
+        self.entradas = [
+            entrada(self.tabla, 1, ANTERIOR, NUEVA),
+            entrada(self.tabla, 2, ANTERIOR, NUEVA),
+            entrada(self.tabla, 3, ANTERIOR, NUEVA)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def valores(self) -> dict:
+        with DBFReader(self.tabla) as reader:
+            return {recno: v["CRUTAENT01"] for recno, v in reader.iter_values(["CRUTAENT01"])}
+
+    def test_clasificacion(self):
+        resultado = apply_entries(self.tabla, self.entradas, output=lambda _: None)
+        self.assertEqual([e["registro"] for e in resultado["aplicados"]], [1])
+        self.assertEqual([e["registro"] for e in resultado["ya_aplicados"]], [3])
+        self.assertEqual([c["actual"] for c in resultado["conflictos"]], ["D:\\otra"])
+        self.assertEqual(self.valores(), {1: NUEVA, 2: "D:\\otra", 3: NUEVA})
+
+    def test_bitacora_antes_de_escribir(self):
+        vistos = []
+
+        def on_apply(cambios):
+            # La tabla todavía no se ha modificado
+            vistos.append((self.valores()[1], list(cambios)))
+
+        apply_entries(self.tabla, self.entradas, on_apply=on_apply, output=lambda _: None)
+        self.assertEqual(len(vistos), 1)
+        valor, cambios = vistos[0]
+        self.assertEqual(valor, ANTERIOR)
+        self.assertEqual(cambios, [{"table": "mgw10000.dbf", "record": 1,
+                                    "before": {"CRUTAENT01": ANTERIOR}, "after": {"CRUTAENT01": NUEVA}}])
+
+    def test_se_puede_revertir(self):
+        bitacora = JournalManager(self.tmp / "cambios.jsonl").open()
+        carpeta = self.tabla.parent
+        apply_entries(self.tabla, self.entradas, output=lambda _: None,
+                      on_apply=lambda cambios: bitacora.write("Emp1", str(carpeta), cambios))
+        bitacora.close()
+
+        tablas = rollback_entries(JournalManager(bitacora.journal_path))
+        resultado = apply_entries(self.tabla, tablas[str(self.tabla)], output=lambda _: None)
+        self.assertEqual(len(resultado["aplicados"]), 1)
+        self.assertEqual(self.valores(), {1: ANTERIOR, 2: "D:\\otra", 3: NUEVA})
+
+    def test_campo_repetido_se_escribe_una_vez(self):
+        # Reversión paso a paso: el segundo paso parte del valor que dejó el primero
+        pasos = [entrada(self.tabla, 3, NUEVA, "E:\\intermedia"), entrada(self.tabla, 3, "E:\\intermedia", ANTERIOR)]
+        cambios = []
+        resultado = apply_entries(self.tabla, pasos, on_apply=cambios.extend, output=lambda _: None)
+        self.assertEqual(len(resultado["aplicados"]), 2)
+        self.assertEqual(cambios[0]["before"], {"CRUTAENT01": NUEVA})
+        self.assertEqual(cambios[0]["after"], {"CRUTAENT01": ANTERIOR})
+        self.assertEqual(self.valores()[3], ANTERIOR)
+
+    def test_respaldo_con_libreria_dbf(self):
+        mensajes = []
+        cambios = []
+        with mock.patch("clases.plan.DBFWriter.open", side_effect=DBFFormatError("formato no soportado")):
+            resultado = apply_entries(self.tabla, self.entradas, on_apply=cambios.extend, output=mensajes.append)
+        self.assertTrue(any("usando dbf" in m for m in mensajes))
+        self.assertEqual([e["registro"] for e in resultado["aplicados"]], [1])
+        self.assertEqual(len(resultado["conflictos"]), 1)
+        self.assertEqual([c["record"] for c in cambios], [1])
+        self.assertEqual(self.valores(), {1: NUEVA, 2: "D:\\otra", 3: NUEVA})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.synthetic import CONCEPT_FIELDS, TreeGenerator, write_table
+from clases.dbf import DBFManager, DbfLibraryReader
+from clases.path import PathManager
+from clases.reader import DBFFormatError, DBFHeader, DBFReader
+
+CAMPOS = [("CIDEMPRESA", "N", 6, 0), ("CNOMBREE01", "C", 20, 0), ("CRUTAENT01", "C", 60, 0)]
+ANTERIOR = "C:\\Compacw\\Empresas\\Emp1\\XML"
+NUEVA = "\\\\NUEVO\\Compacw\\Empresas\\Emp1\\XML"
+
+
+def rutas() -> PathManager:
+    path_manager = PathManager()
+    path_manager.set_target(hostname="NUEVO")
+    return path_manager
+
+
+class DBFReaderTest(unittest.TestCase):
+    """Lector mapeado en memoria: encabezado, valores y registros borrados."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.tabla = self.tmp / "mgw10000.dbf"
+        write_table(self.tabla, CAMPOS, [
+            (1, "Compañía", ANTERIOR),
+            (2, "Borrada", ANTERIOR),
+            (3, "", "")
+        ], deleted={1})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_encabezado(self):
+        with DBFReader(self.tabla) as reader:
+            self.assertEqual(reader.field_names, ["CIDEMPRESA", "CNOMBREE01", "CRUTAENT01"])
+            self.assertEqual(len(reader), 3)
+            self.assertEqual(reader.codepage, "cp1252")
+            campo = reader.field_info("crutaent01")
+            self.assertEqual((campo.type, campo.offset, campo.length), ("C", 27, 60))
+
+    def test_valores_decodificados_y_recortados(self):
+        with DBFReader(self.tabla) as reader:
+            valores = dict(reader.iter_values(["CNOMBREE01", "CRUTAENT01", "NOEXISTE"]))
+        self.assertEqual(valores[1], {"CNOMBREE01": "Compañía", "CRUTAENT01": ANTERIOR})
+        self.assertEqual(valores[3], {"CNOMBREE01": "", "CRUTAENT01": ""})
+
+    def test_borrados(self):
+        with DBFReader(self.tabla) as reader:
+            self.assertEqual([recno for recno, _ in reader.iter_values(["CRUTAENT01"])], [1, 3])
+            todos = dict(reader.iter_values(["CRUTAENT01"], include_deleted=True))
+            self.assertTrue(reader.is_deleted(2))
+        self.assertEqual(todos[2]["CRUTAENT01"], ANTERIOR)
+
+    def test_archivo_truncado(self):
+        datos = self.tabla.read_bytes()
+        header = DBFHeader.read(self.tabla)
+        self.tabla.write_bytes(datos[:header.record_offset(2) + 10])
+        with DBFReader(self.tabla) as reader:
+            self.assertEqual(len(reader), 1)
+
+    def test_no_es_dbf(self):
+        otro = self.tmp / "otro.dbf"
+        otro.write_bytes(b"no es una tabla")
+        with self.assertRaises(DBFFormatError):
+            DBFReader(otro).open()
+
+    def test_igual_a_la_libreria_dbf(self):
+        TreeGenerator(companies=1, records=300, deleted=0.1, seed=7).generate(self.tmp / "arbol")
+        tabla = next((self.tmp / "arbol").glob("*/mgw10006.dbf"))
+        columnas = [name for name, kind, _, _ in CONCEPT_FIELDS if kind == "C"]
+        with DBFReader(tabla) as reader:
+            rapido = list(reader.iter_values(columnas, include_deleted=True))
+        with DbfLibraryReader(tabla) as reader:
+            libreria = list(reader.iter_values(columnas, include_deleted=True))
+        self.assertEqual(rapido, libreria)
+
+
+class RegistrosBorradosTest(unittest.TestCase):
+    """Los registros borrados se reescriben como con la librería dbf (un registro recuperado queda migrado)."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.tabla = self.tmp / "mgw10000.dbf"
+        # La única ruta anterior está en un registro borrado
+        write_table(self.tabla, CAMPOS, [(1, "Activa", NUEVA), (2, "Borrada", ANTERIOR)], deleted={1})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_prefiltro_no_descarta_la_tabla(self):
+        self.assertTrue(DBFManager().needs_rewrite(self.tabla, rutas()))
+
+    def test_se_reescriben(self):
+        mensajes = []
+        cambios = DBFManager(output=mensajes.append).update_info(self.tabla, ["CRUTAENT01"], rutas())
+        self.assertEqual([cambio["record"] for cambio in cambios], [2])
+        with DBFReader(self.tabla) as reader:
+            valores = dict(reader.iter_values(["CRUTAENT01"], include_deleted=True))
+            self.assertTrue(reader.is_deleted(2))
+        self.assertEqual(valores[2]["CRUTAENT01"], NUEVA)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from clases.path import PathManager
+from clases.rules import RuleSet
+
+
+def rutas(*reglas) -> PathManager:
+    path_manager = PathManager()
+    path_manager.set_target(hostname="NUEVO")
+    path_manager.set_rules(RuleSet(reglas))
+    return path_manager
+
+
+class RuleSetTest(unittest.TestCase):
+    """Reglas 'prefijo anterior -> base nueva': orden, anclaje, separadores e idempotencia."""
+
+    def test_la_regla_mas_larga_gana(self):
+        reglas = RuleSet([
+            ("\\\\VIEJO\\Datos", "\\\\ARCHIVO\\Datos"),
+            ("\\\\VIEJO\\Datos\\Nomina", "\\\\NOMINA\\Datos")
+        ])
+        self.assertEqual(reglas.rewrite("\\\\VIEJO\\Datos\\Nomina\\Emp1"), ("\\\\NOMINA\\Datos\\Emp1", 1))
+        self.assertEqual(reglas.rewrite("\\\\VIEJO\\Datos\\Conta\\Emp1"), ("\\\\ARCHIVO\\Datos\\Conta\\Emp1", 0))
+
+    def test_anclada_al_inicio(self):
+        reglas = RuleSet([("D:\\Datos", "\\\\ARCHIVO\\Datos")])
+        self.assertIsNone(reglas.rewrite("E:\\Respaldo\\D:\\Datos\\Emp1"))
+        self.assertEqual(reglas.rewrite("d:\\datos\\Emp1"), ("\\\\ARCHIVO\\Datos\\Emp1", 0))
+
+    def test_limite_de_separador(self):
+        reglas = RuleSet([("\\\\VIEJO\\Empresas", "\\\\NUEVO\\Compacw\\Empresas")])
+        self.assertIsNone(reglas.rewrite("\\\\VIEJO\\Empresas2\\Emp1"))
+        self.assertEqual(reglas.rewrite("\\\\VIEJO\\Empresas"), ("\\\\NUEVO\\Compacw\\Empresas", 0))
+        self.assertEqual(reglas.rewrite("\\\\VIEJO\\Empresas\\Emp1"), ("\\\\NUEVO\\Compacw\\Empresas\\Emp1", 0))
+
+    def test_normaliza_prefijos(self):
+        reglas = RuleSet([(" d:/datos/ ", "//archivo/datos/")])
+        self.assertEqual(reglas.rules, [("d:\\datos", "\\\\archivo\\datos")])
+        with self.assertRaises(ValueError):
+            RuleSet([("D:\\Datos", "X:"), ("d:/datos", "Y:")])
+
+    def test_base_nueva_ya_migrada(self):
+        reglas = RuleSet([("D:\\Datos\\Compacw\\Empresas", "\\\\ARCHIVO\\Compacw\\Empresas")])
+        self.assertTrue(reglas.migrated("\\\\archivo\\compacw\\empresas\\Emp1"))
+        self.assertFalse(reglas.migrated("\\\\ARCHIVO\\Compacw\\Empresas2\\Emp1"))
+        self.assertIsNone(reglas.rewrite("\\\\ARCHIVO\\Compacw\\Empresas\\Emp1"))
+
+    def test_idempotente(self):
+        path_manager = rutas(("D:\\Datos\\Compacw\\Empresas", "\\\\ARCHIVO\\Compacw\\Empresas"))
+        primera = path_manager.change_path("D:\\Datos\\Compacw\\Empresas\\Emp1\\XML")
+        self.assertEqual(primera, "\\\\ARCHIVO\\Compacw\\Empresas\\Emp1\\XML")
+        # Sin la base nueva como patrón, la segunda corrida la movería a newBase (\\NUEVO)
+        path_manager.clear_cache()
+        self.assertEqual(path_manager.change_path(primera), primera)
+        # Las demás rutas siguen la lógica de basePath/newBase
+        self.assertEqual(path_manager.change_path("C:\\Compacw\\Empresas\\Emp2"), "\\\\NUEVO\\Compacw\\Empresas\\Emp2")
+
+    def test_prefijo_anterior_mas_especifico_que_la_base_nueva(self):
+        path_manager = rutas(
+            ("D:\\Datos", "\\\\ARCHIVO\\Datos"),
+            ("\\\\ARCHIVO\\Datos\\Viejo", "\\\\ARCHIVO\\Datos\\Nuevo")
+        )
+        self.assertEqual(path_manager.change_path("\\\\ARCHIVO\\Datos\\Viejo\\Emp1"), "\\\\ARCHIVO\\Datos\\Nuevo\\Emp1")
+        self.assertEqual(path_manager.change_path("\\\\ARCHIVO\\Datos\\Nuevo\\Emp1"), "\\\\ARCHIVO\\Datos\\Nuevo\\Emp1")
+        self.assertEqual(path_manager.change_path("\\\\ARCHIVO\\Datos\\Emp1"), "\\\\ARCHIVO\\Datos\\Emp1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import datetime
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import dbf
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.synthetic import TreeGenerator, write_table
+from clases.reader import DBFFormatError, DBFReader
+from clases.writer import DBFWriter
+
+CAMPOS = [("CIDEMPRESA", "N", 6, 0), ("CRUTAENT01", "C", 20, 0)]
+
+
+class DBFWriterTest(unittest.TestCase):
+    """Escritura en sitio: solo cambian los bytes del campo (y la fecha del encabezado)."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.tabla = self.tmp / "mgw10000.dbf"
+        write_table(self.tabla, CAMPOS, [(1, "C:\\uno"), (2, "C:\\dos"), (3, "C:\\tres")], deleted={1})
+        # Fecha anterior en el encabezado para comprobar cuándo se actualiza
+        datos = bytearray(self.tabla.read_bytes())
+        datos[1:4] = bytes((99, 1, 2))
+        self.tabla.write_bytes(bytes(datos))
+        self.original = bytes(datos)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def valor(self, recno: int) -> bytes:
+        with DBFWriter(self.tabla) as writer:
+            return writer.read_field(recno, "CRUTAENT01")
+
+    def test_relleno_y_recorte(self):
+        with DBFWriter(self.tabla) as writer:
+            self.assertEqual(writer.encode("CRUTAENT01", "C:\\x"), b"C:\\x" + b" " * 16)
+            self.assertEqual(writer.encode("CRUTAENT01", "\\\\NUEVO\\Compacw\\Empresas"), b"\\\\NUEVO\\Compacw\\Empr")
+            with self.assertRaises(DBFFormatError):
+                writer.encode("CIDEMPRESA", "7")
+
+    def test_codepage(self):
+        with DBFWriter(self.tabla) as writer:
+            self.assertEqual(writer.patch(1, "CRUTAENT01", "C:\\Año\\Ñ"), 20)
+        self.assertEqual(self.valor(1), "C:\\Año\\Ñ".encode("cp1252").ljust(20, b" "))
+
+    def test_solo_cambian_los_bytes_del_campo(self):
+        with DBFWriter(self.tabla) as writer:
+            writer.patch(3, "CRUTAENT01", "D:\\nueva")
+            offset = writer.header.record_offset(3) + writer.header.field_info("CRUTAENT01").offset
+        datos = self.tabla.read_bytes()
+        hoy = datetime.date.today()
+        self.assertEqual(datos[1:4], bytes((hoy.year - 1900, hoy.month, hoy.day)))
+        self.assertEqual(datos[offset:offset + 20], b"D:\\nueva".ljust(20, b" "))
+        esperado = bytearray(self.original)
+        esperado[1:4] = datos[1:4]
+        esperado[offset:offset + 20] = datos[offset:offset + 20]
+        self.assertEqual(datos, bytes(esperado))
+
+    def test_sin_cambios_no_toca_el_archivo(self):
+        with DBFWriter(self.tabla) as writer:
+            writer.read_field(1, "CRUTAENT01")
+        self.assertEqual(self.tabla.read_bytes(), self.original)
+
+    def test_marca_de_borrado_y_fin_de_archivo(self):
+        with DBFWriter(self.tabla) as writer:
+            writer.patch(2, "CRUTAENT01", "D:\\borrado")
+        datos = self.tabla.read_bytes()
+        self.assertEqual(datos[-1:], b"\x1A")
+        self.assertEqual(len(datos), len(self.original))
+        with DBFReader(self.tabla) as reader:
+            self.assertTrue(reader.is_deleted(2))
+            self.assertFalse(reader.is_deleted(1))
+
+    def test_registro_fuera_de_rango(self):
+        with DBFWriter(self.tabla) as writer:
+            with self.assertRaises(IndexError):
+                writer.patch(4, "CRUTAENT01", "x")
+            with self.assertRaises(IndexError):
+                writer.patch(0, "CRUTAENT01", "x")
+
+    def test_igual_a_la_libreria_dbf(self):
+        TreeGenerator(companies=1, records=200, deleted=0.1, seed=3).generate(self.tmp / "arbol")
+        origen = next((self.tmp / "arbol").glob("*/mgw10006.dbf"))
+        directo = self.tmp / "directo.dbf"
+        libreria = self.tmp / "libreria.dbf"
+        shutil.copyfile(origen, directo)
+        shutil.copyfile(origen, libreria)
+
+        cambios = [(recno, "CRUTAENT01", f"\\\\NUEVO\\Compacw\\Empresas\\E1\\XML\\{recno}") for recno in range(1, 201, 3)]
+        cambios.append((5, "CFORMAPR01", "D:\\" + "x" * 300))
+
+        with DBFWriter(directo) as writer:
+            for recno, col, valor in cambios:
+                writer.patch(recno, col, valor)
+
+        tabla = dbf.Table(str(libreria))
+        tabla.open(mode=dbf.READ_WRITE)
+        try:
+            for recno, col, valor in cambios:
+                with tabla[recno - 1] as registro:
+                    registro[col] = valor[:tabla.field_info(col).length]
+        finally:
+            tabla.close()
+
+        self.assertEqual(directo.read_bytes(), libreria.read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()